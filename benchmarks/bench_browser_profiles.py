@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""Compare the default and lean browser profiles on the local fixture site.
+
+Runs bench_scraper's benchmark once per profile and reports the bytes the
+fixture served (by kind), browser peak memory and per-page times, then
+checks that both profiles wrote the same records.
+
+Usage:
+    python3 benchmarks/bench_browser_profiles.py [--categories 2] [--descriptions]
+"""
+
+import csv
+import sys
+
+from bench_scraper import build_parser, print_result, run_benchmark, save_result
+
+PROFILES = ['default', 'lean']
+PAGE_STAGES = ['page_load', 'wait_listing', 'wait_detail']
+
+
+def read_records(path):
+    with open(path, newline='', encoding='utf-8') as f:
+        return sorted(tuple(row.values()) for row in csv.DictReader(f))
+
+
+def main():
+    args = build_parser("Compare the default and lean browser profiles").parse_args()
+    label = args.label
+    results = {}
+    for profile in PROFILES:
+        args.label = f"{label}-{profile}" if label else profile
+        result = run_benchmark(args, {'browser_profile': profile})
+        print_result(result)
+        save_result(result, args.results)
+        results[profile] = result
+
+    print(f"\n{'':<24}" + ''.join(f"{profile:>14}" for profile in PROFILES))
+    kinds = sorted({kind for result in results.values() for kind in result['site']['bytes']})
+    for kind in kinds:
+        print(f"{kind + ' KB':<24}" + ''.join(
+            f"{results[p]['site']['bytes'].get(kind, 0) / 1024:>14.1f}" for p in PROFILES))
+    print(f"{'total KB':<24}" + ''.join(
+        f"{sum(results[p]['site']['bytes'].values()) / 1024:>14.1f}" for p in PROFILES))
+    print(f"{'requests':<24}" + ''.join(
+        f"{sum(results[p]['site']['requests'].values()):>14}" for p in PROFILES))
+    for stage in PAGE_STAGES:
+        if all(stage in results[p]['stages'] for p in PROFILES):
+            print(f"{stage + ' p50 ms':<24}" + ''.join(
+                f"{results[p]['stages'][stage]['p50'] * 1000:>14.1f}" for p in PROFILES))
+    print(f"{'pages/sec':<24}" + ''.join(f"{results[p]['pages_per_sec']:>14.2f}" for p in PROFILES))
+    if all(results[p]['peak_rss_mb']['browser'] is not None for p in PROFILES):
+        print(f"{'browser peak MB':<24}" + ''.join(
+            f"{results[p]['peak_rss_mb']['browser']:>14.0f}" for p in PROFILES))
+
+    baseline, lean = (read_records(results[p]['output']) for p in PROFILES)
+    if baseline != lean:
+        differing = len(set(baseline) ^ set(lean))
+        print(f"\nRecords differ between profiles: {differing} rows only in one output")
+        sys.exit(1)
+    print(f"\nBoth profiles wrote the same {len(lean)} records")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""Image stage benchmark against the local image site.
+
+Serves benchmarks/image_site.py in-process, points a copy of the scraped
+CSV at it and runs sysco_images.py over it twice: a cold run that
+downloads and stores every image, then a rerun that should be answered
+with 304s. Checks every URL got the status the site intended, reports
+URLs/sec, distinct images stored and bytes downloaded, and times the same
+URLs fetched one at a time with urllib and, with Pillow, the thumbnails.
+
+Needs aiohttp; Pillow is optional.
+
+Usage:
+    python3 benchmarks/bench_images.py [--products 2000] [--concurrency 16] [--latency 20]
+"""
+
+import argparse
+import csv
+import os
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+
+from image_site import ROOT, ImageSite, rendition_id, rewrite_csv
+
+sys.path.insert(0, ROOT)
+
+from sysco_images import PIL_AVAILABLE, ImageStore, ImageVerifier, check_csv, make_thumbnails
+
+
+def timed_check(csv_path, output_path, store_dir, concurrency):
+    store = ImageStore(store_dir)
+    try:
+        start = time.perf_counter()
+        counts = check_csv(csv_path, output_path, store, ImageVerifier(store, concurrency=concurrency))
+        return time.perf_counter() - start, counts
+    finally:
+        store.close()
+
+
+def sequential_fetch(urls):
+    """The old way: one image at a time"""
+    start = time.perf_counter()
+    for url in urls:
+        try:
+            with urllib.request.urlopen(url) as response:
+                response.read()
+        except urllib.error.HTTPError:
+            pass
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the image stage against a local image site")
+    parser.add_argument('--csv', default=os.path.join(ROOT, 'sysco_products_oregon_full.csv'))
+    parser.add_argument('--products', type=int, default=2000, help="rows of the CSV to use (default: 2000)")
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--latency', type=float, default=20.0, metavar='MS',
+                        help="delay the site adds to every image (default: 20)")
+    parser.add_argument('--sequential', type=int, default=200, metavar='N',
+                        help="URLs to fetch one at a time for comparison (default: 200, 0 to skip)")
+    parser.add_argument('--thumbnail', type=int, default=128, metavar='SIZE')
+    args = parser.parse_args()
+
+    site = ImageSite(latency=args.latency / 1000)
+    url = site.start()
+    work_dir = tempfile.mkdtemp(prefix='sysco-images-')
+    csv_path = os.path.join(work_dir, 'products.csv')
+    output_path = os.path.join(work_dir, 'checked.csv')
+    store_dir = os.path.join(work_dir, 'store')
+    try:
+        rewrite_csv(args.csv, csv_path, url, args.products)
+        with open(csv_path, newline='', encoding='utf-8') as f:
+            urls = list(dict.fromkeys(row['picture_url'] for row in csv.DictReader(f) if row['picture_url']))
+
+        elapsed, counts = timed_check(csv_path, output_path, store_dir, args.concurrency)
+        cold = site.stats()
+        print(f"Cold run: {len(urls)} URLs in {elapsed:.2f}s ({len(urls) / elapsed:.1f} URLs/sec) - "
+              f"{counts['ok']} ok, {counts['placeholder']} placeholder, {counts['broken']} broken; "
+              f"{counts['stored']} distinct images stored, {sum(cold['bytes'].values()) / 1024:.0f} KB served")
+
+        # Rows come out in input order; bad picture_urls are cleared in the output, so ids come from the input
+        mismatches = 0
+        with open(csv_path, newline='', encoding='utf-8') as f, open(output_path, newline='', encoding='utf-8') as g:
+            for row, checked in zip(csv.DictReader(f), csv.DictReader(g)):
+                if row['picture_url'] and checked['image_status'] != site.expected_status(rendition_id(row['picture_url'])):
+                    mismatches += 1
+        print(f"Statuses differing from the site's intent: {mismatches}")
+
+        site.reset_counts()
+        elapsed, counts = timed_check(csv_path, output_path, store_dir, args.concurrency)
+        warm = site.stats()
+        print(f"Rerun: {elapsed:.2f}s ({len(urls) / elapsed:.1f} URLs/sec) - {counts['not_modified']} not modified, "
+              f"{counts['stored']} new images, {sum(warm['bytes'].values()) / 1024:.0f} KB served")
+
+        if args.sequential:
+            sample = urls[:args.sequential]
+            seconds = sequential_fetch(sample)
+            print(f"Sequential urllib: {len(sample)} URLs in {seconds:.2f}s ({len(sample) / seconds:.1f} URLs/sec)")
+
+        if PIL_AVAILABLE and args.thumbnail:
+            store = ImageStore(store_dir)
+            start = time.perf_counter()
+            made = make_thumbnails(store, [args.thumbnail])
+            print(f"Thumbnails: {made} in {time.perf_counter() - start:.2f}s on {os.cpu_count()} CPUs")
+            store.close()
+        print(f"Store: {store_dir}")
+    finally:
+        site.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""Micro-benchmark: packaging extraction per tile vs the compiled parser.
+
+Compares the scraper's original per-tile packaging scan (four patterns run
+through re.findall and then re.search line by line) with
+sysco_packaging.find_packaging(), checks both return the same strings, and
+times structured parsing of the packaging column.
+
+Usage:
+    python3 benchmarks/bench_packaging.py [sysco_products_oregon_full.csv] [repeats]
+"""
+
+import csv
+import os
+import re
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from sysco_packaging import find_packaging, parse_packaging
+
+
+def legacy_packaging_from_text(text):
+    """The per-tile text scan as it was in safe_extract_packaging()"""
+    patterns = [
+        r'\b\d+[-/\d]*\s*(CT|CS|EA|LB|OZ|GAL|QT|PT)\b',
+        r'\b\d+\s*[xX]\s*\d+\s*(CT|CS|EA|LB|OZ)\b',
+        r'\b\d+\.\d+\s*(LB|OZ|GAL)\b',
+        r'\b\d+/\d+\s*(CT|CS|EA|LB|OZ)\b'
+    ]
+
+    all_matches = []
+    for pattern in patterns:
+        matches = re.findall(pattern, text, re.IGNORECASE)
+        all_matches.extend(matches)
+
+    if all_matches:
+        text_lines = text.split('\n')
+        for line in reversed(text_lines[-3:]):
+            for pattern in patterns:
+                match = re.search(pattern, line, re.IGNORECASE)
+                if match:
+                    return match.group(0)
+
+        for pattern in patterns:
+            match = re.search(pattern, text, re.IGNORECASE)
+            if match:
+                return match.group(0)
+    return ""
+
+
+def best_of(repeats, fn):
+    best = float('inf')
+    result = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    path = sys.argv[1] if len(sys.argv) > 1 else os.path.join(ROOT, 'sysco_products_oregon_full.csv')
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+
+    with open(path, newline='', encoding='utf-8') as f:
+        rows = list(csv.DictReader(f))
+    # The product name is the tile text the scraper scans when no packaging element matches
+    tiles = [row['product_name'] for row in rows]
+    values = [row['packaging_info'] for row in rows]
+
+    legacy_time, legacy = best_of(repeats, lambda: [legacy_packaging_from_text(t) for t in tiles])
+    compiled_time, compiled = best_of(repeats, lambda: [find_packaging(t) for t in tiles])
+    mismatches = sum(1 for a, b in zip(legacy, compiled) if a != b)
+
+    parse_time, parsed = best_of(repeats, lambda: [parse_packaging(v) for v in values])
+
+    print(f"{len(rows)} products from {path}, best of {repeats}")
+    print(f"{'legacy per-tile scan':<28}{legacy_time * 1000:>9.1f} ms  {legacy_time / len(tiles) * 1e6:>7.2f} us/tile")
+    print(f"{'find_packaging':<28}{compiled_time * 1000:>9.1f} ms  {compiled_time / len(tiles) * 1e6:>7.2f} us/tile"
+          f"  ({legacy_time / compiled_time:.1f}x, {mismatches} mismatches)")
+    print(f"{'parse_packaging':<28}{parse_time * 1000:>9.1f} ms  "
+          f"{sum(1 for packaging in parsed if packaging.unit)} parsed")
+
+
+if __name__ == "__main__":
+    main()
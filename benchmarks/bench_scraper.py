@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+"""End-to-end scraper benchmark against the local fixture site.
+
+Starts benchmarks/fixture_site.py in-process, runs the scraper (headless
+Chrome, plus the HTTP backend if selected) against it and reports pages/sec,
+products/sec, per-stage latency percentiles and peak memory. Results are
+saved as JSON and compared with the previous result in the same directory
+(or the file given with --compare), flagging metrics that got worse by
+more than --threshold percent.
+
+Needs selenium and a local Chrome/chromedriver; psutil is optional and
+adds the browsers' peak memory to the report.
+
+Usage:
+    python3 benchmarks/bench_scraper.py [--categories 2] [--per-category 120] [--descriptions]
+"""
+
+import argparse
+import glob
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from fixture_site import ROOT, FixtureSite, load_scraper_module
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+# Metric -> True when higher is better
+COMPARED_METRICS = {
+    'pages_per_sec': True,
+    'products_per_sec': True,
+    'peak_rss_mb.python': False,
+    'peak_rss_mb.browser': False,
+}
+COMPARED_STAGE_POINTS = ['p50', 'p90']
+
+
+class PeakMemory:
+    """Peak RSS of this process and, with psutil, of the browser processes it started"""
+    def __init__(self, interval=0.2):
+        self.interval = interval
+        self.browser_bytes = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if psutil:
+            self._thread = threading.Thread(target=self._sample, daemon=True)
+            self._thread.start()
+        return self
+
+    def _sample(self):
+        me = psutil.Process()
+        while not self._stop.wait(self.interval):
+            total = 0
+            for child in me.children(recursive=True):
+                try:
+                    total += child.memory_info().rss
+                except psutil.Error:
+                    continue
+            self.browser_bytes = max(self.browser_bytes, total)
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+
+    @staticmethod
+    def python_mb():
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is in bytes on macOS and kilobytes on Linux
+        return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+    def browser_mb(self):
+        return self.browser_bytes / (1024 * 1024) if psutil else None
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmark(args, scraper_options=None):
+    """Scrape the fixture site once and return the result dict"""
+    scraper_module = load_scraper_module()
+    scraper_class = scraper_module.FinalSyscoScraper
+    site = FixtureSite(args.csv, scraper_class.CATEGORIES, per_category=args.per_category,
+                       latency=args.latency / 1000, recorded=args.recorded, rate_limit=args.site_rate)
+    url = site.start()
+    output_dir = tempfile.mkdtemp(prefix='sysco-bench-')
+    memory = PeakMemory().start()
+    try:
+        options = dict(
+            base_url=url,
+            fetch_descriptions=args.descriptions,
+            workers=args.workers,
+            fetch_backend=args.backend,
+            description_workers=args.description_workers,
+            outputs=[os.path.join(output_dir, 'products.csv')],
+        )
+        options.update(scraper_options or {})
+        scraper = scraper_class(**options)
+        start = time.perf_counter()
+        scraper.scrape(category_limit=args.categories)
+        elapsed = time.perf_counter() - start
+    finally:
+        memory.stop()
+        site.stop()
+
+    stats = site.stats()
+    requests = stats['requests']
+    pages = requests.get('listing', 0) + requests.get('detail', 0)
+    categories = [name for name, _ in scraper_class.CATEGORIES[:args.categories]]
+    return {
+        'label': args.label,
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'revision': git_revision(),
+        'python': platform.python_version(),
+        'config': {
+            'categories': args.categories,
+            'per_category': args.per_category,
+            'descriptions': args.descriptions,
+            'workers': args.workers,
+            'backend': args.backend,
+            'description_workers': args.description_workers,
+            'latency_ms': args.latency,
+            'recorded': bool(args.recorded),
+            'site_rate': args.site_rate,
+            **{key: value for key, value in (scraper_options or {}).items() if isinstance(value, (str, int, bool))},
+        },
+        'elapsed_sec': round(elapsed, 3),
+        'pages': pages,
+        'pages_per_sec': round(pages / elapsed, 3) if elapsed else 0.0,
+        'products': scraper.run_count,
+        'products_expected': sum(len(site.products.get(name, [])) for name in categories),
+        'products_per_sec': round(scraper.run_count / elapsed, 3) if elapsed else 0.0,
+        'descriptions': scraper.description_count,
+        'stages': scraper.metrics.summary(),
+        'description_rate': scraper.metrics.description_rate(),
+        'selectors': scraper.metrics.selector_summary(),
+        'peak_rss_mb': {
+            'python': round(PeakMemory.python_mb(), 1),
+            'browser': None if memory.browser_mb() is None else round(memory.browser_mb(), 1),
+        },
+        'site': stats,
+        'output': options['outputs'][0],
+    }
+
+
+def metric(result, name):
+    value = result
+    for key in name.split('.'):
+        if not isinstance(value, dict):
+            return None
+        value = value.get(key)
+    return value
+
+
+def compare(current, previous, threshold):
+    """Print metric changes against a previous result; returns the number of regressions"""
+    names = dict(COMPARED_METRICS)
+    for stage in current.get('stages', {}):
+        for point in COMPARED_STAGE_POINTS:
+            names[f'stages.{stage}.{point}'] = False
+
+    print(f"\nCompared with {previous.get('label') or ''} {previous.get('timestamp')} "
+          f"({previous.get('revision') or 'unknown revision'})")
+    print(f"{'Metric':<36}{'before':>12}{'after':>12}{'change':>10}")
+    regressions = 0
+    for name, higher_is_better in names.items():
+        before, after = metric(previous, name), metric(current, name)
+        if before is None or after is None:
+            continue
+        change = (after - before) / before * 100 if before else 0.0
+        worse = change < -threshold if higher_is_better else change > threshold
+        regressions += worse
+        print(f"{name:<36}{before:>12.4g}{after:>12.4g}{change:>+9.1f}%{'  REGRESSION' if worse else ''}")
+    return regressions
+
+
+def print_result(result):
+    print(f"\n{result['label'] or 'benchmark'}: {result['pages']} pages, {result['products']} products "
+          f"in {result['elapsed_sec']:.1f}s")
+    print(f"  {result['pages_per_sec']:.2f} pages/sec, {result['products_per_sec']:.2f} products/sec, "
+          f"{result['descriptions']} descriptions")
+    throttled = result['site']['requests'].get('throttled', 0)
+    if throttled or result['products'] != result['products_expected']:
+        print(f"  {throttled} throttled responses, {result['products']} of {result['products_expected']} "
+              f"products written")
+    browser = result['peak_rss_mb']['browser']
+    print(f"  peak RSS: python {result['peak_rss_mb']['python']:.0f} MB, "
+          f"browsers {'n/a (install psutil)' if browser is None else f'{browser:.0f} MB'}")
+    print(f"\n{'Stage':<20}{'count':>8}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}")
+    for stage, stats in result['stages'].items():
+        print(f"{stage:<20}{stats['count']:>8}{stats['p50'] * 1000:>10.1f}"
+              f"{stats['p90'] * 1000:>10.1f}{stats['p99'] * 1000:>10.1f}")
+
+
+def save_result(result, results_dir):
+    os.makedirs(results_dir, exist_ok=True)
+    name = f"{time.strftime('%Y%m%d-%H%M%S')}-{result['label'] or 'run'}.json"
+    path = os.path.join(results_dir, name)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(result, f, indent=2)
+    return path
+
+
+def latest_result(results_dir, label=None):
+    paths = sorted(glob.glob(os.path.join(results_dir, '*.json')))
+    if label:
+        paths = [p for p in paths if p.endswith(f"-{label}.json")]
+    return paths[-1] if paths else None
+
+
+def build_parser(description="Benchmark the scraper against a local fixture site"):
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument('--csv', default=os.path.join(ROOT, 'sysco_products_oregon_full.csv'),
+                        help="scraped CSV the fixture pages are generated from")
+    parser.add_argument('--categories', type=int, default=2, help="categories to scrape (default: 2)")
+    parser.add_argument('--per-category', type=int, default=120, metavar='N',
+                        help="products served per category (default: 120)")
+    parser.add_argument('--descriptions', action='store_true', help="also fetch product detail pages")
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--backend', choices=['selenium', 'http'], default='selenium')
+    parser.add_argument('--description-workers', type=int, default=4)
+    parser.add_argument('--latency', type=float, default=0.0, metavar='MS',
+                        help="delay the fixture adds to every HTML page (default: 0)")
+    parser.add_argument('--recorded', default=None, metavar='DIR',
+                        help="serve pages recorded in this page cache directory when available")
+    parser.add_argument('--site-rate', type=float, default=None, metavar='PER_SEC',
+                        help="have the fixture throttle catalog pages beyond this rate (default: no limit)")
+    parser.add_argument('--label', default='', help="name stored with the result")
+    parser.add_argument('--results', default=os.path.join(ROOT, 'benchmarks', 'results'), metavar='DIR',
+                        help="directory results are saved to (default: benchmarks/results)")
+    parser.add_argument('--compare', default=None, metavar='JSON',
+                        help="result to compare with (default: the latest in --results with the same label)")
+    parser.add_argument('--threshold', type=float, default=10.0, metavar='PERCENT',
+                        help="change that counts as a regression (default: 10)")
+    parser.add_argument('--fail-on-regression', action='store_true',
+                        help="exit with status 1 when any metric regressed")
+    return parser
+
+
+def main():
+    args = build_parser().parse_args()
+    previous_path = args.compare or latest_result(args.results, args.label)
+
+    result = run_benchmark(args)
+    print_result(result)
+    path = save_result(result, args.results)
+    print(f"\nSaved {path}")
+
+    if previous_path:
+        with open(previous_path, encoding='utf-8') as f:
+            previous = json.load(f)
+        regressions = compare(result, previous, args.threshold)
+        if regressions and args.fail_on_regression:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
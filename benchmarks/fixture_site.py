@@ -0,0 +1,354 @@
+#!/usr/bin/env python3
+"""Local stand-in for shop.sysco.com, for benchmarking the scraper offline.
+
+Serves a home page with the guest/zip-code prompt, catalog listing pages
+and product-detail pages generated from a scraped CSV, so the same
+products come back on every run. Categories end with empty trailing
+pages, and a fixed share of detail pages has no description (either no
+description node or the "not available" text). Pages recorded in a
+PageCache directory (scraper --cache) are served instead of generated
+ones when present. With a rate limit, listing and detail requests beyond
+it get a 429 "Too Many Requests" page, as a throttling site would send.
+
+Every response is counted by kind (listing, detail, image, ...) with its
+size in bytes, the Cookie and User-Agent of the latest request of each
+kind are kept, and so is the peak number of requests in flight. An
+optional latency is added to HTML pages.
+
+Usage:
+    python3 benchmarks/fixture_site.py [sysco_products_oregon_full.csv] [--port 8765]
+"""
+
+import argparse
+import csv
+import hashlib
+import html
+import importlib.util
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from sysco_cache import PageCache
+
+RECORDED_BASE_URL = "https://shop.sysco.com"
+DETAIL_PATH = "/app/product-details/opco/058/product/"
+
+# 1x1 transparent PNG
+PIXEL_PNG = bytes.fromhex(
+    "89504e470d0a1a0a0000000d49484452000000010000000108060000001f15c489"
+    "0000000d49444154789c6360000002000001e221bc330000000049454e44ae426082"
+)
+STATIC_FILES = {
+    '/static/site.css': ('text/css', (
+        "@font-face { font-family: 'Sysco Sans'; src: url('/static/sysco-sans.woff2') format('woff2'); }\n"
+        "body { font-family: 'Sysco Sans', sans-serif; }\n"
+        ".product-grid { display: grid; grid-template-columns: repeat(4, 1fr); }\n"
+    ).encode('utf-8')),
+    '/static/analytics.js': ('application/javascript', (
+        "(function () { var img = new Image(); img.src = '/collect?page=' + encodeURIComponent(location.pathname); })();\n"
+    ).encode('utf-8')),
+    '/static/sysco-sans.woff2': ('font/woff2', bytes(16 * 1024)),
+}
+
+HOME_TEMPLATE = """<!DOCTYPE html>
+<html><head><title>Sysco Shop</title>
+<link rel="stylesheet" href="/static/site.css"><script src="/static/analytics.js"></script></head>
+<body>
+<div class="zipcode-modal" id="zipcode-modal">
+  <button type="button">Continue as Guest</button>
+  <input data-id="initial_zipcode_modal_input" type="text"
+         onkeydown="if (event.key === 'Enter') { document.cookie = 'zipcode=' + this.value + '; path=/'; document.getElementById('zipcode-modal').remove(); }">
+</div>
+</body></html>
+"""
+
+THROTTLED_PAGE = """<!DOCTYPE html>
+<html><head><title>Too Many Requests</title></head>
+<body><h1>Too Many Requests</h1><p>You have sent too many requests. Please try again later.</p></body></html>
+"""
+
+PAGE_TEMPLATE = """<!DOCTYPE html>
+<html><head><title>{title} | Sysco Shop</title>
+<link rel="stylesheet" href="/static/site.css"><script src="/static/analytics.js"></script></head>
+<body>
+{body}
+</body></html>
+"""
+
+
+def load_scraper_module():
+    """Import sysco-scraper-simple.py, whose file name is not a valid module name"""
+    if 'sysco_scraper' not in sys.modules:
+        spec = importlib.util.spec_from_file_location('sysco_scraper', os.path.join(ROOT, 'sysco-scraper-simple.py'))
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        sys.modules['sysco_scraper'] = module
+    return sys.modules['sysco_scraper']
+
+
+def _share(sku, salt):
+    """Stable number in [0, 1) for a SKU, used to pick missing-description cases"""
+    digest = hashlib.sha1(f"{salt}:{sku}".encode('utf-8')).digest()
+    return int.from_bytes(digest[:4], 'big') / 2 ** 32
+
+
+class FixtureSite:
+    def __init__(self, csv_path, categories, per_category=None, page_size=24, missing_description_rate=0.15,
+                 latency=0.0, recorded=None, zip_code="97205", image_bytes=12 * 1024, rate_limit=None):
+        self.page_size = page_size
+        # Product images are padded to a typical thumbnail size so blocking them shows up in the byte counts
+        self.image = PIXEL_PNG + bytes(max(0, image_bytes - len(PIXEL_PNG)))
+        self.missing_description_rate = missing_description_rate
+        self.latency = latency  # Seconds added to every HTML page
+        self.recorded = PageCache(recorded) if recorded else None
+        self.zip_code = zip_code
+        self.category_names = dict((category_id, name) for name, category_id in categories)
+        self.rate_limit = rate_limit  # Listing and detail pages per second before requests are throttled
+        self._allowance = float(rate_limit or 0)
+        self._allowance_at = time.monotonic()
+
+        self.products = {}  # category name -> rows
+        self.by_sku = {}
+        with open(csv_path, newline='', encoding='utf-8') as f:
+            for row in csv.DictReader(f):
+                rows = self.products.setdefault(row['category'], [])
+                if per_category is None or len(rows) < per_category:
+                    rows.append(row)
+                    self.by_sku[row['sku']] = row
+
+        self.requests = {}  # kind -> count
+        self.bytes = {}  # kind -> response bytes
+        self.last_headers = {}  # kind -> Cookie and User-Agent of the latest request
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self._lock = threading.Lock()
+        self.server = None
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self, host='127.0.0.1', port=0):
+        site = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                site.enter()
+                try:
+                    kind, status, content_type, body = site.respond(self.path)
+                finally:
+                    site.leave()
+                site.note_headers(kind, self.headers)
+                self.send_response(status)
+                if status == 429:
+                    self.send_header('Retry-After', '1')
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+                site.count(kind, len(body))
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self.url
+
+    def stop(self):
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+        if self.recorded:
+            self.recorded.close()
+
+    def count(self, kind, size):
+        with self._lock:
+            self.requests[kind] = self.requests.get(kind, 0) + 1
+            self.bytes[kind] = self.bytes.get(kind, 0) + size
+
+    def enter(self):
+        with self._lock:
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+
+    def leave(self):
+        with self._lock:
+            self.in_flight -= 1
+
+    def note_headers(self, kind, headers):
+        with self._lock:
+            self.last_headers[kind] = {'Cookie': headers.get('Cookie'), 'User-Agent': headers.get('User-Agent')}
+
+    def reset_counts(self):
+        with self._lock:
+            self.requests = {}
+            self.bytes = {}
+            self.last_headers = {}
+            self.peak_in_flight = self.in_flight
+
+    def stats(self):
+        with self._lock:
+            return {'requests': dict(self.requests), 'bytes': dict(self.bytes)}
+
+    def respond(self, path):
+        """(kind, status, content type, body) for a request path"""
+        parts = urlsplit(path)
+        if parts.path == '/':
+            return self._page('home', HOME_TEMPLATE)
+        if (parts.path == '/app/catalog' or parts.path.startswith(DETAIL_PATH)) and not self._allow():
+            return 'throttled', 429, 'text/html; charset=utf-8', THROTTLED_PAGE.encode('utf-8')
+        if parts.path == '/app/catalog':
+            query = parse_qs(parts.query)
+            category_id = query.get('BUSINESS_CENTER_ID', [''])[0]
+            try:
+                page = int(query.get('page', ['1'])[0])
+            except ValueError:
+                page = 1
+            return self._page('listing', self._recorded(path, 'listing') or self.listing_page(category_id, page))
+        if parts.path.startswith(DETAIL_PATH):
+            sku = parts.path[len(DETAIL_PATH):].strip('/')
+            body = self._recorded(path, 'detail') or self.detail_page(sku)
+            if body is None:
+                return 'detail', 404, 'text/html', b"<html><body>Not found</body></html>"
+            return self._page('detail', body)
+        if parts.path.startswith('/images/'):
+            return 'image', 200, 'image/png', self.image
+        if parts.path in STATIC_FILES:
+            content_type, body = STATIC_FILES[parts.path]
+            kind = 'font' if content_type.startswith('font/') else 'script' if 'javascript' in content_type else 'style'
+            return kind, 200, content_type, body
+        if parts.path == '/collect':
+            return 'tracking', 200, 'image/png', PIXEL_PNG
+        return 'other', 404, 'text/html', b"<html><body>Not found</body></html>"
+
+    def _allow(self):
+        """Token bucket over catalog pages, one second of burst"""
+        if not self.rate_limit:
+            return True
+        with self._lock:
+            now = time.monotonic()
+            self._allowance = min(self.rate_limit, self._allowance + (now - self._allowance_at) * self.rate_limit)
+            self._allowance_at = now
+            if self._allowance < 1:
+                return False
+            self._allowance -= 1
+            return True
+
+    def _page(self, kind, text):
+        if self.latency:
+            time.sleep(self.latency)
+        return kind, 200, 'text/html; charset=utf-8', text.encode('utf-8')
+
+    def _recorded(self, path, page_type):
+        if not self.recorded:
+            return None
+        return self.recorded.get(RECORDED_BASE_URL + path, self.zip_code, page_type, allow_stale=True)
+
+    def page_count(self, category_name):
+        rows = self.products.get(category_name, [])
+        return (len(rows) + self.page_size - 1) // self.page_size
+
+    def listing_page(self, category_id, page):
+        category_name = self.category_names.get(category_id, category_id)
+        rows = self.products.get(category_name, [])
+        tiles = [self.tile(row) for row in rows[(page - 1) * self.page_size:page * self.page_size]]
+        body = (f'<div class="catalog-results">\n'
+                f'<span class="results-count" data-id="catalog_result_count">{len(rows)} Results</span>\n'
+                f'<div class="product-grid">\n{"".join(tiles)}</div>\n</div>')
+        return PAGE_TEMPLATE.format(title=html.escape(category_name), body=body)
+
+    def tile(self, row):
+        sku = html.escape(row['sku'])
+        lines = []
+        for line in row['product_name'].split('\n'):
+            if line.strip() == row['brand_name'].strip() and row['brand_name'].strip():
+                lines.append(f'<div class="product-brand">{html.escape(line)}</div>')
+            else:
+                lines.append(f'<div>{html.escape(line)}</div>')
+        if row['picture_url']:
+            image = (f'<img class="product-image" data-src="{html.escape(row["picture_url"])}" '
+                     f'src="/images/{sku}.png" alt="product image">')
+        else:
+            image = '<img class="product-image" src="/images/placeholder.png" alt="">'
+        packaging = (f'<div class="pack-size">{html.escape(row["packaging_info"])}</div>'
+                     if row['packaging_info'] else '')
+        return (f'<div class="product-card">\n'
+                f'<a class="product-link" href="{DETAIL_PATH}{sku}">{"".join(lines)}</a>\n'
+                f'{image}\n{packaging}\n</div>\n')
+
+    def description_for(self, row):
+        """Description text for a product, '' for no node or None for the not-available text"""
+        if row.get('description'):
+            return row['description']
+        share = _share(row['sku'], 'description')
+        if share < self.missing_description_rate * 2 / 3:
+            return ''
+        if share < self.missing_description_rate:
+            return None
+        name = row['product_name'].split('\n')[-1].strip()
+        return (f"{name}. {row['brand_name'] or 'Sysco'} product packed {row['packaging_info'] or 'per case'}; "
+                f"store as directed and use by the date on the label.")
+
+    def detail_page(self, sku):
+        row = self.by_sku.get(sku)
+        if row is None:
+            return None
+        parts = [f'<h1 class="product-title">{html.escape(row["product_name"].split(chr(10))[-1])}</h1>']
+        if row['brand_name']:
+            parts.append(f'<button data-id="product_brand_link">{html.escape(row["brand_name"])}</button>')
+        if row['packaging_info']:
+            parts.append(f'<div data-id="pack_size">{html.escape(row["packaging_info"])}</div>')
+        parts.append(f'<img data-id="main-product-img-v2" src="/images/{html.escape(sku)}.png" alt="">')
+        description = self.description_for(row)
+        if description is None:
+            parts.append('<div data-id="product_description_text">Product description is not available</div>')
+        elif description:
+            parts.append(f'<div data-id="product_description_text">{html.escape(description)}</div>')
+        body = '<div class="product-details">\n' + '\n'.join(parts) + '\n</div>'
+        return PAGE_TEMPLATE.format(title=html.escape(sku), body=body)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve a local fixture copy of the Sysco catalog")
+    parser.add_argument('csv', nargs='?', default=os.path.join(ROOT, 'sysco_products_oregon_full.csv'))
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--per-category', type=int, default=None, metavar='N',
+                        help="serve at most N products per category")
+    parser.add_argument('--latency', type=float, default=0.0, metavar='MS',
+                        help="delay added to every HTML page")
+    parser.add_argument('--recorded', default=None, metavar='DIR',
+                        help="serve pages recorded in this page cache directory when available")
+    parser.add_argument('--rate-limit', type=float, default=None, metavar='PER_SEC',
+                        help="throttle listing and detail pages beyond this rate with 429 responses")
+    args = parser.parse_args()
+
+    site = FixtureSite(args.csv, load_scraper_module().FinalSyscoScraper.CATEGORIES,
+                       per_category=args.per_category, latency=args.latency / 1000, recorded=args.recorded,
+                       rate_limit=args.rate_limit)
+    url = site.start(port=args.port)
+    print(f"Serving {len(site.by_sku)} products at {url} (Ctrl+C to stop)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        site.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+"""Local stand-in for the Sysco image CDN, for exercising sysco_images.py offline.
+
+Serves a generated PNG for every rendition id in a scraped CSV. Fixed
+shares of the ids are broken (404), placeholders (a 1x1 image), error
+pages served with status 200, renditions shared with other ids (same
+bytes under a different URL) or oversized images. Responses carry an ETag
+and Last-Modified and honour If-None-Match/If-Modified-Since with 304s;
+they can be sent chunked (without a Content-Length), and an optional
+latency is added to every image.
+
+rewrite_csv() copies a CSV with its picture_urls pointed at the site.
+
+Usage:
+    python3 benchmarks/image_site.py [sysco_products_oregon_full.csv] [--port 8766]
+"""
+
+import argparse
+import csv
+import hashlib
+import os
+import struct
+import threading
+import time
+import zlib
+from email.utils import formatdate, parsedate_to_datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RENDITION_PATH = "/images/rendition"
+ERROR_PAGE = b"<html><body><h1>Image unavailable</h1></body></html>"
+
+
+def _share(key, salt):
+    """Stable number in [0, 1) for a key"""
+    digest = hashlib.sha1(f"{salt}:{key}".encode('utf-8')).digest()
+    return int.from_bytes(digest[:4], 'big') / 2 ** 32
+
+
+def png_bytes(width, height, seed):
+    """A small PNG with a gradient whose colour comes from `seed`"""
+    color = hashlib.sha1(seed.encode('utf-8')).digest()[:3]
+    rows = b''.join(b'\x00' + bytes((color[0], color[1], (color[2] + y) % 256)) * width for y in range(height))
+
+    def chunk(kind, data):
+        return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data))
+
+    return (b'\x89PNG\r\n\x1a\n' + chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0))
+            + chunk(b'IDAT', zlib.compress(rows, 6)) + chunk(b'IEND', b''))
+
+
+def rendition_id(url):
+    """The rendition id of a picture_url, or a hash of the URL when it has none"""
+    ids = parse_qs(urlsplit(url).query).get('id')
+    return ids[0] if ids else hashlib.sha1(url.encode('utf-8')).hexdigest()
+
+
+class ImageSite:
+    def __init__(self, broken_rate=0.05, placeholder_rate=0.03, error_page_rate=0.02, shared_rate=0.1,
+                 size=225, latency=0.0, large_rate=0.0, large_size=1200, chunked=False):
+        self.broken_rate = broken_rate
+        self.placeholder_rate = placeholder_rate
+        self.error_page_rate = error_page_rate
+        self.shared_rate = shared_rate  # Share of ids served the bytes of one of a few common renditions
+        self.size = size
+        self.latency = latency  # Seconds added to every image
+        self.large_rate = large_rate  # Share of ids served a large_size x large_size image
+        self.large_size = large_size
+        self.chunked = chunked  # Send bodies with Transfer-Encoding: chunked instead of a Content-Length
+        self.last_modified = formatdate(time.time() - 3600, usegmt=True)
+        self.placeholder = png_bytes(1, 1, 'placeholder')
+        self.images = {}  # seed -> PNG bytes
+        self.requests = {}  # kind -> count
+        self.bytes = {}
+        self._lock = threading.Lock()
+        self.server = None
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self, host='127.0.0.1', port=0):
+        site = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                kind, status, headers, body = site.respond(self.path, self.headers)
+                site.count(kind, len(body))
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                if site.chunked and status != 304:
+                    self.send_header('Transfer-Encoding', 'chunked')
+                    self.end_headers()
+                    for i in range(0, len(body), 16384):
+                        piece = body[i:i + 16384]
+                        self.wfile.write(b'%x\r\n%s\r\n' % (len(piece), piece))
+                    self.wfile.write(b'0\r\n\r\n')
+                    return
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self.url
+
+    def stop(self):
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+
+    def count(self, kind, size):
+        with self._lock:
+            self.requests[kind] = self.requests.get(kind, 0) + 1
+            self.bytes[kind] = self.bytes.get(kind, 0) + size
+
+    def reset_counts(self):
+        with self._lock:
+            self.requests = {}
+            self.bytes = {}
+
+    def stats(self):
+        with self._lock:
+            return {'requests': dict(self.requests), 'bytes': dict(self.bytes)}
+
+    def expected_status(self, image_id, max_bytes=None):
+        """Status sysco_images.py should give an id: ok, broken, placeholder or, over max_bytes, too_large"""
+        if _share(image_id, 'broken') < self.broken_rate + self.error_page_rate:
+            return 'broken'
+        if _share(image_id, 'placeholder') < self.placeholder_rate:
+            return 'placeholder'
+        if max_bytes is not None and len(self.body(image_id)[0]) > max_bytes:
+            return 'too_large'
+        return 'ok'
+
+    def respond(self, path, request_headers):
+        """(kind, status, headers, body) for a request"""
+        parts = urlsplit(path)
+        if parts.path != RENDITION_PATH:
+            return 'other', 404, {'Content-Type': 'text/html'}, b"<html><body>Not found</body></html>"
+        image_id = parse_qs(parts.query).get('id', [''])[0]
+        if self.latency:
+            time.sleep(self.latency)
+
+        broken = _share(image_id, 'broken')
+        if broken < self.broken_rate:
+            return 'broken', 404, {'Content-Type': 'text/html'}, ERROR_PAGE
+        if broken < self.broken_rate + self.error_page_rate:
+            return 'error_page', 200, {'Content-Type': 'text/html'}, ERROR_PAGE
+
+        body, kind = self.body(image_id)
+        etag = f'"{hashlib.sha256(body).hexdigest()[:16]}"'
+        headers = {'Content-Type': 'image/png', 'ETag': etag, 'Last-Modified': self.last_modified,
+                   'Cache-Control': 'max-age=86400'}
+        if self.not_modified(request_headers, etag):
+            return 'not_modified', 304, {'ETag': etag, 'Last-Modified': self.last_modified}, b''
+        return kind, 200, headers, body
+
+    def body(self, image_id):
+        """(PNG bytes, kind) served for an id that is not broken"""
+        if _share(image_id, 'placeholder') < self.placeholder_rate:
+            return self.placeholder, 'placeholder'
+        if _share(image_id, 'large') < self.large_rate:
+            return self.image(f"large-{image_id}", self.large_size), 'large'
+        shared = _share(image_id, 'shared')
+        seed = f"shared-{int(shared * 1000) % 20}" if shared < self.shared_rate else image_id
+        return self.image(seed), 'image'
+
+    def not_modified(self, request_headers, etag):
+        if request_headers.get('If-None-Match'):
+            return etag in request_headers['If-None-Match']
+        since = request_headers.get('If-Modified-Since')
+        if since:
+            try:
+                return parsedate_to_datetime(since) >= parsedate_to_datetime(self.last_modified)
+            except (TypeError, ValueError):
+                return False
+        return False
+
+    def image(self, seed, size=None):
+        with self._lock:
+            if seed not in self.images:
+                self.images[seed] = png_bytes(size or self.size, size or self.size, seed)
+            return self.images[seed]
+
+
+def rewrite_csv(input_path, output_path, base_url, limit=None):
+    """Copy a scraped CSV with picture_urls pointed at the image site; returns the rendition ids written"""
+    with open(input_path, newline='', encoding='utf-8') as f:
+        reader = csv.DictReader(f)
+        fieldnames = reader.fieldnames
+        rows = list(reader)[:limit]
+    ids = []
+    for row in rows:
+        if row.get('picture_url'):
+            image_id = rendition_id(row['picture_url'])
+            row['picture_url'] = f"{base_url}{RENDITION_PATH}?id={image_id}&ht=225&wd=225"
+            ids.append(image_id)
+    with open(output_path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=fieldnames)
+        writer.writeheader()
+        writer.writerows(rows)
+    return ids
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve local stand-ins for the product images of a CSV")
+    parser.add_argument('csv', nargs='?', default=os.path.join(ROOT, 'sysco_products_oregon_full.csv'))
+    parser.add_argument('--port', type=int, default=8766)
+    parser.add_argument('--latency', type=float, default=0.0, metavar='MS',
+                        help="delay added to every image")
+    parser.add_argument('--rewrite', default=None, metavar='PATH',
+                        help="also write a copy of the CSV whose picture_urls point at this site")
+    args = parser.parse_args()
+
+    site = ImageSite(latency=args.latency / 1000)
+    url = site.start(port=args.port)
+    if args.rewrite:
+        ids = rewrite_csv(args.csv, args.rewrite, url)
+        print(f"Wrote {args.rewrite} with {len(ids)} image URLs")
+    print(f"Serving images at {url}{RENDITION_PATH} (Ctrl+C to stop)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        site.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,36 @@
 #!/usr/bin/env python3
 
-import csv
+import argparse
+import asyncio
+import cProfile
+import os
 import time
 import logging
 import re
+import socket
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from selenium import webdriver
+from selenium.common.exceptions import TimeoutException, WebDriverException
 from selenium.webdriver.common.by import By
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
+from urllib3.exceptions import HTTPError as Urllib3Error
+
+from sysco_archive import PageArchive, parse_pages
+from sysco_cache import PageCache
+from sysco_checkpoint import RunCheckpoint
+from sysco_html import extract_listing_records, parse_html
+from sysco_http import HTTP_AVAILABLE, AsyncPageFetcher, session_state_from_driver
+from sysco_metrics import Metrics
+from sysco_packaging import HINT as PACKAGING_HINT, find_packaging
+from sysco_pagination import EmptyPage, PaginationPlan, listing_counts_from_driver, listing_counts_from_tree
+from sysco_queue import LeaseHeartbeat, SkuStore, WorkQueue
+from sysco_ratelimit import PageThrottled, RequestScheduler, looks_throttled, page_text
+from sysco_readiness import PageReadiness
+from sysco_sinks import PARQUET_AVAILABLE, SINK_TYPES, ProductRecord, QueueSink, open_sink
+from sysco_sku_index import SkuIndex
 
 logging.basicConfig(
     level=logging.INFO, 
@@ -19,13 +41,383 @@ logging.basicConfig(
     ]
 )
 
+# A dead chromedriver makes WebDriver calls raise urllib3 or socket errors rather than WebDriverException
+BROWSER_ERRORS = (WebDriverException, Urllib3Error, ConnectionError)
+
+# Collects every product tile on a listing page in one round trip. Mirrors the
+# per-element path: container lookup, then the first element each selector
+# matches; the Python side applies the same acceptance rules to the results.
+LISTING_EXTRACTION_JS = """
+const [linkSelectors, keywords, nameSelectors, brandSelectors, packagingSelectors, imgSelectors] = arguments;
+const visibleText = el => (el && el.getClientRects().length ? (el.innerText || '') : '');
+const first = (root, selector) => {
+    try { return root.querySelector(selector); } catch (e) { return null; }
+};
+const firstText = (root, selector) => {
+    const el = first(root, selector);
+    return el ? visibleText(el) : null;
+};
+
+let links = [];
+for (const selector of linkSelectors) {
+    links = Array.from(document.querySelectorAll(selector));
+    if (links.length) break;
+}
+
+const seen = new Set();
+const records = [];
+for (const link of links) {
+    const href = link.href;
+    const match = href && href.match(/\\/product\\/(\\d+)/);
+    if (!match || seen.has(match[1])) continue;
+    seen.add(match[1]);
+
+    let container = link;
+    for (let i = 0; i < 5; i++) {
+        const parent = container.parentElement;
+        if (!parent) break;
+        const cls = (parent.getAttribute('class') || '').toLowerCase();
+        container = parent;
+        if (cls && keywords.some(k => cls.includes(k))) break;
+    }
+
+    // One entry per (area, selector), null where the selector matched nothing
+    const imageSrcs = [];
+    for (const area of [link, container]) {
+        for (const selector of imgSelectors) {
+            const img = first(area, selector);
+            imageSrcs.push(img ? (img.getAttribute('data-src') || img.src || '') : null);
+        }
+    }
+
+    records.push({
+        href: href,
+        link_text: visibleText(link),
+        name_texts: nameSelectors.map(s => firstText(container, s)),
+        brand_texts: brandSelectors.map(s => firstText(container, s)),
+        packaging_texts: packagingSelectors.map(s => firstText(container, s)),
+        container_text: visibleText(container),
+        image_srcs: imageSrcs
+    });
+}
+return records;
+"""
+
+
+# Detail URLs of the product tiles on a listing page, for fetch-only runs
+LISTING_LINKS_JS = """
+for (const selector of arguments[0]) {
+    const links = Array.from(document.querySelectorAll(selector));
+    if (links.length) return links.map(link => link.href);
+}
+return [];
+"""
+
+
+class DriverSession:
+    """Reusable Chrome session that has already been through set_location().
+
+    The browser is started lazily on first use and recycled after
+    `recycle_after` page loads, or when it crashes mid-run.
+    """
+    def __init__(self, scraper, recycle_after=None):
+        self.scraper = scraper
+        self.recycle_after = recycle_after
+        self.driver = None
+        self.pages_served = 0
+
+    def start(self):
+        """Launch a browser and set the scraper's location on it"""
+        driver = self.scraper.setup_driver()
+        try:
+            driver.get(self.scraper.base_url)
+            self.scraper.readiness.wait_for_page(driver, 'home')
+            self.scraper.set_location(driver)
+        except Exception:
+            driver.quit()
+            raise
+        self.driver = driver
+        self.pages_served = 0
+
+    def recycle(self):
+        """Replace the current browser with a fresh one"""
+        logging.info(f"Recycling browser after {self.pages_served} pages")
+        self.quit()
+        self.start()
+
+    def get(self, url):
+        """Load a page under the scheduler's limits, recycling the browser when it is due or has crashed"""
+        if self.driver is None:
+            self.start()
+        elif self.recycle_after and self.pages_served >= self.recycle_after:
+            self.recycle()
+        
+        scheduler = self.scraper.scheduler
+        attempt = 0
+        while True:
+            scheduler.acquire(url, retry=attempt > 0)
+            start = time.perf_counter()
+            outcome = 'error'
+            try:
+                with self.scraper.metrics.time('page_load'):
+                    self.driver.get(url)
+                outcome = 'ok'
+                break
+            except BROWSER_ERRORS as e:
+                delay = scheduler.retry_delay(url, attempt)
+                if delay is None:
+                    raise
+                logging.warning(f"Browser failed loading {url}: {e.__class__.__name__}, "
+                                f"restarting and retrying in {delay:.1f}s")
+            finally:
+                # Whatever happened, the host slot is given back
+                scheduler.release(url, outcome, time.perf_counter() - start)
+            self.recycle()
+            time.sleep(delay)
+            attempt += 1
+        self.pages_served += 1
+
+    def quit(self):
+        if self.driver is not None:
+            try:
+                self.driver.quit()
+            except Exception:
+                pass
+            self.driver = None
+
+    def __getattr__(self, name):
+        if self.driver is None:
+            self.start()
+        return getattr(self.driver, name)
+
+
+class SessionPool:
+    """Thread pool where every worker thread owns one DriverSession"""
+    def __init__(self, scraper, workers, recycle_after=None):
+        self.scraper = scraper
+        self.recycle_after = recycle_after
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='sysco-worker')
+        self._local = threading.local()
+        self._sessions = []
+        self._lock = threading.Lock()
+
+    def _session(self):
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = DriverSession(self.scraper, self.recycle_after)
+            self._local.session = session
+            with self._lock:
+                self._sessions.append(session)
+        return session
+
+    def _call(self, fn, *args):
+        return fn(self._session(), *args)
+
+    def submit(self, fn, *args):
+        """Run fn(session, *args) on the next free worker"""
+        return self.executor.submit(self._call, fn, *args)
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+        for session in self._sessions:
+            session.quit()
+
+
+class DetailEnricher:
+    """Fetches product detail pages on its own pool of browser sessions.
+    
+    Coverage policies:
+      all       - every product on every listing page
+      missing   - only products missing brand, packaging or image
+      sample:N  - the first N products per listing page
+    """
+    def __init__(self, scraper, workers=4, coverage="all", recycle_after=None):
+        self.scraper = scraper
+        self.workers = workers
+        self.recycle_after = recycle_after
+        self.coverage = coverage
+        self.sample_size = None
+        if coverage.startswith("sample:"):
+            self.sample_size = int(coverage.split(":", 1)[1])
+        elif coverage not in ("all", "missing"):
+            raise ValueError(f"Unknown description coverage policy: {coverage}")
+        
+        self.pool = None
+        self.pages_fetched = 0
+        self.descriptions_found = 0
+        self.started_at = None
+        self.finished_at = None
+        self._lock = threading.Lock()
+    
+    def select(self, products):
+        """Products that need a detail page visit under the coverage policy"""
+        if self.sample_size is not None:
+            return products[:self.sample_size]
+        if self.coverage == "missing":
+            return [p for p in products
+                    if not (p['brand_name'] and p['packaging_info'] and p['picture_url'])]
+        return list(products)
+    
+    def enrich(self, products):
+        """Fetch detail pages for a batch of products and drop their detail URLs.
+        
+        Returns the products whose detail pages were visited.
+        """
+        selected = [p for p in self.select(products) if p.get('product_url')]
+        if selected:
+            with self._lock:
+                if self.pool is None:
+                    self.pool = SessionPool(self.scraper, self.workers, self.recycle_after)
+            futures = [self.pool.submit(self._fetch, product) for product in selected]
+            for future in futures:
+                future.result()
+        
+        for product in products:
+            product.pop('product_url', None)
+        return selected
+    
+    def _fetch(self, driver, product):
+        with self._lock:
+            if self.started_at is None:
+                self.started_at = time.time()
+        with self.scraper.metrics.time('detail_page'):
+            found = self.scraper.fetch_product_details(driver, product)
+        self.scraper.metrics.incr('descriptions', result='found' if found else 'missing')
+        with self._lock:
+            self.pages_fetched += 1
+            if found:
+                self.descriptions_found += 1
+            self.finished_at = time.time()
+    
+    def pages_per_second(self):
+        if not self.pages_fetched or self.finished_at is None:
+            return 0.0
+        return self.pages_fetched / max(self.finished_at - self.started_at, 1e-6)
+    
+    def summary(self):
+        return (f"Detail pages: {self.pages_fetched} fetched, {self.descriptions_found} with descriptions, "
+                f"{self.pages_per_second():.2f} pages/sec on {self.workers} workers")
+    
+    def close(self):
+        if self.pool is not None:
+            self.pool.close()
+            self.pool = None
+
+
 class FinalSyscoScraper:
-    def __init__(self, zip_code="97205", fetch_descriptions=False):
+    CATEGORIES = [
+        ("Produce", "syy_cust_tax_produce"),
+        ("Dairy & Eggs", "syy_cust_tax_dairyeggs"),
+        ("Meat & Seafood", "syy_cust_tax_meatseafood"),
+        ("Bakery & Bread", "syy_cust_tax_bakerybread"),
+        ("Beverages", "syy_cust_tax_beverages"),
+        ("Canned & Dry", "syy_cust_tax_canneddry"),
+        ("Frozen Foods", "syy_cust_tax_frozenfoods"),
+        ("Chemicals", "syy_cust_tax_chemicals"),
+        ("Disposables", "syy_cust_tax_disposables"),
+        ("Equipment & Supplies", "syy_cust_tax_equipmentsupplies"),
+        ("Fruit & Vegetables", "syy_cust_tax_fruitvegetables"),
+    ]
+    
+    MAX_PAGES = 100  # Page limit for categories whose result count cannot be read
+    
+    # Selector fallback chains shared by the per-element and batched extraction paths
+    LINK_SELECTORS = ['a[href*="/opco/"][href*="/product/"]', 'a[href*="/product/"]']
+    CONTAINER_KEYWORDS = ['product', 'item', 'card', 'tile']
+    NAME_SELECTORS = ['h3', 'h4', '[class*="title"]', '[class*="name"]']
+    BRAND_SELECTORS = ['[class*="brand"]', '[class*="manufacturer"]', 'button[data-id="product_brand_link"]']
+    PACKAGING_SELECTORS = [
+        '[class*="pack"]', '[class*="size"]', '[data-id*="pack"]',
+        '[data-testid*="pack"]', '.product-size', '.pack-size'
+    ]
+    LISTING_IMG_SELECTORS = [
+        'img',
+        'img[data-testid*="product"]',
+        'img[class*="product-image"]', 
+        'img[src*="mediacdn"]',
+        'img[data-src*="mediacdn"]'
+    ]
+    DESCRIPTION_FALLBACK_SELECTORS = [
+        "div[class*='product-description']",
+        "[class*='description-text']",
+        "div[class*='description'] p",
+        ".product-details-description",
+        "[data-testid*='description']"
+    ]
+    # Lean browser profile: only the DOM and its attributes are read, never pixels,
+    # fonts or tracking, so those requests are blocked outright
+    LEAN_BLOCKED_URLS = [
+        "*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.avif", "*.svg", "*.ico",
+        "*.woff", "*.woff2", "*.ttf", "*.otf", "*.eot",
+        "*.mp4", "*.webm", "*.m3u8", "*.mp3",
+        "*mediacdn.sysco.com/images/*",
+        "*google-analytics.com*", "*googletagmanager.com*", "*doubleclick.net*",
+        "*facebook.net*", "*hotjar.com*", "*nr-data.net*", "*newrelic.com*",
+        "*segment.io*", "*optimizely.com*", "*quantummetric.com*", "*/analytics.js*",
+    ]
+    LEAN_CHROME_ARGUMENTS = [
+        '--blink-settings=imagesEnabled=false',
+        '--disable-remote-fonts',
+        '--mute-audio',
+        '--disable-gpu',
+        '--disable-extensions',
+        '--disable-background-networking',
+        '--disable-component-update',
+        '--disable-default-apps',
+        '--disable-sync',
+        '--no-first-run',
+        '--disable-features=Translate,MediaRouter,OptimizationHints,AutofillServerCommunication',
+    ]
+    DETAIL_IMG_SELECTORS = [
+        "img.product-image", "img[class*='main-image']", "img[alt*='product']",
+        ".product-image-container img", ".image-gallery img", "img[src*='mediacdn']",
+        "img[data-src*='mediacdn']"
+    ]
+
+    def __init__(self, zip_code="97205", fetch_descriptions=False, workers=1, recycle_after_pages=None,
+                 batch_extraction=True, fetch_backend="selenium", http_concurrency=8,
+                 description_workers=4, description_coverage="all",
+                 outputs=("sysco_products_oregon.csv",), index_path=None, incremental=False,
+                 cache=None, replay=False, base_url="https://shop.sysco.com",
+                 profile_dir=None, browser_profile="default", sku_store=None,
+                 max_rate=None, max_concurrency=32, max_retries=4,
+                 archive=None, fetch_only=False):
         self.zip_code = zip_code
-        self.base_url = "https://shop.sysco.com"
-        self.products = []
+        self.base_url = base_url
         self.processed_skus = set()
         self.fetch_descriptions = fetch_descriptions  # Control whether to fetch descriptions
+        self.workers = workers  # Number of parallel browser sessions
+        self.recycle_after_pages = recycle_after_pages  # Restart each browser after N page loads
+        self.batch_extraction = batch_extraction  # One execute_script call per listing page
+        self.fetch_backend = fetch_backend  # "selenium" or "http" for listing pages
+        self.http_concurrency = http_concurrency  # Concurrent listing requests in HTTP mode
+        self.description_workers = description_workers  # Browser sessions for detail pages
+        self.description_coverage = description_coverage  # all, missing or sample:N
+        self.enricher = None
+        self.metrics = Metrics()  # Stage latencies, counters and selector hit/miss statistics
+        self.profile_dir = profile_dir  # Write a cProfile dump per category here when set
+        self.browser_profile = browser_profile  # "default" or "lean" (no images, fonts or trackers, eager loads)
+        self.readiness = PageReadiness(self.metrics)  # Signal-based waits with adaptive timeouts
+        # Per-host rate limit, adaptive concurrency and retries for every page fetch
+        self.scheduler = RequestScheduler(max_rate=max_rate, max_concurrency=max_concurrency,
+                                          max_retries=max_retries, metrics=self.metrics)
+        self.archive = archive  # PageArchive that gets a snapshot of every page loaded
+        self.fetch_only = fetch_only  # Only load and archive pages: no field extraction and no outputs
+        self.outputs = [] if fetch_only else list(outputs or [])  # Files appended to page by page, format from the extension
+        self.sinks = []
+        self.checkpoint = None
+        self.category_counts = {}  # Products written per category, including resumed pages
+        self.run_count = 0  # Products written by this run
+        self.description_count = 0
+        self.incremental = incremental  # Skip detail pages for SKUs unchanged since the last run
+        self.sku_index = SkuIndex(index_path) if index_path else None
+        self.completed_categories = []
+        self.plans = {}  # category -> PaginationPlan, for categories whose pages run as separate units
+        self.cache = cache  # PageCache under listing and detail fetches
+        self.replay = replay  # Extract from cached pages only, never touching the site
+        self.sku_store = sku_store  # SkuStore shared by queue workers for cross-region dedup
+        self._tiles = threading.local()  # Distinct SKUs on the page this thread extracted last, before dedup
+        self._lock = threading.Lock()
         
     def setup_driver(self):
         """Chrome driver setup"""
@@ -35,112 +427,540 @@ class FinalSyscoScraper:
         options.add_argument('--disable-dev-shm-usage')
         options.add_argument('--window-size=1920,1080')
         options.add_argument('--disable-blink-features=AutomationControlled')
-        return webdriver.Chrome(options=options)
+        # CDP network events feed the readiness engine's network-idle signal
+        options.set_capability('goog:loggingPrefs', {'performance': 'ALL'})
+        if self.browser_profile == "lean":
+            # Return once the DOM is parsed; the readiness waits decide when the page is usable
+            options.page_load_strategy = 'eager'
+            for argument in self.LEAN_CHROME_ARGUMENTS:
+                options.add_argument(argument)
+        driver = webdriver.Chrome(options=options)
+        if self.browser_profile == "lean":
+            try:
+                driver.execute_cdp_cmd('Network.enable', {})
+                driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': self.LEAN_BLOCKED_URLS})
+            except WebDriverException as e:
+                logging.warning(f"Could not block heavy resources: {e.__class__.__name__}")
+        return driver
     
     def set_location(self, driver):
         """Set Oregon zip code"""
+        zip_selector = "input[data-id='initial_zipcode_modal_input']"
         try:
             wait = WebDriverWait(driver, 3)
             guest_btn = wait.until(EC.element_to_be_clickable((By.XPATH, "//button[contains(text(), 'Guest')]")))
             guest_btn.click()
-            time.sleep(1)
-        except:
-            pass
+            self.readiness.wait_for_element(driver, zip_selector)
+        except TimeoutException:
+            logging.debug("No guest button shown")
+        except WebDriverException as e:
+            logging.warning(f"Could not continue as guest: {e.__class__.__name__}")
             
         try:
-            zip_input = driver.find_element(By.CSS_SELECTOR, "input[data-id='initial_zipcode_modal_input']")
+            zip_input = driver.find_element(By.CSS_SELECTOR, zip_selector)
             zip_input.clear()
             zip_input.send_keys(self.zip_code)
             zip_input.send_keys('\n')
-            time.sleep(2)
-            logging.info(f"Set location to {self.zip_code}")
-        except:
-            logging.warning("Could not set location")
+            if self.readiness.wait_for_element_gone(driver, zip_selector):
+                logging.info(f"Set location to {self.zip_code}")
+            else:
+                logging.warning(f"Could not confirm location {self.zip_code}: the zip code prompt is still shown")
+        except TimeoutException:
+            logging.warning("Could not set location: TimeoutException")
+        except WebDriverException as e:
+            logging.warning(f"Could not set location: {e.__class__.__name__}")
     
-    def extract_from_listing(self, driver, category_name, category_id):
-        """Extract products from listing pages"""
-        category_products = []
-        consecutive_empty_pages = 0
-        max_pages = 100
+    def extract_from_listing(self, driver, category_name, category_id, pending=None):
+        """Extract products from listing pages; returns how many were found.
         
-        for page in range(1, max_pages + 1):
-            url = f"{self.base_url}/app/catalog?BUSINESS_CENTER_ID={category_id}&page={page}"
-            driver.get(url)
-            
-            wait = WebDriverWait(driver, 5)
-            time.sleep(1)
-            
-            page_products = []
-            
-            try:
-                wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, 'a[href*="/product/"]')))
-            except:
-                pass
-            
-            all_links = driver.find_elements(By.CSS_SELECTOR, 'a[href*="/opco/"][href*="/product/"]')
-            
-            if not all_links:
-                all_links = driver.find_elements(By.CSS_SELECTOR, 'a[href*="/product/"]')
+        With a `pending` list, pages after the first are appended to it once
+        the page plan is known instead of being scraped here, so a parallel
+        run can hand them to other workers.
+        """
+        category_total = 0
+        plan = self.plan_for(category_name)
+        
+        for page in plan:
+            completed = self.completed_page_count(category_name, page)
+            if completed is not None:
+                plan.record(page, completed)
+                logging.info(f"{category_name} - Page {page}: Completed in a previous run ({completed} products)")
+            else:
+                category_total += self.scrape_listing_page(driver, category_name, category_id, page, plan)
             
-            link_data = []
-            for link in all_links:
+            if pending is not None and page == 1 and plan.total_pages is not None:
+                self.plans[category_name] = plan
+                pending.extend(plan.pages_after(1))
+                return category_total
+        
+        self.log_plan_end(category_name, plan, page)
+        return category_total
+    
+    def scrape_listing_page(self, driver, category_name, category_id, page, plan=None):
+        """Load, extract and finish one listing page; returns how many products it added.
+        
+        Page 1 of a category without a page plan also has its result count
+        and page size read to fix the plan.
+        """
+        url = self.listing_url(category_id, page)
+        read_counts = page == 1 and plan is not None and plan.total_pages is None
+        counts = (None, 0)
+        html = self.cache_get(url, 'listing')
+        if html is not None:
+            self.metrics.incr('pages', type='listing', source='cache')
+            self.archive_page(url, 'listing', html, category=category_name, page=page)
+            root = parse_html(html, url)
+            with self.metrics.time('listing_extract'):
+                page_products = self.extract_listing_html(root, url, category_name)
+            tiles = self.take_tile_count()
+            if read_counts:
+                counts = listing_counts_from_tree(root, self.LINK_SELECTORS)
+        elif self.replay:
+            logging.info(f"{category_name} - Page {page}: Not in cache")
+            page_products, tiles = [], 0
+        else:
+            page_products, tiles = self.load_listing_page(driver, url, category_name, page)
+            if read_counts:
                 try:
-                    href = link.get_attribute('href')
-                    if href:
-                        link_data.append((link, href))
-                except:
-                    continue
+                    counts = listing_counts_from_driver(driver, self.LINK_SELECTORS)
+                except WebDriverException as e:
+                    logging.warning(f"{category_name}: Could not read the result count: {e.__class__.__name__}")
+        
+        if read_counts:
+            self.apply_plan(plan, category_name, *counts)
+        self.finish_listing_page(driver, category_name, page, page_products, plan, tiles=tiles)
+        return len(page_products)
+    
+    def load_listing_page(self, driver, url, category_name, page):
+        """Load and extract a listing page in the browser, retrying it while it comes back throttled.
+        
+        Returns the page's new products and its tile count (see take_tile_count).
+        """
+        attempt = 0
+        while True:
+            self.metrics.incr('pages', type='listing', source='browser')
+            driver.get(url)
+            self.readiness.wait_for_listing(driver)
+            with self.metrics.time('listing_extract'):
+                if self.fetch_only:
+                    page_products = self.listing_links(driver, category_name)
+                else:
+                    page_products = self.extract_page_products(driver, category_name)
+            tiles = self.take_tile_count()
+            if tiles or not looks_throttled(text=page_text(driver)):
+                self.store_page(url, 'listing', driver, category=category_name, page=page)
+                return page_products, tiles
             
-            for link, href in link_data:
-                try:
-                    sku = self.extract_sku_from_url(href)
-                    if not sku or sku in self.processed_skus:
+            self.scheduler.throttled(url)
+            delay = self.scheduler.retry_delay(url, attempt)
+            if delay is None:
+                raise PageThrottled(f"{url} was still throttled after {attempt + 1} attempts")
+            logging.warning(f"{category_name}: Throttled on {url}, retrying in {delay:.1f}s")
+            time.sleep(delay)
+            attempt += 1
+    
+    def finish_listing_page(self, driver, category_name, page, page_products, plan=None, via="", tiles=None):
+        """Enrich, write and checkpoint a listing page's products.
+        
+        `tiles` is the number of distinct SKUs the page listed, including
+        ones already written from earlier pages; the plan counts those.
+        An empty page in the middle of a planned category is not checkpointed:
+        EmptyPage is raised so the page is scraped again. If enriching or
+        writing fails, the page's SKUs are released so a retry writes them.
+        """
+        if tiles is None:
+            tiles = len(page_products)
+        if plan is not None:
+            if not tiles and plan.mid_category(page):
+                raise EmptyPage(f"{category_name} page {page} of {plan.total_pages} came back empty")
+            with self._lock:
+                plan.record(page, tiles)
+            if plan.beyond_plan(page):
+                logging.warning(f"{category_name} - Page {page}: Still {tiles} products at the end of "
+                                f"the {plan.total_pages}-page plan ({plan.collected} of {plan.result_count} results "
+                                f"found), also scraping page {page + 1}")
+        claimed = [p['sku'] for p in page_products]
+        try:
+            if self.sku_store is not None and page_products:
+                # Products another region or worker already wrote only count towards this zip's availability
+                page_products = self.sku_store.claim(self.zip_code, category_name, page, page_products)
+            if page_products:
+                self.complete_page(driver, category_name, page, page_products)
+            self.page_done(category_name, page, page_products)
+        except Exception:
+            self.release_skus(category_name, page, claimed)
+            raise
+        
+        if page_products:
+            logging.info(f"{category_name} - Page {page}: Found {len(page_products)} products{via} "
+                         f"(Total: {self.category_counts.get(category_name, 0)})")
+        elif plan is not None and plan.total_pages is None:
+            logging.info(f"{category_name} - Page {page}: No products found (empty pages: {plan.consecutive_empty})")
+        else:
+            logging.info(f"{category_name} - Page {page}: No products found")
+    
+    def plan_for(self, category_name):
+        """Page plan for a category, exact if an earlier run of this checkpoint read its result count"""
+        total_pages = result_count = page_size = None
+        if self.checkpoint:
+            total_pages = self.checkpoint.plans.get(category_name)
+            result_count, page_size = self.checkpoint.plan_counts.get(category_name, (None, None))
+        return PaginationPlan(self.MAX_PAGES, total_pages=total_pages, result_count=result_count, page_size=page_size)
+    
+    def apply_plan(self, plan, category_name, result_count, page_size):
+        """Fix a category's page list from page 1's result count and page size"""
+        if plan.set_count(result_count, page_size):
+            logging.info(f"{category_name}: {result_count} results, {page_size} per page, "
+                         f"{plan.total_pages} pages to scrape")
+            if self.checkpoint:
+                with self._lock:
+                    self.checkpoint.record_plan(category_name, plan.total_pages, result_count, page_size)
+        else:
+            logging.info(f"{category_name}: No result count on page 1, scraping until "
+                         f"{plan.empty_limit} pages in a row are empty")
+    
+    def log_plan_end(self, category_name, plan, page):
+        if plan.total_pages is not None:
+            return
+        if plan.truncated(page):
+            logging.warning(f"{category_name}: Stopped at the {plan.max_pages}-page limit, "
+                            f"the category may have more products")
+        else:
+            logging.info(f"{category_name}: Stopping after {plan.consecutive_empty} empty pages")
+    
+    def listing_links(self, driver, category_name):
+        """Bare products (SKU and detail URL) for the tiles on a listing page, for fetch-only runs"""
+        hrefs = driver.execute_script(LISTING_LINKS_JS, self.LINK_SELECTORS) or []
+        self.count_tiles(self.extract_sku_from_url(href or '') for href in hrefs)
+        page_products = []
+        for href in hrefs:
+            sku = self.extract_sku_from_url(href or '')
+            if sku and sku not in self.processed_skus and self.claim_sku(sku):
+                page_products.append({'category': category_name, 'product_name': '', 'brand_name': '', 'sku': sku,
+                                      'packaging_info': '', 'picture_url': '', 'description': '', 'product_url': href})
+        return page_products
+    
+    def store_page(self, url, page_type, source, **meta):
+        """Put a freshly loaded page in the cache and the archive; `source` is its HTML or the driver showing it"""
+        if self.cache is None and self.archive is None:
+            return
+        html = source if isinstance(source, str) else source.page_source
+        self.cache_put(url, page_type, html)
+        self.archive_page(url, page_type, html, **meta)
+    
+    def archive_page(self, url, page_type, html, **meta):
+        if self.archive is not None:
+            self.archive.append(html, url=url, page_type=page_type, zip_code=self.zip_code, **meta)
+    
+    def cache_get(self, url, page_type):
+        """Cached HTML for a page; in replay mode expired entries are still used"""
+        if self.cache is None:
+            return None
+        return self.cache.get(url, self.zip_code, page_type, allow_stale=self.replay)
+    
+    def cache_put(self, url, page_type, html):
+        if self.cache is not None:
+            self.cache.put(url, self.zip_code, page_type, html)
+    
+    def count_tiles(self, skus):
+        """Remember how many distinct SKUs the page being extracted lists, before dedup against earlier pages"""
+        self._tiles.count = len(set(sku for sku in skus if sku))
+    
+    def take_tile_count(self):
+        """Tile count of the page this thread extracted last; 0 once taken, so a page never reuses another's"""
+        count = getattr(self._tiles, 'count', 0)
+        self._tiles.count = 0
+        return count
+    
+    def extract_listing_html(self, html, url, category_name):
+        """Extract products from listing HTML fetched without the browser or read from the cache"""
+        records = extract_listing_records(
+            html, url, self.LINK_SELECTORS, self.CONTAINER_KEYWORDS,
+            self.NAME_SELECTORS, self.BRAND_SELECTORS, self.PACKAGING_SELECTORS,
+            self.LISTING_IMG_SELECTORS
+        )
+        return self.build_listing_products(records, category_name)
+    
+    def listing_url(self, category_id, page):
+        return f"{self.base_url}/app/catalog?BUSINESS_CENTER_ID={category_id}&page={page}"
+    
+    def complete_page(self, driver, category_name, page, page_products):
+        """Track a page's products in the SKU index and fetch their descriptions"""
+        to_enrich = page_products
+        if self.sku_index:
+            statuses = self.sku_index.observe(page_products)
+            if self.incremental:
+                # Unchanged SKUs reuse the detail fields stored by an earlier run
+                to_enrich = [p for p, status in zip(page_products, statuses)
+                             if status != 'unchanged' or not self.sku_index.restore_details(p)]
+        
+        if self.enricher:
+            fetched = self.enricher.enrich(to_enrich)
+            logging.info(f"{category_name} - Page {page}: Fetched {len(fetched)} detail pages")
+            if self.sku_index and fetched:
+                self.sku_index.record_details(fetched)
+            
+            desc_count = sum(1 for p in page_products if p.get('description'))
+            if desc_count > 0:
+                logging.info(f"{category_name} - Page {page}: Got {desc_count} descriptions")
+        
+        for product in page_products:
+            product.pop('product_url', None)
+    
+    def extract_from_listing_http(self, driver, category_name, category_id):
+        """Extract listing pages over plain HTTP, reusing the browser's location session.
+        
+        Returns None when page 1 yields no products over HTTP so the caller
+        can fall back to the browser. This reads product links from the
+        catalog HTML, so it only helps where that HTML is rendered on the
+        server (the fixture site, recorded pages); shop.sysco.com renders
+        its catalog client-side, so there every category falls back.
+        """
+        cookies, headers = session_state_from_driver(driver)
+        return asyncio.run(self._extract_from_listing_http(driver, category_name, category_id, cookies, headers))
+    
+    async def _extract_from_listing_http(self, driver, category_name, category_id, cookies, headers):
+        category_total = 0
+        plan = self.plan_for(category_name)
+        page = 1
+        
+        async with AsyncPageFetcher(self.http_concurrency, cookies, headers, scheduler=self.scheduler,
+                                    check=self.listing_throttled) as fetcher:
+            while True:
+                # Page 1 alone decides whether HTTP works for this category and fixes the page plan;
+                # pages past a plan that fell short are fetched one at a time
+                last_page = max(plan.total_pages, page) if plan.total_pages is not None else plan.max_pages
+                window = range(page, min(page + (1 if page == 1 else self.http_concurrency), last_page + 1))
+                if not window:
+                    return category_total
+                pending = [p for p in window if self.completed_page_count(category_name, p) is None]
+                urls = {p: self.listing_url(category_id, p) for p in pending}
+                results = {}
+                for p in pending:
+                    html = self.cache_get(urls[p], 'listing')
+                    if html is not None:
+                        results[p] = (200, html)
+                to_fetch = [p for p in pending if p not in results]
+                with self.metrics.time('http_fetch'):
+                    fetched = await fetcher.fetch_all([urls[p] for p in to_fetch])
+                for p, result in zip(to_fetch, fetched):
+                    if not isinstance(result, Exception) and result[0] == 200 and not self.listing_throttled(*result):
+                        self.cache_put(urls[p], 'listing', result[1])
+                    results[p] = result
+                
+                for p in window:
+                    completed = self.completed_page_count(category_name, p)
+                    if completed is not None:
+                        plan.record(p, completed)
+                        logging.info(f"{category_name} - Page {p}: Completed in a previous run ({completed} products)")
+                        if plan.exhausted(p):
+                            self.log_plan_end(category_name, plan, p)
+                            return category_total
                         continue
                     
-                    product_container = self.find_product_container(link)
+                    result = results[p]
+                    page_products = []
+                    tiles = 0
+                    root = None
+                    failed = isinstance(result, Exception) or result[0] != 200 or self.listing_throttled(*result)
+                    if failed:
+                        if isinstance(result, Exception):
+                            reason = result.__class__.__name__
+                        else:
+                            reason = f"HTTP {result[0]}" + (" (throttled)" if self.listing_throttled(*result) else "")
+                        if p > 1:
+                            # Out of retries: leave the page unfinished rather than record it as empty
+                            raise PageThrottled(f"{category_name} page {p} failed over HTTP ({reason})")
+                        logging.warning(f"{category_name} - Page {p}: {reason}")
+                    else:
+                        self.metrics.incr('pages', type='listing', source='http')
+                        self.archive_page(urls[p], 'listing', result[1], category=category_name, page=p)
+                        root = parse_html(result[1], urls[p])
+                        with self.metrics.time('listing_extract'):
+                            page_products = self.extract_listing_html(root, urls[p], category_name)
+                        tiles = self.take_tile_count()
                     
-                    product = {
-                        'category': category_name,
-                        'product_name': self.safe_extract_text(product_container, link),
-                        'brand_name': self.safe_extract_brand(product_container),
-                        'sku': sku,
-                        'packaging_info': self.safe_extract_packaging(product_container),
-                        'picture_url': self.safe_extract_image_for_product(link, product_container, sku),
-                        'description': '',
-                        'product_url': href
-                    }
+                    if p == 1 and not tiles:
+                        return None
+                    if p == 1 and plan.total_pages is None:
+                        self.apply_plan(plan, category_name, *listing_counts_from_tree(root, self.LINK_SELECTORS))
                     
-                    if product['sku']:
-                        self.processed_skus.add(sku)
-                        page_products.append(product)
-                        
-                except Exception as e:
-                    continue
+                    self.finish_listing_page(driver, category_name, p, page_products, plan, via=" over HTTP",
+                                             tiles=tiles)
+                    category_total += len(page_products)
+                    if plan.exhausted(p):
+                        self.log_plan_end(category_name, plan, p)
+                        return category_total
+                
+                page = window.stop
+    
+    def listing_throttled(self, status, html):
+        """True for a throttled listing response; pages with product links never count as throttled"""
+        return looks_throttled(status, html if '/product/' not in html else '')
+    
+    def extract_page_products(self, driver, category_name):
+        """Extract the products on the loaded listing page, batched when possible"""
+        if self.batch_extraction:
+            try:
+                return self.extract_listing_batch(driver, category_name)
+            except WebDriverException as e:
+                logging.warning(f"Batched extraction failed, using per-element path: {e.__class__.__name__}")
+        return self.extract_listing_per_element(driver, category_name)
+    
+    def extract_listing_batch(self, driver, category_name):
+        """Extract every product tile on the page with a single execute_script round trip"""
+        records = driver.execute_script(
+            LISTING_EXTRACTION_JS, self.LINK_SELECTORS, self.CONTAINER_KEYWORDS,
+            self.NAME_SELECTORS, self.BRAND_SELECTORS, self.PACKAGING_SELECTORS,
+            self.LISTING_IMG_SELECTORS
+        ) or []
+        return self.build_listing_products(records, category_name)
+    
+    def build_listing_products(self, records, category_name):
+        """Turn raw tile records into products, applying the per-element field rules"""
+        self.count_record_selectors(records)
+        self.count_tiles(self.extract_sku_from_url(record.get('href') or '') for record in records)
+        page_products = []
+        for record in records:
+            href = record.get('href')
+            sku = self.extract_sku_from_url(href or '')
+            if not sku or sku in self.processed_skus:
+                continue
             
-            if page_products:
-                if self.fetch_descriptions and page_products:
-                    logging.info(f"{category_name} - Page {page}: Fetching descriptions for up to 3 products...")
-                    self.fetch_product_descriptions(driver, page_products)
-                    
-                    desc_count = sum(1 for p in page_products if p.get('description'))
-                    if desc_count > 0:
-                        logging.info(f"{category_name} - Page {page}: Got {desc_count} descriptions")
-                else:
-                    for product in page_products:
-                        product.pop('product_url', None)
+            product = {
+                'category': category_name,
+                'product_name': self.name_from_texts(record.get('link_text'), record.get('name_texts')),
+                'brand_name': self.brand_from_texts(record.get('brand_texts')),
+                'sku': sku,
+                'packaging_info': self.packaging_from_texts(record.get('packaging_texts'), record.get('container_text')),
+                'picture_url': self.image_from_candidates(record.get('image_srcs')),
+                'description': '',
+                'product_url': href
+            }
+            
+            if self.claim_sku(sku):
+                page_products.append(product)
+        return page_products
+    
+    def count_record_selectors(self, records):
+        """Selector hits and misses from batched records (counts only: the lookups run in one call)"""
+        chains = [('name', 'name_texts', self.NAME_SELECTORS),
+                  ('brand', 'brand_texts', self.BRAND_SELECTORS),
+                  ('packaging', 'packaging_texts', self.PACKAGING_SELECTORS),
+                  ('image', 'image_srcs', self.LISTING_IMG_SELECTORS * 2)]
+        for chain, key, selectors in chains:
+            for record in records:
+                for selector, value in zip(selectors, record.get(key) or []):
+                    self.metrics.selector(chain, selector, value is not None)
+    
+    def find_or_none(self, root, chain, selector):
+        """root.find_element() for one selector of a fallback chain, counted and timed; None on a miss"""
+        start = time.perf_counter()
+        try:
+            element = root.find_element(By.CSS_SELECTOR, selector)
+        except Exception:
+            element = None
+        self.metrics.selector(chain, selector, element is not None, time.perf_counter() - start)
+        return element
+    
+    def find_all(self, root, chain, selector):
+        """root.find_elements() for one selector of a fallback chain, counted and timed"""
+        start = time.perf_counter()
+        try:
+            elements = root.find_elements(By.CSS_SELECTOR, selector)
+        except Exception:
+            elements = []
+        self.metrics.selector(chain, selector, bool(elements), time.perf_counter() - start)
+        return elements
+    
+    def extract_listing_per_element(self, driver, category_name):
+        """Extract products with individual WebDriver calls per field"""
+        all_links = []
+        for selector in self.LINK_SELECTORS:
+            all_links = self.find_all(driver, 'link', selector)
+            if all_links:
+                break
+        
+        link_data = []
+        for link in all_links:
+            try:
+                href = link.get_attribute('href')
+                if href:
+                    link_data.append((link, href))
+            except:
+                continue
+        self.count_tiles(self.extract_sku_from_url(href) for _, href in link_data)
+        
+        page_products = []
+        for link, href in link_data:
+            try:
+                sku = self.extract_sku_from_url(href)
+                if not sku or sku in self.processed_skus:
+                    continue
                 
-                category_products.extend(page_products)
-                consecutive_empty_pages = 0
-                logging.info(f"{category_name} - Page {page}: Found {len(page_products)} products (Total: {len(category_products)})")
-            else:
-                consecutive_empty_pages += 1
-                logging.info(f"{category_name} - Page {page}: No products found (empty pages: {consecutive_empty_pages})")
+                product_container = self.find_product_container(link)
                 
-                if consecutive_empty_pages >= 3:
-                    logging.info(f"{category_name}: Stopping after {consecutive_empty_pages} empty pages")
-                    break
+                with self.metrics.time('field_name'):
+                    product_name = self.safe_extract_text(product_container, link)
+                with self.metrics.time('field_brand'):
+                    brand_name = self.safe_extract_brand(product_container)
+                with self.metrics.time('field_packaging'):
+                    packaging_info = self.safe_extract_packaging(product_container)
+                with self.metrics.time('field_image'):
+                    picture_url = self.safe_extract_image_for_product(link, product_container, sku)
                 
-        return category_products
+                product = {
+                    'category': category_name,
+                    'product_name': product_name,
+                    'brand_name': brand_name,
+                    'sku': sku,
+                    'packaging_info': packaging_info,
+                    'picture_url': picture_url,
+                    'description': '',
+                    'product_url': href
+                }
+                
+                if product['sku'] and self.claim_sku(sku):
+                    page_products.append(product)
+                    
+            except Exception as e:
+                continue
+        return page_products
+    
+    def name_from_texts(self, link_text, selector_texts):
+        """Apply the safe_extract_text() rules to pre-collected texts"""
+        text = (link_text or '').strip()
+        if text and len(text) > 5:
+            return text
+        for text in selector_texts or []:
+            text = (text or '').strip()
+            if text and 5 < len(text) < 200:
+                return text
+        return "Product Name Not Found"
+    
+    def brand_from_texts(self, selector_texts):
+        """Apply the safe_extract_brand() rules to pre-collected texts"""
+        for text in selector_texts or []:
+            text = (text or '').strip()
+            if text and len(text) < 50:
+                return text
+        return ""
+    
+    def packaging_from_texts(self, selector_texts, container_text):
+        """Apply the safe_extract_packaging() rules to pre-collected texts"""
+        for text in selector_texts or []:
+            text = (text or '').strip()
+            if text and len(text) < 50:
+                if PACKAGING_HINT.search(text):
+                    return text
+        return self.packaging_from_text(container_text or '')
+    
+    def image_from_candidates(self, srcs):
+        """Return the first valid image URL, in selector order"""
+        for src in srcs or []:
+            if src and self.is_valid_product_image(src):
+                return src
+        return ""
     
     def find_product_container(self, link):
         """Find the most specific container for a product"""
@@ -164,16 +984,11 @@ class FinalSyscoScraper:
         """Extract image URL specific to this product"""
         for search_area in [link, container]:
             try:
-                img_selectors = [
-                    'img',
-                    'img[data-testid*="product"]',
-                    'img[class*="product-image"]', 
-                    'img[src*="mediacdn"]',
-                    'img[data-src*="mediacdn"]'
-                ]
-                for selector in img_selectors:
+                for selector in self.LISTING_IMG_SELECTORS:
+                    img = self.find_or_none(search_area, 'image', selector)
+                    if img is None:
+                        continue
                     try:
-                        img = search_area.find_element(By.CSS_SELECTOR, selector)
                         src = img.get_attribute('data-src') or img.get_attribute('src')
                         if src and self.is_valid_product_image(src):
                             return src
@@ -183,103 +998,127 @@ class FinalSyscoScraper:
                 continue
         return ""
     
-    def fetch_product_descriptions(self, driver, products):
-        """Fetch descriptions from product detail pages"""
-        products_to_fetch = products[:3]
-        
-        for i, product in enumerate(products_to_fetch):
-            try:
-                driver.get(product['product_url'])
+    def fetch_product_details(self, driver, product):
+        """Fill description, brand, pack size and image from a product detail page"""
+        url = product['product_url']
+        try:
+            html = self.cache_get(url, 'detail')
+            if html is not None:
+                self.metrics.incr('pages', type='detail', source='cache')
+                self.archive_page(url, 'detail', html, sku=product['sku'])
+                return self.apply_detail_fields(parse_html(html, url), product)
+            if self.replay:
+                return False
+            
+            attempt = 0
+            while True:
+                self.metrics.incr('pages', type='detail', source='browser')
+                driver.get(url)
                 
                 if "product-details" not in driver.current_url:
                     logging.warning(f"Not on product details page: {driver.current_url}")
-                    continue
+                    return False
                 
-                wait = WebDriverWait(driver, 5)
-                time.sleep(2)
+                self.readiness.wait_for_detail(driver)
+                found = False if self.fetch_only else self.apply_detail_fields(driver, product)
+                if found or not looks_throttled(text=page_text(driver)):
+                    self.store_page(url, 'detail', driver, sku=product['sku'])
+                    return found
                 
-                description_found = False
-                try:
-                    desc_elem = wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, "div[data-id='product_description_text']")))
-                    time.sleep(1)
-                    desc_text = desc_elem.text.strip()
-                    if desc_text and desc_text != "Product description is not available" and len(desc_text) > 10:
-                        product['description'] = desc_text[:500]
-                        description_found = True
-                        logging.info(f"✓ Found description for SKU {product['sku']}: {desc_text[:50]}...")
-                except Exception as e:
-                    pass
-                
-                if not description_found:
-                    fallback_selectors = [
-                        "div[class*='product-description']",
-                        "[class*='description-text']",
-                        "div[class*='description'] p",
-                        ".product-details-description",
-                        "[data-testid*='description']"
-                    ]
-                    for selector in fallback_selectors:
-                        try:
-                            elements = driver.find_elements(By.CSS_SELECTOR, selector)
-                            for elem in elements:
-                                text = elem.text.strip()
-                                if text and len(text) > 30 and not any(skip in text.lower() for skip in ['sign in', 'add to cart', 'quantity']):
-                                    product['description'] = text[:500]
-                                    description_found = True
-                                    logging.info(f"✓ Found description with {selector} for SKU {product['sku']}: {text[:50]}...")
-                                    break
-                            if description_found:
-                                break
-                        except:
-                            continue
-                
-                if not description_found:
-                    logging.warning(f"No description found for SKU {product['sku']}")
-                
-                if not product['brand_name']:
-                    try:
-                        brand_elem = driver.find_element(By.CSS_SELECTOR, "button[data-id='product_brand_link']")
-                        product['brand_name'] = brand_elem.text.strip()
-                    except:
-                        pass
-                
-                if not product['packaging_info']:
+                self.scheduler.throttled(url)
+                delay = self.scheduler.retry_delay(url, attempt)
+                if delay is None:
+                    logging.warning(f"Detail page for {product['sku']} still throttled, giving up")
+                    return False
+                time.sleep(delay)
+                attempt += 1
+        except Exception as e:
+            logging.warning(f"Error fetching details for {product['sku']}: {e}")
+            return False
+    
+    def apply_detail_fields(self, page, product):
+        """Read detail fields from a loaded driver or a parsed cached page"""
+        try:
+            with self.metrics.time('detail_description'):
+                description_found = self.detail_description(page, product)
+            
+            if not description_found:
+                logging.warning(f"No description found for SKU {product['sku']}")
+            
+            if not product['brand_name']:
+                with self.metrics.time('detail_brand'):
+                    brand_elem = self.find_or_none(page, 'detail_brand', "button[data-id='product_brand_link']")
                     try:
-                        pack_elem = driver.find_element(By.CSS_SELECTOR, "div[data-id='pack_size']")
-                        product['packaging_info'] = pack_elem.text.strip()
+                        if brand_elem is not None:
+                            product['brand_name'] = brand_elem.text.strip()
                     except:
                         pass
-                
-                try:
-                    img_elem = driver.find_element(By.CSS_SELECTOR, "img[data-id='main-product-img-v2']")
-                    img_src = img_elem.get_attribute('src')
-                    if img_src and self.is_valid_product_image(img_src):
-                        product['picture_url'] = img_src
-                except:
+            
+            if not product['packaging_info']:
+                with self.metrics.time('detail_packaging'):
+                    pack_elem = self.find_or_none(page, 'detail_packaging', "div[data-id='pack_size']")
                     try:
-                        img_selectors = [
-                            "img.product-image", "img[class*='main-image']", "img[alt*='product']",
-                            ".product-image-container img", ".image-gallery img", "img[src*='mediacdn']",
-                            "img[data-src*='mediacdn']"
-                        ]
-                        for selector in img_selectors:
-                            try:
-                                img = driver.find_element(By.CSS_SELECTOR, selector)
-                                src = img.get_attribute('data-src') or img.get_attribute('src')
-                                if src and self.is_valid_product_image(src):
-                                    product['picture_url'] = src
-                                    break
-                            except:
-                                continue
+                        if pack_elem is not None:
+                            product['packaging_info'] = pack_elem.text.strip()
                     except:
                         pass
-                        
+            
+            with self.metrics.time('detail_image'):
+                self.detail_image(page, product)
+            
+            return description_found
+        except Exception as e:
+            logging.warning(f"Error reading details for {product['sku']}: {e}")
+            return False
+    
+    def detail_description(self, page, product):
+        """Description from the description node, then the fallback selectors"""
+        desc_elem = self.find_or_none(page, 'description', "div[data-id='product_description_text']")
+        if desc_elem is not None:
+            try:
+                desc_text = desc_elem.text.strip()
+                if desc_text and desc_text != "Product description is not available" and len(desc_text) > 10:
+                    product['description'] = desc_text[:500]
+                    logging.info(f"✓ Found description for SKU {product['sku']}: {desc_text[:50]}...")
+                    return True
             except Exception as e:
-                logging.warning(f"Error fetching details for {product['sku']}: {e}")
+                pass
+        
+        for selector in self.DESCRIPTION_FALLBACK_SELECTORS:
+            try:
+                for elem in self.find_all(page, 'description_fallback', selector):
+                    text = elem.text.strip()
+                    if text and len(text) > 30 and not any(skip in text.lower() for skip in ['sign in', 'add to cart', 'quantity']):
+                        product['description'] = text[:500]
+                        logging.info(f"✓ Found description with {selector} for SKU {product['sku']}: {text[:50]}...")
+                        return True
+            except:
                 continue
+        return False
+    
+    def detail_image(self, page, product):
+        """Main product image, or the first valid image from the fallback selectors"""
+        img_elem = self.find_or_none(page, 'detail_image', "img[data-id='main-product-img-v2']")
+        if img_elem is not None:
+            try:
+                img_src = img_elem.get_attribute('src')
+                if img_src and self.is_valid_product_image(img_src):
+                    product['picture_url'] = img_src
+                return
+            except:
+                pass
         
-        for product in products:
-            product.pop('product_url', None)
+        for selector in self.DETAIL_IMG_SELECTORS:
+            img = self.find_or_none(page, 'detail_image', selector)
+            if img is None:
+                continue
+            try:
+                src = img.get_attribute('data-src') or img.get_attribute('src')
+                if src and self.is_valid_product_image(src):
+                    product['picture_url'] = src
+                    break
+            except:
+                continue
     
     def safe_extract_text(self, container, link_element):
         """Extract product name"""
@@ -287,11 +1126,11 @@ class FinalSyscoScraper:
         if text and len(text) > 5:
             return text
         
-        common_selectors = ['h3', 'h4', '[class*="title"]', '[class*="name"]']
-        
-        for selector in common_selectors:
+        for selector in self.NAME_SELECTORS:
+            element = self.find_or_none(container, 'name', selector)
+            if element is None:
+                continue
             try:
-                element = container.find_element(By.CSS_SELECTOR, selector)
                 text = element.text.strip()
                 if text and 5 < len(text) < 200:
                     return text
@@ -301,10 +1140,11 @@ class FinalSyscoScraper:
     
     def safe_extract_brand(self, container):
         """Extract brand name"""
-        selectors = ['[class*="brand"]', '[class*="manufacturer"]', 'button[data-id="product_brand_link"]']
-        for selector in selectors:
+        for selector in self.BRAND_SELECTORS:
+            element = self.find_or_none(container, 'brand', selector)
+            if element is None:
+                continue
             try:
-                element = container.find_element(By.CSS_SELECTOR, selector)
                 text = element.text.strip()
                 if text and len(text) < 50:
                     return text
@@ -314,51 +1154,28 @@ class FinalSyscoScraper:
     
     def safe_extract_packaging(self, container):
         """Extract packaging info"""
-        packaging_selectors = [
-            '[class*="pack"]', '[class*="size"]', '[data-id*="pack"]',
-            '[data-testid*="pack"]', '.product-size', '.pack-size'
-        ]
-        
-        for selector in packaging_selectors:
+        for selector in self.PACKAGING_SELECTORS:
+            element = self.find_or_none(container, 'packaging', selector)
+            if element is None:
+                continue
             try:
-                element = container.find_element(By.CSS_SELECTOR, selector)
                 text = element.text.strip()
                 if text and len(text) < 50:
-                    if re.search(r'\d+.*(?:CT|CS|EA|LB|OZ|GAL|QT|PT)', text, re.IGNORECASE):
+                    if PACKAGING_HINT.search(text):
                         return text
             except:
                 continue
         
         try:
-            text = container.text
-            patterns = [
-                r'\b\d+[-/\d]*\s*(CT|CS|EA|LB|OZ|GAL|QT|PT)\b',
-                r'\b\d+\s*[xX]\s*\d+\s*(CT|CS|EA|LB|OZ)\b',
-                r'\b\d+\.\d+\s*(LB|OZ|GAL)\b',
-                r'\b\d+/\d+\s*(CT|CS|EA|LB|OZ)\b'
-            ]
-            
-            all_matches = []
-            for pattern in patterns:
-                matches = re.findall(pattern, text, re.IGNORECASE)
-                all_matches.extend(matches)
-            
-            if all_matches:
-                text_lines = text.split('\n')
-                for line in reversed(text_lines[-3:]):
-                    for pattern in patterns:
-                        match = re.search(pattern, line, re.IGNORECASE)
-                        if match:
-                            return match.group(0)
-                
-                for pattern in patterns:
-                    match = re.search(pattern, text, re.IGNORECASE)
-                    if match:
-                        return match.group(0)
+            return self.packaging_from_text(container.text)
         except:
             pass
         return ""
     
+    def packaging_from_text(self, text):
+        """Find a packaging pattern in free text, preferring the last lines"""
+        return find_packaging(text)
+    
     def is_valid_product_image(self, src):
         """Check if image URL is valid for a product"""
         if not src or len(src) < 10:
@@ -384,100 +1201,629 @@ class FinalSyscoScraper:
             pass
         return ""
     
-    def scrape(self, category_limit=None):
-        """Main scraping method"""
-        driver = self.setup_driver()
+    def claim_sku(self, sku):
+        """Mark a SKU as processed; False if another page or worker already has it"""
+        with self._lock:
+            if sku in self.processed_skus:
+                return False
+            self.processed_skus.add(sku)
+            return True
+    
+    def release_skus(self, category_name, page, skus):
+        """Undo claim_sku() and the SkuStore claim for a page that failed before it was written"""
+        with self._lock:
+            self.processed_skus.difference_update(skus)
+        if self.sku_store is not None:
+            self.sku_store.release(self.zip_code, category_name, page)
+    
+    def open_output(self, resume=False, sinks=()):
+        """Open the output sinks and the checkpoint journal kept next to the first output file"""
+        self.sinks = []
+        self.checkpoint = None
+        if self.outputs:
+            self.checkpoint = RunCheckpoint(f"{self.outputs[0]}.checkpoint")
+            if resume:
+                self.checkpoint.load()
+        
+        resuming = resume and self.checkpoint is not None and bool(self.checkpoint.pages)
+        if resuming:
+            self.processed_skus.update(self.checkpoint.skus)
+            if self.sku_index:
+                self.sku_index.touch(self.checkpoint.skus)
+            self.category_counts = dict(self.checkpoint.category_counts)
+            logging.info(f"Resuming: {len(self.checkpoint.pages)} pages and "
+                         f"{len(self.checkpoint.skus)} products already in {', '.join(self.outputs)}")
+        elif resume:
+            logging.info("No checkpoint found, starting a fresh run")
+        
+        for path in self.outputs:
+            self.sinks.append(open_sink(path, resume=resuming, offset=self.checkpoint.offsets.get(path)))
+        self.sinks.extend(sinks)
+        if self.checkpoint:
+            self.checkpoint.open(fresh=not resuming)
+    
+    def open_worker_output(self):
+        """Open the output sinks of a queue worker, appending to rows from its earlier runs.
+        
+        The queue records finished pages, so no checkpoint is kept.
+        """
+        self.checkpoint = None
+        self.sinks = []
+        for path in self.outputs:
+            exists = os.path.exists(path)
+            self.sinks.append(open_sink(path, resume=exists, offset=os.path.getsize(path) if exists else None))
+    
+    def close_output(self):
+        for sink in self.sinks:
+            sink.close()
+        if self.checkpoint:
+            self.checkpoint.close()
+    
+    def completed_page_count(self, category_name, page):
+        """Products from a page finished in a previous run, or None if it still needs scraping"""
+        if self.checkpoint is None:
+            return None
+        return self.checkpoint.page_count(category_name, page)
+    
+    def page_done(self, category_name, page, page_products):
+        """Hand a finished page to the sinks as compact records and record it in the checkpoint"""
+        records = [ProductRecord.from_product(p) for p in page_products]
+        with self._lock:
+            for record in records:
+                self.category_counts[record.category] = self.category_counts.get(record.category, 0) + 1
+                if record.description:
+                    self.description_count += 1
+            self.run_count += len(records)
+            if records:
+                for sink in self.sinks:
+                    with self.metrics.time(f'write_{sink.format}'):
+                        sink.write(records)
+            if self.checkpoint:
+                offsets = {sink.path: sink.position() for sink in self.sinks if sink.position() is not None}
+                self.checkpoint.record_page(category_name, page, [r.sku for r in records], offsets)
+    
+    def scrape(self, category_limit=None, resume=False, sinks=()):
+        """Main scraping method; products go to the output files and any extra sinks as pages finish"""
+        categories = list(self.CATEGORIES)
+        
+        if category_limit:
+            categories = categories[:category_limit]
+            logging.info(f"Limited to first {category_limit} categories for testing")
+        
+        self.open_output(resume, sinks)
+        
+        if self.fetch_descriptions:
+            self.enricher = DetailEnricher(self, self.description_workers, self.description_coverage,
+                                           self.recycle_after_pages)
         
         try:
-            driver.get(self.base_url)
-            time.sleep(2)
-            self.set_location(driver)
-            
-            categories = [
-                ("Produce", "syy_cust_tax_produce"),
-                ("Dairy & Eggs", "syy_cust_tax_dairyeggs"),
-                ("Meat & Seafood", "syy_cust_tax_meatseafood"),
-                ("Bakery & Bread", "syy_cust_tax_bakerybread"),
-                ("Beverages", "syy_cust_tax_beverages"),
-                ("Canned & Dry", "syy_cust_tax_canneddry"),
-                ("Frozen Foods", "syy_cust_tax_frozenfoods"),
-                ("Chemicals", "syy_cust_tax_chemicals"),
-                ("Disposables", "syy_cust_tax_disposables"),
-                ("Equipment & Supplies", "syy_cust_tax_equipmentsupplies"),
-                ("Fruit & Vegetables", "syy_cust_tax_fruitvegetables"),
-            ]
-            
-            if category_limit:
-                categories = categories[:category_limit]
-                logging.info(f"Limited to first {category_limit} categories for testing")
+            if self.workers > 1:
+                self.scrape_parallel(categories)
+            else:
+                driver = DriverSession(self, self.recycle_after_pages)
+                try:
+                    for cat_name, cat_id in categories:
+                        try:
+                            self.scrape_category(driver, cat_name, cat_id)
+                        except (PageThrottled, EmptyPage) + BROWSER_ERRORS as e:
+                            # The category stays unfinished in the checkpoint, so --resume picks it up
+                            logging.error(f"Category {cat_name} failed: {e}")
+                finally:
+                    driver.quit()
             
-            for cat_name, cat_id in categories:
-                logging.info(f"\n{'='*50}\nScraping category: {cat_name}\n{'='*50}")
-                products = self.extract_from_listing(driver, cat_name, cat_id)
-                self.products.extend(products)
-                logging.info(f"Category complete. Total products so far: {len(self.products)}")
-                self.save_to_csv(f"sysco_products_oregon_temp.csv")
+            if self.sku_index:
+                self.sku_index.finish_run(self.completed_categories)
+        finally:
+            if self.enricher:
+                self.enricher.close()
+                logging.info(self.enricher.summary())
+            logging.info(self.readiness.summary())
+            logging.info(self.scheduler.summary())
+            if self.cache:
+                logging.info(self.cache.summary())
+            self.close_output()
+        return self.category_counts
+    
+    def parse_archived_page(self, meta, html):
+        """Extract one archived page: a listing page's products, or the detail fields of a detail page"""
+        root = parse_html(html, meta['url'], use_lxml=True)
+        if meta['page_type'] == 'listing':
+            # SKUs are deduplicated across pages by parse_archive(), in archive order
+            self.processed_skus.clear()
+            return self.extract_listing_html(root, meta['url'], meta.get('category', ''))
+        product = {'sku': meta.get('sku', ''), 'brand_name': '', 'packaging_info': '',
+                   'picture_url': '', 'description': ''}
+        self.apply_detail_fields(root, product)
+        return product
+    
+    def parse_archive(self, path, workers=None):
+        """Rebuild the outputs from an archive of raw pages, parsing them on a process pool.
+
+        Detail pages are parsed first, so each listing page can be merged
+        with its details and written out as soon as it is parsed.
+        """
+        script_path = os.path.abspath(__file__)
+        self.sinks = [open_sink(p) for p in self.outputs]
+        self.checkpoint = None
+        start = time.perf_counter()
+        details = {}
+        listings = 0
+        try:
+            for _, meta, result in parse_pages(path, script_path, workers=workers, listing=False):
+                if result.get('sku'):
+                    details[result['sku']] = result
+            for _, meta, page_products in parse_pages(path, script_path, workers=workers, listing=True):
+                listings += 1
+                page_products = [p for p in page_products if self.claim_sku(p['sku'])]
+                for product in page_products:
+                    detail = details.get(product['sku'])
+                    if detail:
+                        product['description'] = detail['description']
+                        for field in ('brand_name', 'packaging_info'):
+                            product[field] = product[field] or detail[field]
+                        product['picture_url'] = detail['picture_url'] or product['picture_url']
+                    product.pop('product_url', None)
+                self.page_done(meta.get('category', ''), meta.get('page'), page_products)
+        finally:
+            self.close_output()
+        elapsed = time.perf_counter() - start
+        pages = listings + len(details)
+        logging.info(f"Parsed {pages} archived pages in {elapsed:.1f}s "
+                     f"({pages / elapsed if elapsed else 0:.1f} pages/sec)")
+        return self.category_counts
+    
+    def iter_products(self, category_limit=None, resume=False, buffer_pages=8):
+        """Scrape in a background thread, yielding ProductRecords as each page finishes"""
+        sink = QueueSink(buffer_pages)
+        errors = []
+        
+        def run():
+            try:
+                self.scrape(category_limit, resume, sinks=[sink])
+            except Exception as e:
+                errors.append(e)
+            finally:
+                sink.close()
+        
+        thread = threading.Thread(target=run, daemon=True)
+        thread.start()
+        yield from sink
+        thread.join()
+        if errors:
+            raise errors[0]
+    
+    def work(self, queue, worker_id, poll_interval=5.0):
+        """Run queued (zip code, category, page) tasks on one browser until the queue is drained"""
+        self.open_worker_output()
+        if self.fetch_descriptions:
+            self.enricher = DetailEnricher(self, self.description_workers, self.description_coverage,
+                                           self.recycle_after_pages)
+        session = DriverSession(self, self.recycle_after_pages)
+        tasks_done = 0
+        try:
+            while True:
+                task = queue.lease(worker_id, prefer_zip=self.zip_code)
+                if task is None:
+                    if queue.idle():
+                        break
+                    time.sleep(poll_interval)
+                    continue
+                tasks_done += self.run_task(session, queue, task)
+        finally:
+            session.quit()
+            if self.enricher:
+                self.enricher.close()
+                logging.info(self.enricher.summary())
+            logging.info(self.readiness.summary())
+            logging.info(self.scheduler.summary())
+            if self.cache:
+                logging.info(self.cache.summary())
+            self.close_output()
+        logging.info(f"Worker {worker_id}: Queue drained after {tasks_done} tasks")
+        return self.category_counts
+    
+    def run_task(self, session, queue, task):
+        """Scrape one leased task and report it back to the queue; True if it completed"""
+        if task.zip_code != self.zip_code:
+            self.switch_location(session, task.zip_code)
+        logging.info(f"Task {task.id}: {task.zip_code} {task.category} page {task.page} (attempt {task.attempts})")
+        written_before = self.run_count
+        plan_row = None
+        try:
+            with LeaseHeartbeat(queue, task) as heartbeat:
+                if task.page == 1:
+                    # Page 1 plans the category; its other pages become tasks for any worker
+                    next_pages = self.open_category(session, task.category, task.category_id)
+                    plan = self.plans.get(task.category) if next_pages else None
+                    if plan is not None:
+                        plan_row = (plan.total_pages, plan.result_count, plan.page_size)
+                else:
+                    plan = self.queued_plan(queue, task)
+                    next_pages = self.scrape_page_unit(session, task.category, task.category_id, task.page, plan)
+        except Exception as e:
+            logging.error(f"Task {task.id} failed: {e}")
+            queue.fail(task, e)
+            return False
+        found = plan.page_counts.get(task.page, 0) if plan is not None else 0
+        if heartbeat.lost or not queue.complete(task, self.run_count - written_before, next_pages, found, plan_row):
+            logging.warning(f"Task {task.id} was handed to another worker before it finished")
+            return False
+        return True
+    
+    def queued_plan(self, queue, task):
+        """Page plan the page-1 task of a queued category recorded, with the products found so far"""
+        row = queue.plan(task.zip_code, task.category)
+        if row is None:
+            return None
+        total_pages, result_count, page_size, found = row
+        plan = PaginationPlan(self.MAX_PAGES, total_pages=total_pages, result_count=result_count, page_size=page_size)
+        plan.collected = found
+        return plan
+    
+    def switch_location(self, session, zip_code):
+        """Move the worker to another zip code; the browser restarts so set_location() runs again"""
+        logging.info(f"Switching location from {self.zip_code} to {zip_code}")
+        with self._lock:
+            self.zip_code = zip_code
+            self.processed_skus.clear()
+        if session.driver is not None:
+            session.recycle()
+    
+    def scrape_parallel(self, categories):
+        """Scrape on a pool of browser sessions, in (category, page) units where possible.
+        
+        Each category starts as one unit that scrapes its first page. When
+        that page fixes the page plan, the remaining pages are queued as
+        separate units for any free worker; otherwise (or with the HTTP
+        backend) the first unit scrapes the whole category.
+        """
+        logging.info(f"Scraping {len(categories)} categories with {self.workers} workers")
+        pool = SessionPool(self, self.workers, self.recycle_after_pages)
+        try:
+            futures = {pool.submit(self.open_category, cat_name, cat_id): (cat_name, cat_id, None)
+                       for cat_name, cat_id in categories}
+            outstanding = {}  # category -> page units still queued or running
+            failed = set()
+            while futures:
+                done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                for future in done:
+                    cat_name, cat_id, page = futures.pop(future)
+                    try:
+                        pages = future.result()
+                    except Exception as e:
+                        where = f"Category {cat_name}" if page is None else f"{cat_name} page {page}"
+                        logging.error(f"{where} failed: {e}")
+                        failed.add(cat_name)
+                        pages = None
                     
+                    # Page units only return a page when the plan fell short
+                    outstanding[cat_name] = outstanding.get(cat_name, 1) - 1 + len(pages or [])
+                    for p in pages or []:
+                        futures[pool.submit(self.scrape_page_unit, cat_name, cat_id, p)] = (cat_name, cat_id, p)
+                    if page is None:
+                        continue
+                    
+                    if not outstanding[cat_name] and cat_name not in failed:
+                        self.finish_category(cat_name)
         finally:
-            driver.quit()
-        return self.products
+            pool.close()
     
-    def save_to_csv(self, filename="sysco_products_oregon.csv"):
-        """Save products to CSV"""
-        if not self.products:
-            logging.error("No products to save")
-            return
-            
-        with open(filename, 'w', newline='', encoding='utf-8') as f:
-            fieldnames = ['category', 'brand_name', 'product_name', 'packaging_info', 
-                         'sku', 'picture_url', 'description']
-            writer = csv.DictWriter(f, fieldnames=fieldnames)
-            writer.writeheader()
-            writer.writerows(self.products)
-            
-        logging.info(f"Saved {len(self.products)} products to {filename}")
+    def open_category(self, driver, cat_name, cat_id):
+        """First unit of a category in a parallel run; returns planned pages left for other units"""
+        pending = []
+        self.scrape_category(driver, cat_name, cat_id, pending)
+        return pending
+    
+    def scrape_page_unit(self, driver, cat_name, cat_id, page, plan=None):
+        """One planned listing page of a category, as a unit of a parallel run; returns pages to run after it.
+        
+        The unit of the planned last page returns the next page when the
+        plan looks short (see PaginationPlan.beyond_plan).
+        """
+        if plan is None:
+            plan = self.plans.get(cat_name)
+        completed = self.completed_page_count(cat_name, page)
+        if completed is None:
+            self.scrape_listing_page(driver, cat_name, cat_id, page, plan)
+        elif plan is not None:
+            with self._lock:
+                plan.record(page, completed)
+        if plan is not None and plan.beyond_plan(page):
+            return [page + 1]
+        return []
+    
+    def scrape_category(self, driver, cat_name, cat_id, pending=None):
+        """Scrape one category and checkpoint it as done; returns how many products it had.
         
-        print(f"\n{'='*50}\nSUMMARY: {len(self.products)} products scraped\n{'='*50}")
+        Pages deferred to `pending` (see extract_from_listing) are left to the
+        caller, which then finishes the category itself.
+        """
+        if self.checkpoint and cat_name in self.checkpoint.done_categories:
+            logging.info(f"{cat_name}: Completed in a previous run, skipping")
+            with self._lock:
+                self.completed_categories.append(cat_name)
+            return 0
         
-        category_counts = {}
-        for p in self.products:
-            cat = p['category']
-            category_counts[cat] = category_counts.get(cat, 0) + 1
+        logging.info(f"\n{'='*50}\nScraping category: {cat_name}\n{'='*50}")
+        profiler = self.start_profile()
+        try:
+            count = None
+            if self.fetch_backend == "http" and not self.replay:
+                count = self.extract_from_listing_http(driver, cat_name, cat_id)
+                if count is None:
+                    logging.info(f"{cat_name}: No products over HTTP, falling back to the browser")
+            if count is None:
+                count = self.extract_from_listing(driver, cat_name, cat_id, pending)
+        finally:
+            if profiler:
+                self.save_profile(profiler, cat_name)
+        if not pending:
+            self.finish_category(cat_name)
+        return count
+    
+    def finish_category(self, cat_name):
+        with self._lock:
+            logging.info(f"{cat_name}: Category complete. Total products so far: {sum(self.category_counts.values())}")
+            self.completed_categories.append(cat_name)
+            if self.checkpoint:
+                self.checkpoint.record_category(cat_name)
+    
+    def start_profile(self):
+        """cProfile for the calling thread when profile_dir is set"""
+        if not self.profile_dir:
+            return None
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError as e:
+            # Only one profiler can be active at a time on Python 3.12+
+            logging.warning(f"Not profiling this category: {e}")
+            return None
+        return profiler
+    
+    def save_profile(self, profiler, cat_name):
+        profiler.disable()
+        os.makedirs(self.profile_dir, exist_ok=True)
+        name = re.sub(r'[^a-z0-9]+', '_', cat_name.lower()).strip('_')
+        path = os.path.join(self.profile_dir, f"{name}.prof")
+        profiler.dump_stats(path)
+        logging.info(f"{cat_name}: Profile written to {path} (view with: python3 -m pstats {path})")
+    
+    def print_summary(self, category_counts=None):
+        """Print per-category product counts, by default for everything written to the outputs"""
+        if category_counts is None:
+            category_counts = self.category_counts
+        total = sum(category_counts.values())
+        
+        print(f"\n{'='*50}\nSUMMARY: {total} products scraped\n{'='*50}")
         
         for cat, count in sorted(category_counts.items()):
             print(f"{cat}: {count} products")
 
 def main():
+    parser = argparse.ArgumentParser(description="Sysco product scraper")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="number of parallel browser sessions (default: 1)")
+    parser.add_argument('--recycle-after', type=int, default=None, metavar='PAGES',
+                        help="restart each browser after this many page loads")
+    parser.add_argument('--per-element', action='store_true',
+                        help="extract listing fields with individual WebDriver calls instead of one batched script")
+    parser.add_argument('--backend', choices=['selenium', 'http'], default='selenium',
+                        help="how listing pages are fetched (default: selenium); http only finds products "
+                             "in server-rendered catalog HTML such as the fixture site's")
+    parser.add_argument('--http-concurrency', type=int, default=8,
+                        help="concurrent listing requests with --backend http (default: 8)")
+    parser.add_argument('--description-workers', type=int, default=4,
+                        help="browser sessions fetching product detail pages (default: 4)")
+    parser.add_argument('--description-coverage', default='all', metavar='POLICY',
+                        help="detail pages to visit: all, missing, or sample:N per listing page (default: all)")
+    parser.add_argument('--output', action='append', default=None, metavar='PATH',
+                        help="file products are appended to page by page, format from the extension: "
+                             ".csv, .jsonl, .db/.sqlite or .parquet; repeat for several formats "
+                             "(default: sysco_products_oregon.csv)")
+    parser.add_argument('--resume', action='store_true',
+                        help="continue the previous run from its checkpoint instead of starting over")
+    parser.add_argument('--index', default=None, metavar='DB',
+                        help="SQLite SKU index used to report added, changed and removed products")
+    parser.add_argument('--incremental', action='store_true',
+                        help="skip detail pages for SKUs unchanged since the last run (uses --index, "
+                             "default sysco_sku_index.db)")
+    parser.add_argument('--cache', default=None, metavar='DIR',
+                        help="cache listing and detail pages on disk in this directory")
+    parser.add_argument('--cache-size', type=int, default=500, metavar='MB',
+                        help="evict least recently used pages beyond this size (default: 500)")
+    parser.add_argument('--listing-ttl', type=float, default=6, metavar='HOURS',
+                        help="how long cached listing pages stay fresh (default: 6)")
+    parser.add_argument('--detail-ttl', type=float, default=168, metavar='HOURS',
+                        help="how long cached detail pages stay fresh (default: 168)")
+    parser.add_argument('--replay', action='store_true',
+                        help="extract from cached pages only, without opening a browser "
+                             "(uses --cache, default .sysco_cache)")
+    parser.add_argument('--browser-profile', choices=['default', 'lean'], default='default',
+                        help="lean blocks images, media, fonts and trackers and uses eager page loads "
+                             "(default: default)")
+    parser.add_argument('--metrics-json', default=None, metavar='PATH',
+                        help="write stage timings, counters and selector hit/miss statistics as JSON")
+    parser.add_argument('--metrics-prom', default=None, metavar='PATH',
+                        help="write the same metrics as a Prometheus textfile (e.g. for node_exporter)")
+    parser.add_argument('--profile-dir', default=None, metavar='DIR',
+                        help="write a cProfile dump for each category to this directory")
+    parser.add_argument('--max-rate', type=float, default=None, metavar='PER_SEC',
+                        help="ceiling for page requests per second per host; below it the rate adapts to "
+                             "throttling (default: no ceiling)")
+    parser.add_argument('--max-concurrency', type=int, default=32,
+                        help="ceiling for the adaptive per-host concurrency limit (default: 32)")
+    parser.add_argument('--max-retries', type=int, default=4,
+                        help="retries per page when it fails or comes back throttled (default: 4)")
+    parser.add_argument('--queue', default='sysco_queue.db', metavar='DB',
+                        help="SQLite work queue shared by --enqueue, --worker and --queue-status "
+                             "(default: sysco_queue.db)")
+    parser.add_argument('--enqueue', default=None, metavar='ZIPS',
+                        help="add every category for these comma-separated zip codes to the queue and exit")
+    parser.add_argument('--worker', action='store_true',
+                        help="scrape tasks from the queue until it is drained; start one process per worker, "
+                             "all on the host that holds --queue")
+    parser.add_argument('--worker-id', default=None, metavar='ID',
+                        help="name this worker's leases are held under (default: host-pid)")
+    parser.add_argument('--lease-seconds', type=float, default=300,
+                        help="how long a task stays leased without a heartbeat (default: 300)")
+    parser.add_argument('--max-attempts', type=int, default=3,
+                        help="attempts per task before it is marked failed (default: 3)")
+    parser.add_argument('--queue-status', action='store_true',
+                        help="print task counts per zip code and exit")
+    parser.add_argument('--retry-failed', action='store_true',
+                        help="make failed queue tasks pending again and exit")
+    parser.add_argument('--archive', default=None, metavar='PATH',
+                        help="append every page loaded to this raw page archive")
+    parser.add_argument('--fetch-only', action='store_true',
+                        help="only load pages into the --archive, leaving extraction to --parse-archive")
+    parser.add_argument('--parse-archive', default=None, metavar='PATH',
+                        help="extract products from a page archive without touching the site, then exit")
+    parser.add_argument('--parse-workers', type=int, default=None, metavar='N',
+                        help="processes parsing the archive (default: one per CPU)")
+    args = parser.parse_args()
+    
+    if args.enqueue or args.queue_status or args.retry_failed:
+        queue = WorkQueue(args.queue)
+        if args.enqueue:
+            zip_codes = [z.strip() for z in args.enqueue.split(',') if z.strip()]
+            added = queue.enqueue([(zip_code, name, category_id, 1)
+                                   for zip_code in zip_codes for name, category_id in FinalSyscoScraper.CATEGORIES])
+            print(f"Added {added} tasks for {len(zip_codes)} zip codes to {args.queue}")
+        if args.retry_failed:
+            print(f"Retrying {queue.retry_failed()} failed tasks")
+        if args.queue_status:
+            print(queue.format_status())
+            store = SkuStore(args.queue)
+            for zip_code, count in sorted(store.availability_counts().items()):
+                print(f"{zip_code}: {count} products available")
+            store.close()
+        queue.close()
+        return
+    
+    if args.worker:
+        if args.workers > 1:
+            parser.error("--worker runs one browser per process; start more worker processes instead")
+        if args.resume:
+            parser.error("--resume does not apply to --worker; the queue keeps track of finished pages")
+        if not args.worker_id:
+            args.worker_id = f"{socket.gethostname()}-{os.getpid()}"
+        if not args.output:
+            args.output = [f"sysco_products_{args.worker_id}.csv"]
+    
+    if args.replay and not args.cache:
+        args.cache = '.sysco_cache'
+    cache = None
+    if args.cache:
+        cache = PageCache(args.cache, ttls={'listing': args.listing_ttl * 3600, 'detail': args.detail_ttl * 3600},
+                          max_bytes=args.cache_size * 1024 * 1024)
+    
+    if not args.output:
+        args.output = ['sysco_products_oregon.csv']
+    for path in args.output:
+        ext = os.path.splitext(path)[1].lower()
+        if ext not in SINK_TYPES:
+            parser.error(f"unsupported output format: {path}")
+        if ext == '.parquet' and not PARQUET_AVAILABLE:
+            parser.error("pyarrow is required for Parquet output")
+    
+    if args.incremental and not args.index:
+        args.index = 'sysco_sku_index.db'
+    
+    if args.fetch_only and not args.archive:
+        parser.error("--fetch-only needs --archive to store the pages")
+    if args.fetch_only and args.index:
+        parser.error("--fetch-only extracts no fields for --index or --incremental to track")
+    
+    if args.parse_archive:
+        scraper = FinalSyscoScraper(outputs=args.output)
+        start_time = time.time()
+        scraper.parse_archive(args.parse_archive, workers=args.parse_workers)
+        scraper.print_summary()
+        print(f"\nParsed {args.parse_archive} into {', '.join(args.output)} "
+              f"in {time.time() - start_time:.1f} seconds")
+        return
+    
+    if args.backend == 'http' and not HTTP_AVAILABLE:
+        logging.warning("aiohttp is not installed, using the selenium backend")
+        args.backend = 'selenium'
+    
     fetch_descriptions = input("Fetch product descriptions? (y/n, default=n): ").lower() == 'y'
     category_limit = None
     
-    if fetch_descriptions:
+    if fetch_descriptions and not args.worker:
         test_mode = input("Test with just 1 category first? (y/n, default=n): ").lower() == 'y'
         if test_mode:
             category_limit = 1
     
-    scraper = FinalSyscoScraper(zip_code="97205", fetch_descriptions=fetch_descriptions)
+    scraper = FinalSyscoScraper(zip_code="97205", fetch_descriptions=fetch_descriptions,
+                                workers=args.workers, recycle_after_pages=args.recycle_after,
+                                batch_extraction=not args.per_element,
+                                fetch_backend=args.backend, http_concurrency=args.http_concurrency,
+                                description_workers=args.description_workers,
+                                description_coverage=args.description_coverage,
+                                outputs=args.output, index_path=args.index,
+                                incremental=args.incremental, cache=cache, replay=args.replay,
+                                profile_dir=args.profile_dir, browser_profile=args.browser_profile,
+                                sku_store=SkuStore(args.queue) if args.worker else None,
+                                max_rate=args.max_rate, max_concurrency=args.max_concurrency,
+                                max_retries=args.max_retries,
+                                archive=PageArchive(args.archive) if args.archive else None,
+                                fetch_only=args.fetch_only)
     
     print("\nSysco Scraper - Final Version")
     print("=============================")
     print(f"Oregon Zip Code: {scraper.zip_code}")
     print(f"Fetch Descriptions: {fetch_descriptions}")
+    if args.workers > 1:
+        print(f"Workers: {args.workers}")
     if category_limit:
         print(f"TEST MODE: Limited to {category_limit} category")
+    if args.resume:
+        print(f"Resuming previous run into {', '.join(args.output)}")
+    if args.fetch_only:
+        print(f"Fetch only: archiving pages to {args.archive}")
+    if args.worker:
+        print(f"Queue worker {args.worker_id} on {args.queue}, writing to {', '.join(args.output)}")
     print("Starting scrape...\n")
     
     start_time = time.time()
-    products = scraper.scrape(category_limit=category_limit)
+    if args.worker:
+        queue = WorkQueue(args.queue, lease_seconds=args.lease_seconds, max_attempts=args.max_attempts)
+        scraper.work(queue, args.worker_id)
+        print(f"\nQueue status:\n{queue.format_status()}")
+        queue.close()
+        scraper.sku_store.close()
+    else:
+        scraper.scrape(category_limit=category_limit, resume=args.resume)
     end_time = time.time()
     
-    scraper.save_to_csv()
+    scraper.print_summary()
     
     print(f"\nCompleted in {(end_time - start_time) / 60:.1f} minutes")
-    print(f"Total products scraped: {len(products)}")
+    print(f"\nStage timings:\n{scraper.metrics.format_summary()}")
+    if scraper.metrics.selectors:
+        print(f"\nCostliest selector misses:\n{scraper.metrics.format_selector_report()}")
+    if args.metrics_json:
+        scraper.metrics.write_json(args.metrics_json)
+    if args.metrics_prom:
+        scraper.metrics.write_prometheus(args.metrics_prom)
+    print(f"Total products scraped: {scraper.run_count}")
     
-    if products:
-        with_desc = sum(1 for p in products if p.get('description'))
-        print(f"Products with descriptions: {with_desc} ({with_desc/len(products)*100:.1f}%)")
+    if scraper.run_count:
+        with_desc = scraper.description_count
+        print(f"Products with descriptions: {with_desc} ({with_desc/scraper.run_count*100:.1f}%)")
+    if scraper.enricher:
+        print(scraper.enricher.summary())
+    if cache:
+        print(cache.summary())
+        cache.close()
+    if scraper.archive:
+        print(f"Archived {scraper.archive.records} pages to {scraper.archive.path}")
+        scraper.archive.close()
+    if scraper.sku_index:
+        print(f"\nChanges since the last run:\n{scraper.sku_index.format_report()}")
+        scraper.sku_index.close()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,147 @@
+"""Append-only archive of raw page snapshots, and the offline parser over it.
+
+With --archive every listing and detail page the scraper loads is
+appended to one file as it was fetched, so extraction rules can be fixed
+and re-run later without touching the network (--parse-archive).
+
+Each record is an 8-byte header (payload length and CRC-32, big-endian)
+followed by the zlib-compressed payload: one JSON line of metadata (url,
+page_type, zip_code, category, fetched_at, ...) and the page HTML. A
+record torn by a crash is cut off the next time the archive is opened
+for appending and skipped when reading.
+
+parse_pages() splits the archive into chunks of records and parses them
+on a process pool, keeping only a few chunks in flight so results can be
+consumed as they arrive. Each worker process loads the scraper script and
+runs its extraction rules, so the offline results match a live run.
+"""
+
+import importlib.util
+import json
+import logging
+import os
+import struct
+import threading
+import time
+import zlib
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+HEADER = struct.Struct('>II')  # payload length, CRC-32 of the payload
+RECORDS_PER_CHUNK = 200
+CHUNKS_PER_WORKER = 2  # Chunks queued per worker process ahead of the one being consumed
+
+
+class PageArchive:
+    """Appends page snapshots to an archive file; safe to share between threads"""
+    def __init__(self, path, level=6):
+        self.path = path
+        self.level = level
+        if os.path.exists(path):
+            end = valid_end(path)
+            if end < os.path.getsize(path):
+                logging.warning(f"Dropping a torn record at the end of {path}")
+                os.truncate(path, end)
+        self.file = open(path, 'ab')
+        self.records = 0
+        self._lock = threading.Lock()
+
+    def append(self, html, **meta):
+        meta.setdefault('fetched_at', time.time())
+        payload = zlib.compress(json.dumps(meta).encode('utf-8') + b'\n' + html.encode('utf-8'), self.level)
+        with self._lock:
+            self.file.write(HEADER.pack(len(payload), zlib.crc32(payload)) + payload)
+            self.file.flush()
+            self.records += 1
+
+    def close(self):
+        if not self.file.closed:
+            self.file.close()
+
+
+def scan(path):
+    """(offset, length) of every complete record, read from the headers only"""
+    spans = []
+    size = os.path.getsize(path)
+    with open(path, 'rb') as f:
+        offset = 0
+        while offset + HEADER.size <= size:
+            f.seek(offset)
+            length, _ = HEADER.unpack(f.read(HEADER.size))
+            if offset + HEADER.size + length > size:
+                break
+            spans.append((offset, length))
+            offset += HEADER.size + length
+    return spans
+
+
+def valid_end(path):
+    """Byte offset just past the last complete record"""
+    spans = scan(path)
+    if not spans:
+        return 0
+    offset, length = spans[-1]
+    return offset + HEADER.size + length
+
+
+def read_records(path, spans):
+    """Yield (meta, html) for the records at `spans`, skipping any that fail their checksum"""
+    for _, meta, html in _read_spans(path, spans):
+        yield meta, html
+
+
+def _read_spans(path, spans):
+    """Yield (position in spans, meta, html), so records after a corrupt one keep their position"""
+    with open(path, 'rb') as f:
+        for i, (offset, length) in enumerate(spans):
+            f.seek(offset)
+            _, crc = HEADER.unpack(f.read(HEADER.size))
+            payload = f.read(length)
+            if zlib.crc32(payload) != crc:
+                logging.warning(f"Skipping a corrupt record at byte {offset} of {path}")
+                continue
+            meta, html = zlib.decompress(payload).split(b'\n', 1)
+            yield i, json.loads(meta), html.decode('utf-8')
+
+
+def iter_archive(path):
+    return read_records(path, scan(path))
+
+
+_parser = None
+
+
+def _init_worker(script_path, options):
+    """Build the scraper whose extraction rules this worker process applies"""
+    global _parser
+    spec = importlib.util.spec_from_file_location('sysco_archive_rules', script_path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    logging.disable(logging.WARNING)
+    _parser = module.FinalSyscoScraper(**options)
+
+
+def _parse_chunk(path, start, spans, listing=None):
+    return [(start + i, meta, _parser.parse_archived_page(meta, html))
+            for i, meta, html in _read_spans(path, spans)
+            if listing is None or (meta['page_type'] == 'listing') == listing]
+
+
+def parse_pages(path, script_path, options=None, workers=None, listing=None):
+    """Parse archived pages on a process pool; yields (index, meta, result) in archive order.
+
+    `listing` limits parsing to listing pages (True) or to every other page
+    (False); the index is the record's position in the archive either way.
+    """
+    spans = scan(path)
+    workers = workers or os.cpu_count()
+    chunks = ((start, spans[start:start + RECORDS_PER_CHUNK]) for start in range(0, len(spans), RECORDS_PER_CHUNK))
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(script_path, options or {})) as pool:
+        futures = deque()
+        for start, chunk in chunks:
+            futures.append(pool.submit(_parse_chunk, path, start, chunk, listing))
+            if len(futures) > workers * CHUNKS_PER_WORKER:
+                yield from futures.popleft().result()
+        while futures:
+            yield from futures.popleft().result()
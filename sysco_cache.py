@@ -0,0 +1,134 @@
+"""On-disk page cache for listing and product-detail HTML.
+
+Pages are keyed by URL and zip code, stored zlib-compressed under the
+cache directory and tracked in a small SQLite index. Entries expire after
+a per-page-type TTL, and the least recently used pages are evicted once
+the cache grows past its size cap.
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+DEFAULT_TTLS = {
+    'listing': 6 * 3600,
+    'detail': 7 * 24 * 3600,
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS pages (
+    key TEXT PRIMARY KEY,
+    url TEXT NOT NULL,
+    zip_code TEXT NOT NULL,
+    page_type TEXT NOT NULL,
+    stored_at REAL NOT NULL,
+    accessed_at REAL NOT NULL,
+    size INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS pages_accessed ON pages (accessed_at);
+"""
+
+
+class PageCache:
+    def __init__(self, directory=".sysco_cache", ttls=None, max_bytes=500 * 1024 * 1024):
+        self.directory = directory
+        self.ttls = dict(DEFAULT_TTLS, **(ttls or {}))
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+        self.conn = sqlite3.connect(os.path.join(directory, "index.db"), check_same_thread=False)
+        self.conn.executescript(SCHEMA)
+        (self.total_bytes,) = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM pages").fetchone()
+        self.hits = {}
+        self.misses = {}
+        self._lock = threading.Lock()
+
+    def key(self, url, zip_code):
+        return hashlib.sha256(f"{zip_code}|{url}".encode('utf-8')).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], f"{key}.html.z")
+
+    def get(self, url, zip_code, page_type, allow_stale=False):
+        """Cached HTML for a page, or None on a miss or expired entry"""
+        key = self.key(url, zip_code)
+        now = time.time()
+        with self._lock:
+            row = self.conn.execute("SELECT stored_at FROM pages WHERE key = ?", (key,)).fetchone()
+            fresh = row is not None and (allow_stale or now - row[0] <= self.ttls.get(page_type, 0))
+            if fresh:
+                try:
+                    with open(self._path(key), 'rb') as f:
+                        html = zlib.decompress(f.read()).decode('utf-8')
+                except (OSError, zlib.error):
+                    self._delete(key)
+                    self.conn.commit()
+                    html = None
+                if html is not None:
+                    self.conn.execute("UPDATE pages SET accessed_at = ? WHERE key = ?", (now, key))
+                    self.conn.commit()
+                    self.hits[page_type] = self.hits.get(page_type, 0) + 1
+                    return html
+            self.misses[page_type] = self.misses.get(page_type, 0) + 1
+            return None
+
+    def put(self, url, zip_code, page_type, html):
+        key = self.key(url, zip_code)
+        data = zlib.compress(html.encode('utf-8'), 6)
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+        now = time.time()
+        with self._lock:
+            self._delete(key, remove_file=False)
+            self.conn.execute(
+                "INSERT OR REPLACE INTO pages (key, url, zip_code, page_type, stored_at, accessed_at, size) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, url, zip_code, page_type, now, now, len(data))
+            )
+            self.total_bytes += len(data)
+            self._evict()
+            self.conn.commit()
+
+    def _delete(self, key, remove_file=True):
+        row = self.conn.execute("SELECT size FROM pages WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return
+        self.conn.execute("DELETE FROM pages WHERE key = ?", (key,))
+        self.total_bytes -= row[0]
+        if remove_file:
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+
+    def _evict(self):
+        """Drop least recently used pages until the cache fits its size cap"""
+        if self.total_bytes <= self.max_bytes:
+            return
+        for (key,) in self.conn.execute("SELECT key FROM pages ORDER BY accessed_at").fetchall():
+            self._delete(key)
+            if self.total_bytes <= self.max_bytes:
+                break
+
+    def hit_rate(self, page_type):
+        hits = self.hits.get(page_type, 0)
+        lookups = hits + self.misses.get(page_type, 0)
+        return hits / lookups if lookups else 0.0
+
+    def summary(self):
+        page_types = sorted(set(self.hits) | set(self.misses))
+        if not page_types:
+            return "Page cache - no lookups"
+        parts = [f"{page_type}: {self.hits.get(page_type, 0)} hits / {self.misses.get(page_type, 0)} misses "
+                 f"({self.hit_rate(page_type) * 100:.1f}%)" for page_type in page_types]
+        return "Page cache - " + "; ".join(parts)
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,85 @@
+"""Durable, append-only run checkpoints for resumable scrapes."""
+
+import json
+import logging
+import os
+
+
+class RunCheckpoint:
+    """Journal of completed (category, page) units and the SKUs they produced.
+
+    Each completed page appends one JSON line holding its SKUs and the
+    offset of every output file after its rows were flushed; finished
+    categories get a marker line, and so does the page count of a category
+    once it is known. Replaying the journal restores the seen-SKU set, the
+    page plans and the position to continue from.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.pages = {}  # (category, page) -> number of products
+        self.done_categories = set()
+        self.plans = {}  # category -> total pages
+        self.plan_counts = {}  # category -> (result count, page size) the plan came from
+        self.skus = set()
+        self.category_counts = {}
+        self.offsets = {}  # output path -> byte offset
+        self.file = None
+
+    def load(self):
+        """Replay an existing journal; a torn final line from a crash is ignored"""
+        if not os.path.exists(self.path):
+            return self
+        with open(self.path, encoding='utf-8') as f:
+            for line_number, line in enumerate(f, 1):
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    logging.warning(f"Ignoring unreadable checkpoint line {line_number} in {self.path}")
+                    continue
+                category = entry['category']
+                if entry.get('done'):
+                    self.done_categories.add(category)
+                    continue
+                if 'total_pages' in entry:
+                    self.plans[category] = entry['total_pages']
+                    self.plan_counts[category] = (entry.get('result_count'), entry.get('page_size'))
+                    continue
+                skus = entry.get('skus', [])
+                self.pages[(category, entry['page'])] = len(skus)
+                self.skus.update(skus)
+                self.category_counts[category] = self.category_counts.get(category, 0) + len(skus)
+                self.offsets = entry.get('offsets', self.offsets)
+        return self
+
+    def open(self, fresh=False):
+        self.file = open(self.path, 'w' if fresh else 'a', encoding='utf-8')
+        return self
+
+    def _append(self, entry):
+        self.file.write(json.dumps(entry) + '\n')
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+    def page_count(self, category, page):
+        """Products recorded for a completed page, or None if it still needs scraping"""
+        return self.pages.get((category, page))
+
+    def record_page(self, category, page, skus, offsets):
+        self.pages[(category, page)] = len(skus)
+        self.skus.update(skus)
+        self.offsets = offsets
+        self._append({'category': category, 'page': page, 'skus': list(skus), 'offsets': offsets})
+
+    def record_plan(self, category, total_pages, result_count=None, page_size=None):
+        self.plans[category] = total_pages
+        self.plan_counts[category] = (result_count, page_size)
+        self._append({'category': category, 'total_pages': total_pages, 'result_count': result_count,
+                      'page_size': page_size})
+
+    def record_category(self, category):
+        self.done_categories.add(category)
+        self._append({'category': category, 'done': True})
+
+    def close(self):
+        if self.file and not self.file.closed:
+            self.file.close()
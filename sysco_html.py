@@ -0,0 +1,343 @@
+"""Browserless HTML parsing for Sysco catalog pages.
+
+Builds a small element tree with the standard library's html.parser and
+supports the subset of CSS selectors the scraper's fallback chains use
+(tag, .class, [attr], [attr=v], [attr*=v], [attr^=v], [attr$=v] and the
+descendant combinator). extract_listing_records() returns the same raw
+records as LISTING_EXTRACTION_JS does in the browser, so both feed the
+scraper's existing field rules.
+
+lxml is optional: when it is installed, parse_html(..., use_lxml=True)
+builds the same tree from lxml's C parser, which is several times faster
+and is what the offline archive parser uses.
+"""
+
+import re
+import threading
+from html.parser import HTMLParser
+from urllib.parse import urljoin
+
+try:
+    import lxml.etree
+    import lxml.html
+    LXML_AVAILABLE = True
+except ImportError:
+    lxml = None
+    LXML_AVAILABLE = False
+
+VOID_TAGS = {
+    'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link',
+    'meta', 'param', 'source', 'track', 'wbr'
+}
+SKIP_TEXT_TAGS = {'script', 'style', 'noscript', 'template', 'head', 'title'}
+BLOCK_TAGS = {
+    'address', 'article', 'aside', 'blockquote', 'button', 'dd', 'div', 'dl', 'dt',
+    'fieldset', 'figcaption', 'figure', 'footer', 'form', 'h1', 'h2', 'h3',
+    'h4', 'h5', 'h6', 'header', 'hr', 'li', 'main', 'nav', 'ol', 'p', 'pre',
+    'section', 'table', 'tr', 'ul'
+}
+
+SKU_PATTERN = re.compile(r'/product/(\d+)')
+
+
+class NoSuchElement(Exception):
+    pass
+
+
+class Element:
+    """Parsed HTML element with a small WebDriver-like lookup API"""
+    __slots__ = ('tag', 'attrs', 'children', 'parent')
+
+    def __init__(self, tag, attrs, parent=None):
+        self.tag = tag
+        self.attrs = attrs
+        self.children = []
+        self.parent = parent
+
+    def get(self, name, default=None):
+        return self.attrs.get(name, default)
+
+    def iter(self):
+        """Yield every descendant element in document order"""
+        stack = list(reversed(self.children))
+        while stack:
+            node = stack.pop()
+            if isinstance(node, Element):
+                yield node
+                stack.extend(reversed(node.children))
+
+    def select(self, selector):
+        """All descendants matching a CSS selector"""
+        matcher = compile_selector(selector)
+        return [el for el in self.iter() if matcher.matches(el)]
+
+    def select_one(self, selector):
+        """First descendant matching a CSS selector, like find_element()"""
+        matcher = compile_selector(selector)
+        for el in self.iter():
+            if matcher.matches(el):
+                return el
+        return None
+
+    @property
+    def text(self):
+        return element_text(self)
+
+    def get_attribute(self, name):
+        return self.attrs.get(name)
+
+    def find_element(self, by, value):
+        """WebDriver-style lookup; only CSS selectors are supported"""
+        if by != 'css selector':
+            raise ValueError(f"Unsupported locator strategy: {by}")
+        el = self.select_one(value)
+        if el is None:
+            raise NoSuchElement(value)
+        return el
+
+    def find_elements(self, by, value):
+        if by != 'css selector':
+            raise ValueError(f"Unsupported locator strategy: {by}")
+        return self.select(value)
+
+
+class _TreeBuilder(HTMLParser):
+    def __init__(self, base_url=None):
+        super().__init__(convert_charrefs=True)
+        self.base_url = base_url
+        self.root = Element('#document', {})
+        self.stack = [self.root]
+
+    def handle_starttag(self, tag, attrs):
+        parent = self.stack[-1]
+        attrs = {k: (v if v is not None else '') for k, v in attrs}
+        if self.base_url:
+            # Like the DOM properties WebDriver reads, src/href come back absolute
+            for name in ('src', 'href'):
+                if attrs.get(name):
+                    attrs[name] = urljoin(self.base_url, attrs[name])
+        el = Element(tag, attrs, parent)
+        parent.children.append(el)
+        if tag not in VOID_TAGS:
+            self.stack.append(el)
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        if tag not in VOID_TAGS:
+            self.stack.pop()
+
+    def handle_endtag(self, tag):
+        for i in range(len(self.stack) - 1, 0, -1):
+            if self.stack[i].tag == tag:
+                del self.stack[i:]
+                return
+
+    def handle_data(self, data):
+        self.stack[-1].children.append(data)
+
+
+def parse_html(html, base_url=None, use_lxml=False):
+    """Parse an HTML document into an Element tree, resolving src/href against base_url"""
+    if use_lxml and LXML_AVAILABLE:
+        try:
+            document = lxml.html.document_fromstring(html.encode('utf-8'), parser=_lxml_parser())
+        except (lxml.etree.ParserError, ValueError):
+            document = None
+        if document is not None:
+            root = Element('#document', {})
+            _convert_lxml(document, root, base_url)
+            return root
+    builder = _TreeBuilder(base_url)
+    builder.feed(html)
+    builder.close()
+    return builder.root
+
+
+_lxml_local = threading.local()
+
+
+def _lxml_parser():
+    # lxml parsers must not be shared between threads
+    parser = getattr(_lxml_local, 'parser', None)
+    if parser is None:
+        parser = _lxml_local.parser = lxml.html.HTMLParser(encoding='utf-8', remove_comments=True)
+    return parser
+
+
+def _convert_lxml(node, parent, base_url):
+    """Copy an lxml element and its subtree into Elements, text and tails in document order"""
+    attrs = dict(node.attrib)
+    if base_url:
+        for name in ('src', 'href'):
+            if attrs.get(name):
+                attrs[name] = urljoin(base_url, attrs[name])
+    el = Element(node.tag, attrs, parent)
+    parent.children.append(el)
+    if node.text:
+        el.children.append(node.text)
+    for child in node:
+        # Comments and processing instructions have a non-string tag; only their tail is content
+        if isinstance(child.tag, str):
+            _convert_lxml(child, el, base_url)
+        if child.tail:
+            el.children.append(child.tail)
+
+
+_ATTR_PATTERN = re.compile(r'\[\s*([\w-]+)\s*(?:([*^$]?=)\s*(?:"([^"]*)"|\'([^\']*)\'|([^\]\s]*)))?\s*\]')
+_COMPOUND_PATTERN = re.compile(r'^([\w-]+|\*)?((?:\.[\w-]+|\[[^\]]*\])*)$')
+
+
+class _Compound:
+    __slots__ = ('tag', 'classes', 'attrs')
+
+    def __init__(self, text):
+        match = _COMPOUND_PATTERN.match(text)
+        if not match:
+            raise ValueError(f"Unsupported selector: {text}")
+        tag, rest = match.groups()
+        self.tag = None if tag in (None, '*') else tag.lower()
+        self.classes = re.findall(r'\.([\w-]+)', re.sub(r'\[[^\]]*\]', '', rest))
+        self.attrs = []
+        for name, op, dq, sq, bare in _ATTR_PATTERN.findall(rest):
+            value = dq or sq or bare
+            self.attrs.append((name.lower(), op, value))
+
+    def matches(self, el):
+        if self.tag and el.tag != self.tag:
+            return False
+        if self.classes:
+            classes = el.attrs.get('class', '').split()
+            if any(c not in classes for c in self.classes):
+                return False
+        for name, op, value in self.attrs:
+            actual = el.attrs.get(name)
+            if actual is None:
+                return False
+            if op == '=' and actual != value:
+                return False
+            if op == '*=' and (not value or value not in actual):
+                return False
+            if op == '^=' and (not value or not actual.startswith(value)):
+                return False
+            if op == '$=' and (not value or not actual.endswith(value)):
+                return False
+        return True
+
+
+class _Selector:
+    __slots__ = ('parts',)
+
+    def __init__(self, selector):
+        self.parts = [_Compound(part) for part in selector.split()]
+
+    def matches(self, el):
+        if not self.parts[-1].matches(el):
+            return False
+        node = el.parent
+        for part in reversed(self.parts[:-1]):
+            while node is not None and not (node.tag != '#document' and part.matches(node)):
+                node = node.parent
+            if node is None:
+                return False
+            node = node.parent
+        return True
+
+
+_selector_cache = {}
+
+
+def compile_selector(selector):
+    compiled = _selector_cache.get(selector)
+    if compiled is None:
+        compiled = _selector_cache[selector] = _Selector(selector)
+    return compiled
+
+
+def is_hidden(el):
+    style = el.attrs.get('style', '').replace(' ', '').lower()
+    return 'hidden' in el.attrs or 'display:none' in style or el.attrs.get('type') == 'hidden'
+
+
+def element_text(el):
+    """Approximate the rendered text WebDriver reports for an element"""
+    if is_hidden(el) or el.tag in SKIP_TEXT_TAGS:
+        return ''
+    parts = []
+
+    def walk(node):
+        for child in node.children:
+            if isinstance(child, str):
+                parts.append(child)
+            elif child.tag == 'br':
+                parts.append('\n')
+            elif child.tag not in SKIP_TEXT_TAGS and not is_hidden(child):
+                block = child.tag in BLOCK_TAGS
+                if block:
+                    parts.append('\n')
+                walk(child)
+                if block:
+                    parts.append('\n')
+
+    walk(el)
+    lines = (' '.join(line.split()) for line in ''.join(parts).split('\n'))
+    return '\n'.join(line for line in lines if line)
+
+
+def extract_listing_records(html, page_url, link_selectors, keywords, name_selectors,
+                            brand_selectors, packaging_selectors, img_selectors):
+    """Collect raw product-tile records from listing HTML, one per SKU"""
+    root = html if isinstance(html, Element) else parse_html(html, page_url)
+
+    links = []
+    for selector in link_selectors:
+        links = root.select(selector)
+        if links:
+            break
+
+    def first_text(area, selector):
+        el = area.select_one(selector)
+        return element_text(el) if el is not None else None
+
+    seen = set()
+    records = []
+    for link in links:
+        href = link.get('href')
+        if not href:
+            continue
+        href = urljoin(page_url, href)
+        match = SKU_PATTERN.search(href)
+        if not match or match.group(1) in seen:
+            continue
+        seen.add(match.group(1))
+
+        container = link
+        for _ in range(5):
+            parent = container.parent
+            if parent is None or parent.tag == '#document':
+                break
+            cls = parent.get('class', '').lower()
+            container = parent
+            if cls and any(keyword in cls for keyword in keywords):
+                break
+
+        # One entry per (area, selector), None where the selector matched nothing
+        image_srcs = []
+        for area in (link, container):
+            for selector in img_selectors:
+                img = area.select_one(selector)
+                if img is None:
+                    image_srcs.append(None)
+                else:
+                    src = img.get('data-src') or img.get('src')
+                    image_srcs.append(urljoin(page_url, src) if src else '')
+
+        records.append({
+            'href': href,
+            'link_text': element_text(link),
+            'name_texts': [first_text(container, s) for s in name_selectors],
+            'brand_texts': [first_text(container, s) for s in brand_selectors],
+            'packaging_texts': [first_text(container, s) for s in packaging_selectors],
+            'container_text': element_text(container),
+            'image_srcs': image_srcs,
+        })
+    return records
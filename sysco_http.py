@@ -0,0 +1,121 @@
+"""Pooled asyncio HTTP client for fetching catalog pages without a browser.
+
+aiohttp is optional: when it is not installed HTTP_AVAILABLE is False and
+the scraper keeps using Selenium for every page.
+"""
+
+import asyncio
+import logging
+import time
+
+try:
+    import aiohttp
+    HTTP_AVAILABLE = True
+except ImportError:
+    aiohttp = None
+    HTTP_AVAILABLE = False
+
+from sysco_ratelimit import THROTTLE_STATUSES, retry_after_seconds
+
+DEFAULT_HEADERS = {
+    'Accept': 'text/html,application/xhtml+xml,application/json;q=0.9,*/*;q=0.8',
+    'Accept-Language': 'en-US,en;q=0.9',
+}
+
+
+class AsyncPageFetcher:
+    """Fetches pages over one pooled connection set with bounded concurrency.
+
+    Use as an async context manager; `cookies` and `headers` carry the
+    session state (zip code, guest session) established by set_location().
+    With a RequestScheduler every request is paced by it, and throttled or
+    failed requests are retried; `check(status, body)` can flag responses
+    that are throttled despite a 200 status.
+    """
+    def __init__(self, concurrency=8, cookies=None, headers=None, timeout=20, scheduler=None, check=None):
+        if not HTTP_AVAILABLE:
+            raise RuntimeError("aiohttp is required for the HTTP fetch backend")
+        self.concurrency = concurrency
+        self.cookies = cookies or {}
+        self.headers = dict(DEFAULT_HEADERS, **(headers or {}))
+        self.timeout = timeout
+        self.scheduler = scheduler
+        self.check = check
+        self.session = None
+        self._semaphore = None
+
+    async def __aenter__(self):
+        connector = aiohttp.TCPConnector(limit=self.concurrency, limit_per_host=self.concurrency)
+        self.session = aiohttp.ClientSession(
+            connector=connector,
+            cookies=self.cookies,
+            headers=self.headers,
+            timeout=aiohttp.ClientTimeout(total=self.timeout)
+        )
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.session.close()
+
+    async def fetch(self, url):
+        """Return (status, body) for one URL"""
+        if self.scheduler is None:
+            async with self._semaphore:
+                async with self.session.get(url) as response:
+                    return response.status, await response.text()
+        
+        attempt = 0
+        while True:
+            async with self._semaphore:
+                await self.scheduler.acquire_async(url, retry=attempt > 0)
+                start = time.perf_counter()
+                retry_after = None
+                outcome = 'error'
+                try:
+                    try:
+                        async with self.session.get(url) as response:
+                            result = response.status, await response.text()
+                            retry_after = retry_after_seconds(response.headers.get('Retry-After'))
+                    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                        result = e
+                    
+                    if isinstance(result, Exception) or result[0] >= 500 and result[0] not in THROTTLE_STATUSES:
+                        outcome = 'error'
+                    elif result[0] in THROTTLE_STATUSES or (self.check and self.check(*result)):
+                        outcome = 'throttled'
+                    else:
+                        outcome = 'ok'
+                finally:
+                    # Decode errors and cancellation must give the host slot back too
+                    self.scheduler.release(url, outcome, time.perf_counter() - start, retry_after)
+            
+            if outcome == 'ok':
+                return result
+            delay = self.scheduler.retry_delay(url, attempt, retry_after)
+            if delay is None:
+                if isinstance(result, Exception):
+                    raise result
+                return result
+            logging.info(f"Retrying {url} in {delay:.1f}s ({outcome})")
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    async def fetch_all(self, urls):
+        """Fetch URLs concurrently; failed fetches come back as exceptions, in order"""
+        results = await asyncio.gather(*(self.fetch(url) for url in urls), return_exceptions=True)
+        for url, result in zip(urls, results):
+            if isinstance(result, Exception):
+                logging.warning(f"HTTP fetch failed for {url}: {result.__class__.__name__}: {result}")
+        return results
+
+
+def session_state_from_driver(driver):
+    """Cookies and User-Agent of a browser session, for reuse over plain HTTP"""
+    cookies = {cookie['name']: cookie['value'] for cookie in driver.get_cookies()}
+    headers = {}
+    try:
+        headers['User-Agent'] = driver.execute_script("return navigator.userAgent")
+    except Exception:
+        pass
+    return cookies, headers
@@ -0,0 +1,471 @@
+#!/usr/bin/env python3
+"""Image stage: verify product image URLs and keep a deduplicated image store.
+
+The scraper only checks picture_url strings for suspicious keywords, so
+broken links and placeholder images still reach the output. This stage
+fetches every distinct picture_url over one pooled aiohttp session with
+bounded concurrency (paced by the same per-host RequestScheduler as page
+fetches) and classifies it:
+
+- ok: an image of at least MIN_DIMENSION pixels on each side
+- placeholder: a placeholder URL, or an image too small to be a product photo
+- broken: an HTTP error, a network failure or a body that is not an image
+- too_large: a body over MAX_IMAGE_BYTES; it is not downloaded or stored,
+  but the URL is kept since the image itself may well be fine
+
+Images are stored content-addressed by SHA-256 under the store directory,
+so renditions shared by several URLs are stored once. A SQLite manifest
+keeps each URL's status, digest, ETag and Last-Modified; reruns send
+If-None-Match/If-Modified-Since and a 304 keeps the stored image. With
+Pillow installed, JPEG thumbnails are made on a process pool.
+
+aiohttp is required; Pillow is optional (only for thumbnails).
+
+Usage:
+    python3 sysco_images.py sysco_products_oregon_full.csv checked.csv [--store sysco_images] [--thumbnail 128]
+"""
+
+import argparse
+import asyncio
+import csv
+import hashlib
+import logging
+import os
+import sqlite3
+import struct
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    import aiohttp
+    HTTP_AVAILABLE = True
+except ImportError:
+    aiohttp = None
+    HTTP_AVAILABLE = False
+
+try:
+    from PIL import Image
+    PIL_AVAILABLE = True
+except ImportError:
+    Image = None
+    PIL_AVAILABLE = False
+
+from sysco_ratelimit import THROTTLE_STATUSES, RequestScheduler, retry_after_seconds
+
+# Same keywords as FinalSyscoScraper.is_valid_product_image()
+PLACEHOLDER_KEYWORDS = ['placeholder', 'default', 'blank', 'loading', 'error', 'missing']
+MIN_DIMENSION = 16  # Images smaller than this on either side are placeholders or tracking pixels
+MAX_IMAGE_BYTES = 20 * 1024 * 1024
+COMMIT_EVERY = 200  # Manifest rows written per transaction
+
+IMAGE_FIELDS = ['image_status', 'image_sha256']
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS images (
+    url TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    http_status INTEGER,
+    sha256 TEXT,
+    etag TEXT,
+    last_modified TEXT,
+    error TEXT,
+    checked_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS blobs (
+    sha256 TEXT PRIMARY KEY,
+    ext TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    width INTEGER,
+    height INTEGER,
+    stored_at REAL NOT NULL
+);
+"""
+
+
+def sniff_image(data):
+    """(extension, width, height) read from the header of a PNG, JPEG, GIF or WebP; None for anything else"""
+    if data[:8] == b'\x89PNG\r\n\x1a\n' and len(data) >= 24:
+        width, height = struct.unpack('>II', data[16:24])
+        return 'png', width, height
+    if data[:6] in (b'GIF87a', b'GIF89a') and len(data) >= 10:
+        width, height = struct.unpack('<HH', data[6:10])
+        return 'gif', width, height
+    if data[:4] == b'RIFF' and data[8:12] == b'WEBP' and len(data) >= 30:
+        chunk = data[12:16]
+        if chunk == b'VP8 ':
+            width, height = struct.unpack('<HH', data[26:30])
+            return 'webp', width & 0x3fff, height & 0x3fff
+        if chunk == b'VP8L':
+            bits = int.from_bytes(data[21:25], 'little')
+            return 'webp', (bits & 0x3fff) + 1, ((bits >> 14) & 0x3fff) + 1
+        if chunk == b'VP8X':
+            return 'webp', int.from_bytes(data[24:27], 'little') + 1, int.from_bytes(data[27:30], 'little') + 1
+        return None
+    if data[:2] == b'\xff\xd8':
+        return _jpeg_size(data)
+    return None
+
+
+def _jpeg_size(data):
+    """Walk the JPEG segments up to the first start-of-frame marker"""
+    offset = 2
+    while offset + 9 <= len(data):
+        if data[offset] != 0xff:
+            return None
+        marker = data[offset + 1]
+        if marker == 0xff:
+            offset += 1
+            continue
+        if marker in (0xd8, 0x01) or 0xd0 <= marker <= 0xd7:
+            offset += 2
+            continue
+        (length,) = struct.unpack('>H', data[offset + 2:offset + 4])
+        if 0xc0 <= marker <= 0xcf and marker not in (0xc4, 0xc8, 0xcc):
+            height, width = struct.unpack('>HH', data[offset + 5:offset + 9])
+            return 'jpg', width, height
+        offset += 2 + length
+    return None
+
+
+def placeholder_url(url):
+    return any(keyword in url.lower() for keyword in PLACEHOLDER_KEYWORDS)
+
+
+class ImageStore:
+    """Content-addressed image files plus the SQLite manifest of checked URLs; safe to share between threads"""
+    def __init__(self, directory="sysco_images"):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.conn = sqlite3.connect(os.path.join(directory, "manifest.db"), check_same_thread=False)
+        self.conn.executescript(SCHEMA)
+        self.pending = 0
+        self._lock = threading.Lock()
+
+    def path(self, digest, ext):
+        return os.path.join(self.directory, 'objects', digest[:2], f"{digest}.{ext}")
+
+    def thumbnail_path(self, digest, size):
+        return os.path.join(self.directory, 'thumbs', str(size), digest[:2], f"{digest}.jpg")
+
+    def put(self, data, ext, width, height):
+        """Store an image under its SHA-256 unless it is already there; returns (digest, newly stored)"""
+        digest = hashlib.sha256(data).hexdigest()
+        path = self.path(digest, ext)
+        stored = not os.path.exists(path)
+        if stored:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        with self._lock:
+            self.conn.execute(
+                "INSERT OR IGNORE INTO blobs (sha256, ext, size, width, height, stored_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (digest, ext, len(data), width, height, time.time())
+            )
+        return digest, stored
+
+    def has_blob(self, digest):
+        """True when the image file for a digest is on disk"""
+        with self._lock:
+            row = self.conn.execute("SELECT ext FROM blobs WHERE sha256 = ?", (digest,)).fetchone()
+        return row is not None and os.path.exists(self.path(digest, row[0]))
+
+    def lookup(self, url):
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT status, http_status, sha256, etag, last_modified FROM images WHERE url = ?", (url,)
+            ).fetchone()
+        if row is None:
+            return None
+        return dict(zip(('status', 'http_status', 'sha256', 'etag', 'last_modified'), row))
+
+    def record(self, url, status, http_status=None, sha256=None, etag=None, last_modified=None, error=None):
+        with self._lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO images (url, status, http_status, sha256, etag, last_modified, error, checked_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (url, status, http_status, sha256, etag, last_modified, error, time.time())
+            )
+            self.pending += 1
+            if self.pending >= COMMIT_EVERY:
+                self.conn.commit()
+                self.pending = 0
+
+    def statuses(self, urls):
+        """{url: (status, sha256)} for the URLs in the manifest"""
+        result = {}
+        with self._lock:
+            for url in urls:
+                row = self.conn.execute("SELECT status, sha256 FROM images WHERE url = ?", (url,)).fetchone()
+                if row:
+                    result[url] = row
+        return result
+
+    def blobs(self):
+        """(sha256, path) of every stored image"""
+        with self._lock:
+            rows = self.conn.execute("SELECT sha256, ext FROM blobs").fetchall()
+        return [(digest, self.path(digest, ext)) for digest, ext in rows]
+
+    def summary(self):
+        with self._lock:
+            counts = dict(self.conn.execute("SELECT status, COUNT(*) FROM images GROUP BY status"))
+            blobs, size = self.conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM blobs").fetchone()
+        urls = sum(counts.values())
+        return (f"Image store - {urls} URLs: {counts.get('ok', 0)} ok, {counts.get('placeholder', 0)} placeholder, "
+                f"{counts.get('broken', 0)} broken, {counts.get('too_large', 0)} too large; "
+                f"{blobs} distinct images ({size / (1024 * 1024):.1f} MB)")
+
+    def close(self):
+        with self._lock:
+            self.conn.commit()
+            self.conn.close()
+
+
+class ImageVerifier:
+    """Checks image URLs over one pooled aiohttp session and fills an ImageStore.
+
+    At most `concurrency` requests are in flight; with a RequestScheduler
+    each request is also paced per host, and throttled or failed requests
+    are retried.
+    """
+    def __init__(self, store, concurrency=16, timeout=20, scheduler=None, max_bytes=MAX_IMAGE_BYTES):
+        if not HTTP_AVAILABLE:
+            raise RuntimeError("aiohttp is required for the image stage")
+        self.store = store
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.scheduler = scheduler
+        self.max_bytes = max_bytes
+        self.counts = {'ok': 0, 'placeholder': 0, 'broken': 0, 'too_large': 0, 'not_modified': 0,
+                       'stored': 0, 'bytes': 0}
+        self._semaphore = None
+
+    def verify(self, urls):
+        """Check every distinct URL; returns the outcome counts"""
+        asyncio.run(self._verify_all(list(dict.fromkeys(url for url in urls if url))))
+        return self.counts
+
+    async def _verify_all(self, urls):
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        connector = aiohttp.TCPConnector(limit=self.concurrency, limit_per_host=self.concurrency)
+        async with aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=self.timeout),
+                                         headers={'Accept': 'image/avif,image/webp,image/*,*/*;q=0.8'}) as session:
+            await asyncio.gather(*(self._check(session, url) for url in urls))
+
+    async def _check(self, session, url):
+        if placeholder_url(url):
+            self._record(url, 'placeholder', error='placeholder URL')
+            return
+
+        prior = self.store.lookup(url)
+        headers = {}
+        if prior and prior['status'] == 'ok' and self.store.has_blob(prior['sha256']):
+            if prior['etag']:
+                headers['If-None-Match'] = prior['etag']
+            if prior['last_modified']:
+                headers['If-Modified-Since'] = prior['last_modified']
+
+        try:
+            status, response_headers, data = await self._fetch(session, url, headers)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            self._record(url, 'broken', error=f"{e.__class__.__name__}: {e}")
+            return
+
+        if status == 304 and headers:
+            self.counts['not_modified'] += 1
+            self._record(url, 'ok', status, prior['sha256'], response_headers.get('ETag') or prior['etag'],
+                         response_headers.get('Last-Modified') or prior['last_modified'])
+            return
+        if status != 200:
+            self._record(url, 'broken', status, error=f"HTTP {status}")
+            return
+        if data is None:
+            self._record(url, 'too_large', status, error=f"over {self.max_bytes} bytes")
+            return
+
+        sniffed = sniff_image(data)
+        if sniffed is None:
+            self._record(url, 'broken', status, error=f"not an image ({response_headers.get('Content-Type', '')})")
+            return
+        ext, width, height = sniffed
+        # Hashing and writing a multi-megabyte image would stall every other request on the event loop
+        digest, stored = await asyncio.get_running_loop().run_in_executor(None, self.store.put, data, ext, width, height)
+        self.counts['stored'] += stored
+        self.counts['bytes'] += len(data)
+        if width < MIN_DIMENSION or height < MIN_DIMENSION:
+            self._record(url, 'placeholder', status, digest, error=f"{width}x{height} image")
+            return
+        self._record(url, 'ok', status, digest, response_headers.get('ETag'), response_headers.get('Last-Modified'))
+
+    def _record(self, url, status, http_status=None, sha256=None, etag=None, last_modified=None, error=None):
+        if status != 'ok' or http_status != 304:
+            self.counts[status] += 1
+        self.store.record(url, status, http_status, sha256, etag, last_modified, error)
+
+    async def _fetch(self, session, url, headers):
+        """(status, headers, body) for one URL, retried through the scheduler when there is one.
+
+        The body is None when it is over max_bytes.
+        """
+        attempt = 0
+        while True:
+            async with self._semaphore:
+                if self.scheduler:
+                    await self.scheduler.acquire_async(url, retry=attempt > 0)
+                start = time.perf_counter()
+                retry_after = None
+                outcome = 'error'
+                try:
+                    try:
+                        async with session.get(url, headers=headers) as response:
+                            data = None
+                            if response.status != 200 or (response.content_length or 0) <= self.max_bytes:
+                                data = await self._read_body(response)
+                            result = response.status, response.headers, data
+                            retry_after = retry_after_seconds(response.headers.get('Retry-After'))
+                    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                        result = e
+
+                    if isinstance(result, Exception) or result[0] >= 500 and result[0] not in THROTTLE_STATUSES:
+                        outcome = 'error'
+                    elif result[0] in THROTTLE_STATUSES:
+                        outcome = 'throttled'
+                    else:
+                        outcome = 'ok'
+                finally:
+                    # Cancellation and unexpected errors must give the host slot back too
+                    if self.scheduler:
+                        self.scheduler.release(url, outcome, time.perf_counter() - start, retry_after)
+
+            delay = None
+            if outcome != 'ok' and self.scheduler:
+                delay = self.scheduler.retry_delay(url, attempt, retry_after)
+            if delay is None:
+                if isinstance(result, Exception):
+                    raise result
+                return result
+            logging.info(f"Retrying {url} in {delay:.1f}s ({outcome})")
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    async def _read_body(self, response):
+        """The response body, or None once it runs past max_bytes (chunked bodies have no Content-Length)"""
+        data = bytearray()
+        while True:
+            chunk = await response.content.read(self.max_bytes + 1 - len(data))
+            if not chunk:
+                return bytes(data)
+            data += chunk
+            if len(data) > self.max_bytes:
+                return None
+
+
+def _thumbnail(src_path, dest_path, size):
+    """Write a JPEG thumbnail no larger than size x size; runs in a worker process"""
+    try:
+        with Image.open(src_path) as image:
+            image.thumbnail((size, size))
+            if image.mode != 'RGB':
+                image = image.convert('RGB')
+            os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+            tmp_path = f"{dest_path}.{os.getpid()}.tmp"
+            image.save(tmp_path, 'JPEG', quality=85)
+        os.replace(tmp_path, dest_path)
+        return True
+    except Exception as e:
+        logging.warning(f"Thumbnail failed for {src_path}: {e}")
+        return False
+
+
+def make_thumbnails(store, sizes, workers=None):
+    """Create missing thumbnails for every stored image on a process pool; returns how many were made"""
+    if not PIL_AVAILABLE:
+        logging.warning("Pillow is not installed, skipping thumbnails")
+        return 0
+    jobs = [(path, store.thumbnail_path(digest, size), size)
+            for digest, path in store.blobs() for size in sizes
+            if not os.path.exists(store.thumbnail_path(digest, size))]
+    if not jobs:
+        return 0
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+        return sum(pool.map(_thumbnail, *zip(*jobs), chunksize=32))
+
+
+def check_csv(input_path, output_path, store, verifier):
+    """Verify a scraped CSV's picture_urls and write a copy with the results.
+
+    Adds image_status and image_sha256 columns and clears picture_url
+    where the image is broken or a placeholder; too_large URLs are kept. Returns the verifier's
+    outcome counts.
+    """
+    with open(input_path, newline='', encoding='utf-8') as f:
+        reader = csv.DictReader(f)
+        fieldnames = list(reader.fieldnames)
+        rows = list(reader)
+
+    urls = [row.get('picture_url', '') for row in rows]
+    counts = verifier.verify(urls)
+    statuses = store.statuses(set(url for url in urls if url))
+
+    with open(output_path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=fieldnames + [n for n in IMAGE_FIELDS if n not in fieldnames])
+        writer.writeheader()
+        for row in rows:
+            status, digest = statuses.get(row.get('picture_url', ''), ('', None))
+            row['image_status'] = status
+            row['image_sha256'] = digest or ''
+            if status in ('broken', 'placeholder'):
+                row['picture_url'] = ''
+            writer.writerow(row)
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Verify and store the product images of a scraped CSV")
+    parser.add_argument('input', help="scraped CSV with a picture_url column")
+    parser.add_argument('output', help="copy of the CSV with image_status/image_sha256 and bad picture_urls cleared")
+    parser.add_argument('--store', default='sysco_images', metavar='DIR',
+                        help="image store and manifest directory (default: sysco_images)")
+    parser.add_argument('--concurrency', type=int, default=16,
+                        help="concurrent image requests (default: 16)")
+    parser.add_argument('--max-rate', type=float, default=None, metavar='PER_SEC',
+                        help="ceiling on requests per second per host (default: adaptive, no ceiling)")
+    parser.add_argument('--thumbnail', type=int, action='append', default=None, metavar='SIZE',
+                        help="also make SIZE x SIZE JPEG thumbnails (requires Pillow); repeat for several sizes")
+    parser.add_argument('--thumbnail-workers', type=int, default=None, metavar='N',
+                        help="processes making thumbnails (default: one per CPU)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    if not HTTP_AVAILABLE:
+        parser.error("aiohttp is required for the image stage")
+
+    store = ImageStore(args.store)
+    scheduler = RequestScheduler(max_rate=args.max_rate, concurrency=args.concurrency,
+                                 max_concurrency=args.concurrency)
+    verifier = ImageVerifier(store, concurrency=args.concurrency, scheduler=scheduler)
+    start = time.time()
+    try:
+        counts = check_csv(args.input, args.output, store, verifier)
+        elapsed = time.time() - start
+        checked = sum(counts[status] for status in ('ok', 'placeholder', 'broken', 'too_large', 'not_modified'))
+        print(f"Checked {checked} image URLs in {elapsed:.1f}s ({checked / elapsed if elapsed else 0:.1f}/s): "
+              f"{counts['ok']} ok, {counts['not_modified']} not modified, {counts['placeholder']} placeholder, "
+              f"{counts['broken']} broken, {counts['too_large']} too large; {counts['stored']} new images "
+              f"({counts['bytes'] / (1024 * 1024):.1f} MB downloaded)")
+        print(scheduler.summary())
+        if args.thumbnail:
+            thumb_start = time.time()
+            made = make_thumbnails(store, args.thumbnail, args.thumbnail_workers)
+            print(f"Made {made} thumbnails in {time.time() - thumb_start:.1f}s")
+        print(store.summary())
+        print(f"Wrote {args.output}")
+    finally:
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+"""Per-stage timing and counters for scrape runs.
+
+StageTimer collects wall-clock durations for the scraper's hot stages
+(page loads, readiness waits, extraction, detail pages, output writes)
+so runs can be compared by latency percentiles rather than total time.
+Metrics adds event counters and per-selector hit/miss counts for the
+fallback selector chains, and exports everything as JSON or as a
+Prometheus textfile (for node_exporter's textfile collector).
+"""
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+PROMETHEUS_PREFIX = "sysco"
+
+
+def percentile(sorted_samples, point):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_samples:
+        return 0.0
+    index = min(len(sorted_samples) - 1, max(0, int(round(point / 100 * len(sorted_samples))) - 1))
+    return sorted_samples[index]
+
+
+class StageTimer:
+    def __init__(self):
+        self.samples = {}  # stage -> list of durations in seconds
+        self._lock = threading.Lock()
+
+    def record(self, stage, seconds):
+        with self._lock:
+            self.samples.setdefault(stage, []).append(seconds)
+
+    @contextmanager
+    def time(self, stage):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, time.perf_counter() - start)
+
+    def summary(self, points=(50, 90, 99)):
+        """{stage: {'count', 'total', 'mean', 'p50', ...}} with times in seconds"""
+        with self._lock:
+            stages = {stage: sorted(samples) for stage, samples in self.samples.items()}
+        result = {}
+        for stage, samples in sorted(stages.items()):
+            total = sum(samples)
+            stats = {'count': len(samples), 'total': round(total, 6), 'mean': round(total / len(samples), 6)}
+            for point in points:
+                stats[f'p{point}'] = round(percentile(samples, point), 6)
+            result[stage] = stats
+        return result
+
+    def format_summary(self):
+        lines = [f"{'Stage':<20}{'count':>8}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'total s':>10}"]
+        for stage, stats in self.summary().items():
+            lines.append(f"{stage:<20}{stats['count']:>8}{stats['p50'] * 1000:>10.1f}"
+                         f"{stats['p90'] * 1000:>10.1f}{stats['p99'] * 1000:>10.1f}{stats['total']:>10.2f}")
+        return '\n'.join(lines)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in labels) + '}'
+
+
+class Metrics(StageTimer):
+    """Stage timings plus counters and selector statistics for one run"""
+    def __init__(self):
+        super().__init__()
+        self.counters = {}  # (name, ((label, value), ...)) -> count
+        self.selectors = {}  # (chain, selector) -> [hits, misses, hit seconds, miss seconds]
+
+    def incr(self, name, n=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + n
+
+    def count(self, name, **labels):
+        return self.counters.get((name, tuple(sorted(labels.items()))), 0)
+
+    def selector(self, chain, selector, hit, seconds=0.0):
+        """Record one lookup of a selector from a fallback chain"""
+        with self._lock:
+            stats = self.selectors.setdefault((chain, selector), [0, 0, 0.0, 0.0])
+            if hit:
+                stats[0] += 1
+                stats[2] += seconds
+            else:
+                stats[1] += 1
+                stats[3] += seconds
+
+    def selector_summary(self):
+        with self._lock:
+            items = sorted(self.selectors.items())
+        return [{'chain': chain, 'selector': selector, 'hits': hits, 'misses': misses,
+                 'hit_seconds': round(hit_seconds, 6), 'miss_seconds': round(miss_seconds, 6)}
+                for (chain, selector), (hits, misses, hit_seconds, miss_seconds) in items]
+
+    def description_rate(self):
+        found = self.count('descriptions', result='found')
+        attempts = found + self.count('descriptions', result='missing')
+        return found / attempts if attempts else None
+
+    def to_dict(self):
+        with self._lock:
+            counters = [{'name': name, 'labels': dict(labels), 'value': value}
+                        for (name, labels), value in sorted(self.counters.items())]
+        return {
+            'stages': self.summary(),
+            'counters': counters,
+            'selectors': self.selector_summary(),
+            'description_rate': self.description_rate(),
+        }
+
+    def write_json(self, path):
+        _write_atomic(path, json.dumps(self.to_dict(), indent=2))
+
+    def prometheus_lines(self):
+        prefix = PROMETHEUS_PREFIX
+        lines = [f"# HELP {prefix}_stage_seconds Time spent in each scrape stage",
+                 f"# TYPE {prefix}_stage_seconds summary"]
+        for stage, stats in self.summary().items():
+            for point in (50, 90, 99):
+                labels = _labels([('stage', stage), ('quantile', point / 100)])
+                lines.append(f"{prefix}_stage_seconds{labels} {stats[f'p{point}']}")
+            lines.append(f"{prefix}_stage_seconds_sum{_labels([('stage', stage)])} {stats['total']}")
+            lines.append(f"{prefix}_stage_seconds_count{_labels([('stage', stage)])} {stats['count']}")
+
+        lines += [f"# HELP {prefix}_selector_lookups_total Lookups per selector in the fallback chains",
+                  f"# TYPE {prefix}_selector_lookups_total counter"]
+        selectors = self.selector_summary()
+        for row in selectors:
+            for result, value in (('hit', row['hits']), ('miss', row['misses'])):
+                labels = _labels([('chain', row['chain']), ('selector', row['selector']), ('result', result)])
+                lines.append(f"{prefix}_selector_lookups_total{labels} {value}")
+        lines += [f"# HELP {prefix}_selector_seconds_total Wall time spent on selector lookups",
+                  f"# TYPE {prefix}_selector_seconds_total counter"]
+        for row in selectors:
+            for result in ('hit', 'miss'):
+                labels = _labels([('chain', row['chain']), ('selector', row['selector']), ('result', result)])
+                lines.append(f"{prefix}_selector_seconds_total{labels} {row[result + '_seconds']}")
+
+        with self._lock:
+            counters = sorted(self.counters.items())
+        for name in sorted({name for (name, _), _ in counters}):
+            lines.append(f"# TYPE {prefix}_{name}_total counter")
+            for (counter, labels), value in counters:
+                if counter == name:
+                    lines.append(f"{prefix}_{name}_total{_labels(labels)} {value}")
+        return lines
+
+    def write_prometheus(self, path):
+        _write_atomic(path, '\n'.join(self.prometheus_lines()) + '\n')
+
+    def format_selector_report(self, top=10):
+        """Selectors that cost the most time matching nothing"""
+        rows = sorted(self.selector_summary(), key=lambda row: (row['miss_seconds'], row['misses']), reverse=True)
+        lines = [f"{'Chain':<18}{'Selector':<44}{'hits':>8}{'misses':>8}{'miss s':>10}"]
+        for row in rows[:top]:
+            lines.append(f"{row['chain']:<18}{row['selector'][:43]:<44}{row['hits']:>8}"
+                         f"{row['misses']:>8}{row['miss_seconds']:>10.2f}")
+        return '\n'.join(lines)
+
+
+def _write_atomic(path, text):
+    """Write via a temporary file so readers never see a partial file"""
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(text)
+    os.replace(tmp_path, path)
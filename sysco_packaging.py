@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""Packaging text parsing.
+
+find_packaging() locates a pack-size string ("6/5 LB") in free text with
+the same rules the scraper has always used (the first pattern in order
+that matches anywhere wins, at its leftmost match), but scans each line
+once with a single combined regex instead of once per pattern.
+parse_packaging() turns a pack-size string into structured fields, and
+parse_csv() adds them to a scraped CSV.
+
+Usage:
+    python3 sysco_packaging.py sysco_products_oregon_full.csv parsed.csv
+"""
+
+import csv
+import re
+import sys
+from collections import namedtuple
+
+UNITS = r'CT|CS|EA|LB|OZ|GAL|QT|PT'
+
+PATTERNS = [
+    r'\b\d+[-/\d]*\s*(CT|CS|EA|LB|OZ|GAL|QT|PT)\b',
+    r'\b\d+\s*[xX]\s*\d+\s*(CT|CS|EA|LB|OZ)\b',
+    r'\b\d+\.\d+\s*(LB|OZ|GAL)\b',
+    r'\b\d+/\d+\s*(CT|CS|EA|LB|OZ)\b'
+]
+# Zero-width alternatives report every position where a pattern matches,
+# with the earliest pattern in order that matches there, and never consume
+# text another pattern could have matched
+COMBINED = re.compile('|'.join(f'(?=({pattern}))' for pattern in PATTERNS), re.IGNORECASE)
+# Quick check applied to text read from a packaging element
+HINT = re.compile(rf'\d+.*(?:{UNITS})', re.IGNORECASE)
+
+# "6/5 LB", "12/32OZ", "6/2/16 OZ", "2x5 LB", "2/5-6 LB", "1.5 LB", "50/CT"
+_NUMBER = r'\d+(?:\.\d+)?'
+# Spaces only (never newlines) between parts
+STRUCTURE = re.compile(
+    rf'(?<![\w.])(?P<counts>(?:{_NUMBER}[ \t]*[/xX][ \t]*)*)'
+    rf'(?P<size>{_NUMBER}(?:[ \t]*-[ \t]*{_NUMBER})?)?'
+    rf'[ \t]*(?P<unit>{UNITS})\b',
+    re.IGNORECASE
+)
+
+# Normalized units: weight in kg, volume in liters, counts as-is
+NORMALIZE = {
+    'LB': (0.45359237, 'kg'),
+    'OZ': (0.028349523125, 'kg'),
+    'GAL': (3.785411784, 'l'),
+    'QT': (0.946352946, 'l'),
+    'PT': (0.473176473, 'l'),
+    'CT': (1, 'ct'),
+    'EA': (1, 'ea'),
+    'CS': (1, 'cs'),
+}
+
+Packaging = namedtuple('Packaging', ['raw', 'pack_count', 'unit_size', 'unit', 'total_quantity', 'total_unit'])
+EMPTY = Packaging('', None, None, '', None, '')
+
+PARSED_FIELDS = ['pack_count', 'unit_size', 'unit', 'total_quantity', 'total_unit']
+
+
+def find_packaging(text):
+    """Find a pack-size string in free text, preferring the last three lines"""
+    if not text:
+        return ""
+    for line in reversed(text.split('\n')[-3:]):
+        found = _first_pattern_match(line)
+        if found:
+            return found
+    return _first_pattern_match(text)
+
+
+def _first_pattern_match(text):
+    """Leftmost match of the first of PATTERNS that matches text, from one scan"""
+    best = None
+    for match in COMBINED.finditer(text):
+        # lastindex is the outer group of the pattern reported here; earlier patterns have lower numbers.
+        # Each pattern is reported at its leftmost match unless an earlier pattern matches there too
+        if best is None or match.lastindex < best.lastindex:
+            best = match
+            if best.lastindex == 1:
+                break
+    return best.group(best.lastindex) if best else ""
+
+
+def _from_match(match):
+    counts = [float(n) for n in re.findall(_NUMBER, match.group('counts'))]
+    size = match.group('size')
+    unit = match.group('unit').upper()
+    if size:
+        low, _, high = size.partition('-')
+        unit_size = (float(low) + float(high)) / 2 if high else float(low)
+    elif counts:
+        # "50/CT": fifty of the unit
+        unit_size = 1.0
+    else:
+        return None
+    pack_count = 1.0
+    for count in counts:
+        pack_count *= count
+
+    factor, total_unit = NORMALIZE[unit]
+    total = round(pack_count * unit_size * factor, 4)
+    return Packaging(match.group(0).strip(), _number(pack_count), _number(unit_size), unit,
+                     _number(total), total_unit)
+
+
+def _number(value):
+    return int(value) if value == int(value) else value
+
+
+def parse_packaging(text):
+    """Structured fields for the first pack size in text, or EMPTY"""
+    if not text:
+        return EMPTY
+    for match in STRUCTURE.finditer(' '.join(text.split())):
+        parsed = _from_match(match)
+        if parsed:
+            return parsed
+    return EMPTY
+
+
+def parse_csv(input_path, output_path):
+    """Add structured packaging columns to a scraped CSV.
+
+    Rows without packaging_info fall back to the pack size found in the
+    product name, as the scraper does with a tile's text.
+    """
+    with open(input_path, newline='', encoding='utf-8') as f:
+        reader = csv.DictReader(f)
+        fieldnames = list(reader.fieldnames)
+        rows = list(reader)
+
+    texts = [row.get('packaging_info') or find_packaging(row.get('product_name', '')) for row in rows]
+    parsed = [parse_packaging(text) for text in texts]
+
+    with open(output_path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=fieldnames + [n for n in PARSED_FIELDS if n not in fieldnames])
+        writer.writeheader()
+        for row, packaging in zip(rows, parsed):
+            for name in PARSED_FIELDS:
+                value = getattr(packaging, name)
+                row[name] = '' if value is None else value
+            writer.writerow(row)
+    return sum(1 for packaging in parsed if packaging.unit)
+
+
+def main():
+    if len(sys.argv) != 3:
+        print(__doc__.strip().split('Usage:')[-1].strip())
+        sys.exit(1)
+    parsed = parse_csv(sys.argv[1], sys.argv[2])
+    print(f"Parsed packaging for {parsed} products into {sys.argv[2]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+"""Pagination planning for category listings.
+
+The first listing page of a category shows how many results the category
+has; with the number of products on that page this gives the exact list
+of pages to visit, so no requests are spent on empty trailing pages and
+large categories are not cut off at a fixed page limit. When the count
+cannot be read, pages are walked in order until several in a row come
+back empty.
+
+The page size is the number of distinct product links on page 1, which
+carousels or recommendation tiles can inflate, making the plan too short.
+So the walk goes on past the planned last page while that page is full
+or fewer products than the result count have been found.
+"""
+
+import math
+import re
+
+from sysco_html import SKU_PATTERN, element_text
+
+# Where the result count is shown on a listing page, most specific first
+RESULT_COUNT_SELECTORS = [
+    '[data-id*="result_count"]',
+    '[data-testid*="result-count"]',
+    '[class*="results-count"]',
+    '[class*="result-count"]',
+    '[class*="resultCount"]',
+]
+COUNT_PATTERN = re.compile(r'(\d[\d,]*)\s*(?:results?|products?|items?)\b', re.IGNORECASE)
+OF_PATTERN = re.compile(r'\bof\s+(\d[\d,]*)\b', re.IGNORECASE)
+
+# Result-count text and number of distinct products on the loaded page, in one round trip
+LISTING_COUNT_JS = """
+const [countSelectors, linkSelectors] = arguments;
+let countText = null;
+for (const selector of countSelectors) {
+    let el = null;
+    try { el = document.querySelector(selector); } catch (e) { continue; }
+    if (el && el.innerText && el.innerText.trim()) { countText = el.innerText; break; }
+}
+let links = [];
+for (const selector of linkSelectors) {
+    links = Array.from(document.querySelectorAll(selector));
+    if (links.length) break;
+}
+const skus = new Set();
+for (const link of links) {
+    const match = link.href && link.href.match(/\\/product\\/(\\d+)/);
+    if (match) skus.add(match[1]);
+}
+return [countText, skus.size];
+"""
+
+
+def parse_result_count(text):
+    """Total results from text such as "445 Results" or "1-24 of 2,182"; None if absent"""
+    if not text:
+        return None
+    match = OF_PATTERN.search(text) or COUNT_PATTERN.search(text)
+    if not match:
+        return None
+    return int(match.group(1).replace(',', ''))
+
+
+def listing_counts_from_driver(driver, link_selectors):
+    """(result count, products on the page) for the page loaded in a browser"""
+    count_text, page_size = driver.execute_script(LISTING_COUNT_JS, RESULT_COUNT_SELECTORS, link_selectors)
+    return parse_result_count(count_text), page_size
+
+
+def listing_counts_from_tree(root, link_selectors):
+    """(result count, products on the page) for a parsed listing page"""
+    result_count = None
+    for selector in RESULT_COUNT_SELECTORS:
+        element = root.select_one(selector)
+        if element is not None:
+            result_count = parse_result_count(element_text(element))
+            if result_count is not None:
+                break
+
+    links = []
+    for selector in link_selectors:
+        links = root.select(selector)
+        if links:
+            break
+    skus = {match.group(1) for match in (SKU_PATTERN.search(link.get('href') or '') for link in links) if match}
+    return result_count, len(skus)
+
+
+class EmptyPage(Exception):
+    """A planned page before the category's last came back without products"""
+
+
+class PaginationPlan:
+    """Pages to visit for one category.
+
+    Page 1 always comes first. Once set_count() has the result count and
+    page size, the page list is planned and only extended while it looks
+    short (see beyond_plan()); until then pages are walked in order and the
+    walk ends after `empty_limit` consecutive empty pages or at `max_pages`.
+    """
+    def __init__(self, max_pages=100, empty_limit=3, total_pages=None, result_count=None, page_size=None):
+        self.max_pages = max_pages
+        self.empty_limit = empty_limit
+        self.total_pages = total_pages
+        self.result_count = result_count
+        self.page_size = page_size
+        self.consecutive_empty = 0
+        self.collected = 0  # Products found on the recorded pages
+        self.page_counts = {}  # page -> products found
+
+    def set_count(self, result_count, page_size):
+        """Fix the page list from page 1's figures; False if they are missing or implausible"""
+        if result_count == 0 and not page_size:
+            self.total_pages = 1
+            return True
+        if not result_count or not page_size or result_count < page_size:
+            return False
+        self.total_pages = math.ceil(result_count / page_size)
+        self.result_count = result_count
+        self.page_size = page_size
+        return True
+
+    def record(self, page, product_count):
+        self.consecutive_empty = 0 if product_count else self.consecutive_empty + 1
+        self.collected += product_count - self.page_counts.get(page, 0)
+        self.page_counts[page] = product_count
+
+    def beyond_plan(self, page):
+        """True when `page` is the planned last page or past it, yet the category does not look finished:
+        the page had a full page of products, or fewer than the result count were found so far"""
+        if self.total_pages is None or page < self.total_pages or page >= self.max_pages:
+            return False
+        count = self.page_counts.get(page)
+        if not count:
+            return False
+        return bool(self.page_size and count >= self.page_size
+                    or self.result_count and self.collected < self.result_count)
+
+    def exhausted(self, page):
+        """True when no page after `page` needs visiting"""
+        if self.total_pages is not None:
+            return page >= self.total_pages and not self.beyond_plan(page)
+        return self.consecutive_empty >= self.empty_limit or page >= self.max_pages
+
+    def truncated(self, page):
+        """True when the heuristic walk stopped at max_pages rather than at empty pages"""
+        return (self.total_pages is None and page >= self.max_pages
+                and self.consecutive_empty < self.empty_limit)
+
+    def mid_category(self, page):
+        """True for a planned page that has pages after it, so it cannot legitimately be empty"""
+        return self.total_pages is not None and 1 < page < self.total_pages
+
+    def pages_after(self, page):
+        """Remaining planned pages, for handing out to concurrent fetchers; the next page when the plan fell short"""
+        if self.total_pages is None:
+            return []
+        if self.beyond_plan(page):
+            return [page + 1]
+        return list(range(page + 1, self.total_pages + 1))
+
+    def __iter__(self):
+        page = 1
+        while True:
+            yield page
+            if self.exhausted(page):
+                return
+            page += 1
@@ -0,0 +1,326 @@
+"""Leased work queue for multi-region scrapes.
+
+Work is split into (zip_code, category, page) tasks kept in SQLite, so
+any number of worker processes on one host can share one queue file
+(SQLite's WAL mode relies on shared memory, so the file cannot be shared
+over a network filesystem). A worker leases a task for a limited time
+and keeps the lease alive with heartbeats while it runs; a task whose
+worker dies is leased again once its lease expires, and failed tasks are
+retried with exponential backoff until they run out of attempts. Each
+category starts as a page-1 task, and the worker that scrapes page 1
+enqueues the category's remaining pages and records its page plan, so
+the worker that gets the last planned page can tell whether the plan
+fell short and enqueue the page after it.
+
+SkuStore dedups products across regions in the same database. Every
+(zip_code, SKU) pair is recorded as available, but only the first page
+to claim a SKU in any region writes it out and fetches its details.
+"""
+
+import logging
+import sqlite3
+import threading
+import time
+import uuid
+from collections import namedtuple
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    id INTEGER PRIMARY KEY,
+    zip_code TEXT NOT NULL,
+    category TEXT NOT NULL,
+    category_id TEXT NOT NULL,
+    page INTEGER NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    available_at REAL NOT NULL DEFAULT 0,
+    worker TEXT,
+    token TEXT,
+    lease_expires REAL,
+    product_count INTEGER,
+    error TEXT,
+    finished_at REAL,
+    UNIQUE (zip_code, category, page)
+);
+CREATE INDEX IF NOT EXISTS tasks_ready ON tasks (status, available_at);
+CREATE TABLE IF NOT EXISTS plans (
+    zip_code TEXT NOT NULL,
+    category TEXT NOT NULL,
+    total_pages INTEGER NOT NULL,
+    result_count INTEGER,
+    page_size INTEGER,
+    found INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (zip_code, category)
+);
+CREATE TABLE IF NOT EXISTS skus (
+    sku TEXT PRIMARY KEY,
+    zip_code TEXT NOT NULL,
+    category TEXT NOT NULL,
+    page INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS availability (
+    zip_code TEXT NOT NULL,
+    sku TEXT NOT NULL,
+    category TEXT NOT NULL,
+    first_seen REAL NOT NULL,
+    PRIMARY KEY (zip_code, sku)
+);
+"""
+
+Task = namedtuple('Task', ['id', 'zip_code', 'category', 'category_id', 'page', 'attempts', 'token'])
+
+
+def connect(path, timeout=30.0):
+    """Connection shared safely between processes on this host: WAL journal, waits on locks, explicit transactions"""
+    conn = sqlite3.connect(path, timeout=timeout, isolation_level=None, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+class WorkQueue:
+    def __init__(self, path="sysco_queue.db", lease_seconds=300, max_attempts=3, retry_delay=30):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay  # Seconds before the first retry, doubled for each later one
+        self.conn = connect(path)
+        self._lock = threading.Lock()  # The heartbeat thread shares the connection
+
+    def _transaction(self):
+        """BEGIN IMMEDIATE takes the write lock up front, so two workers cannot lease the same task"""
+        self.conn.execute("BEGIN IMMEDIATE")
+
+    def enqueue(self, tasks):
+        """Add (zip_code, category, category_id, page) tasks; existing ones are kept. Returns how many were added"""
+        with self._lock:
+            self._transaction()
+            try:
+                added = self._insert(tasks)
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+        return added
+
+    def _insert(self, tasks):
+        before = self.conn.total_changes
+        self.conn.executemany(
+            "INSERT OR IGNORE INTO tasks (zip_code, category, category_id, page) VALUES (?, ?, ?, ?)", tasks
+        )
+        return self.conn.total_changes - before
+
+    def lease(self, worker, prefer_zip=None):
+        """Lease the next ready task, favouring `prefer_zip` so workers rarely change location; None if none is ready"""
+        now = time.time()
+        with self._lock:
+            self._transaction()
+            try:
+                # Leases that expired on their last attempt are not handed out again
+                self.conn.execute(
+                    "UPDATE tasks SET status = 'failed', error = 'lease expired', token = NULL "
+                    "WHERE status = 'leased' AND lease_expires < ? AND attempts >= ?",
+                    (now, self.max_attempts)
+                )
+                row = self.conn.execute(
+                    "SELECT id, zip_code, category, category_id, page, attempts FROM tasks "
+                    "WHERE (status = 'pending' AND available_at <= ?) OR (status = 'leased' AND lease_expires < ?) "
+                    "ORDER BY zip_code = ? DESC, id LIMIT 1",
+                    (now, now, prefer_zip)
+                ).fetchone()
+                if row is None:
+                    self.conn.execute("COMMIT")
+                    return None
+                token = uuid.uuid4().hex
+                self.conn.execute(
+                    "UPDATE tasks SET status = 'leased', attempts = attempts + 1, worker = ?, token = ?, "
+                    "lease_expires = ? WHERE id = ?",
+                    (worker, token, now + self.lease_seconds, row[0])
+                )
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+        return Task(*row[:5], row[5] + 1, token)
+
+    def _update_leased(self, task, sql, params):
+        """Run an UPDATE on a task only while `task` still holds its lease; False if the lease was lost"""
+        with self._lock:
+            cursor = self.conn.execute(f"{sql} WHERE id = ? AND token = ? AND status = 'leased'",
+                                       (*params, task.id, task.token))
+        return cursor.rowcount == 1
+
+    def heartbeat(self, task):
+        """Extend a task's lease; False if it expired and was handed to another worker"""
+        return self._update_leased(task, "UPDATE tasks SET lease_expires = ?",
+                                   (time.time() + self.lease_seconds,))
+
+    def complete(self, task, product_count, next_pages=(), found=0, plan=None):
+        """Mark a task done and enqueue the category pages it planned, in one transaction.
+
+        `found` is the number of products the page listed, before dedup;
+        page 1 also passes its (total_pages, result_count, page_size) plan.
+        """
+        with self._lock:
+            self._transaction()
+            try:
+                cursor = self.conn.execute(
+                    "UPDATE tasks SET status = 'done', product_count = ?, finished_at = ?, token = NULL, "
+                    "error = NULL WHERE id = ? AND token = ? AND status = 'leased'",
+                    (product_count, time.time(), task.id, task.token)
+                )
+                done = cursor.rowcount == 1
+                if done:
+                    self._insert([(task.zip_code, task.category, task.category_id, page) for page in next_pages])
+                    if plan is not None:
+                        self.conn.execute(
+                            "INSERT OR REPLACE INTO plans (zip_code, category, total_pages, result_count, page_size, "
+                            "found) VALUES (?, ?, ?, ?, ?, ?)", (task.zip_code, task.category, *plan, found)
+                        )
+                    elif found:
+                        self.conn.execute("UPDATE plans SET found = found + ? WHERE zip_code = ? AND category = ?",
+                                          (found, task.zip_code, task.category))
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+        return done
+
+    def plan(self, zip_code, category):
+        """(total_pages, result_count, page_size, products found so far) of a planned category, or None"""
+        with self._lock:
+            return self.conn.execute(
+                "SELECT total_pages, result_count, page_size, found FROM plans WHERE zip_code = ? AND category = ?",
+                (zip_code, category)
+            ).fetchone()
+
+    def fail(self, task, error):
+        """Give a task back for a later retry, or mark it failed after max_attempts"""
+        if task.attempts >= self.max_attempts:
+            return self._update_leased(task, "UPDATE tasks SET status = 'failed', error = ?, token = NULL",
+                                       (str(error),))
+        delay = self.retry_delay * 2 ** (task.attempts - 1)
+        return self._update_leased(
+            task, "UPDATE tasks SET status = 'pending', error = ?, token = NULL, available_at = ?",
+            (str(error), time.time() + delay)
+        )
+
+    def retry_failed(self):
+        """Make failed tasks pending again with a fresh set of attempts; returns how many"""
+        with self._lock:
+            cursor = self.conn.execute(
+                "UPDATE tasks SET status = 'pending', attempts = 0, available_at = 0 WHERE status = 'failed'"
+            )
+        return cursor.rowcount
+
+    def idle(self):
+        """True when no task is pending or leased, so no more work can appear"""
+        with self._lock:
+            row = self.conn.execute("SELECT 1 FROM tasks WHERE status IN ('pending', 'leased') LIMIT 1").fetchone()
+        return row is None
+
+    def stats(self):
+        """{zip_code: {status: task count}}"""
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT zip_code, status, COUNT(*) FROM tasks GROUP BY zip_code, status"
+            ).fetchall()
+        result = {}
+        for zip_code, status, count in rows:
+            result.setdefault(zip_code, {})[status] = count
+        return result
+
+    def format_status(self):
+        lines = [f"{'Zip code':<12}{'pending':>10}{'leased':>10}{'done':>10}{'failed':>10}"]
+        for zip_code, counts in sorted(self.stats().items()):
+            lines.append(f"{zip_code:<12}" + ''.join(f"{counts.get(status, 0):>10}"
+                                                      for status in ('pending', 'leased', 'done', 'failed')))
+        return '\n'.join(lines)
+
+    def close(self):
+        self.conn.close()
+
+
+class LeaseHeartbeat:
+    """Background thread that keeps a task's lease alive while it runs"""
+    def __init__(self, queue, task, interval=None):
+        self.queue = queue
+        self.task = task
+        self.interval = interval or max(1.0, queue.lease_seconds / 3)
+        self.lost = False
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                alive = self.queue.heartbeat(self.task)
+            except sqlite3.Error as e:
+                logging.warning(f"Heartbeat for task {self.task.id} failed: {e}")
+                continue
+            if not alive:
+                self.lost = True
+                logging.warning(f"Lost the lease on task {self.task.id} ({self.task.category} page {self.task.page})")
+                return
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+class SkuStore:
+    """Cross-region SKU dedup and per-zip availability, shared by all workers of a queue"""
+    def __init__(self, path="sysco_queue.db"):
+        self.path = path
+        self.conn = connect(path)
+        self._lock = threading.Lock()
+
+    def claim(self, zip_code, category, page, products):
+        """Record a page's products as available in `zip_code`; returns the ones no other page has claimed.
+
+        A retry of the same (zip_code, category, page) gets back the SKUs
+        its failed attempt claimed, so a crash never loses products.
+        """
+        now = time.time()
+        skus = [p['sku'] for p in products]
+        with self._lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                self.conn.executemany(
+                    "INSERT OR IGNORE INTO availability (zip_code, sku, category, first_seen) VALUES (?, ?, ?, ?)",
+                    [(zip_code, sku, category, now) for sku in skus]
+                )
+                self.conn.executemany(
+                    "INSERT OR IGNORE INTO skus (sku, zip_code, category, page) VALUES (?, ?, ?, ?)",
+                    [(sku, zip_code, category, page) for sku in skus]
+                )
+                owned = set()
+                for sku in skus:
+                    row = self.conn.execute("SELECT zip_code, category, page FROM skus WHERE sku = ?",
+                                            (sku,)).fetchone()
+                    if row == (zip_code, category, page):
+                        owned.add(sku)
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+        return [p for p in products if p['sku'] in owned]
+
+    def release(self, zip_code, category, page):
+        """Drop the SKU claims of a page that failed before writing them, so any page can claim them again"""
+        with self._lock:
+            self.conn.execute("DELETE FROM skus WHERE zip_code = ? AND category = ? AND page = ?",
+                              (zip_code, category, page))
+
+    def availability_counts(self):
+        """{zip_code: number of SKUs seen there}"""
+        with self._lock:
+            return dict(self.conn.execute("SELECT zip_code, COUNT(*) FROM availability GROUP BY zip_code"))
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,306 @@
+"""Host-aware request scheduling: pacing, adaptive concurrency and retries.
+
+Every page fetch, in the browser or over HTTP, asks the RequestScheduler
+for permission first. Each host gets an AIMD concurrency limit, which
+grows by one per window of successful requests and is cut multiplicatively
+when the host throttles, fails or slows down well past its usual latency,
+and a token bucket for its request rate. The bucket starts at the
+configured ceiling (none by default); the first throttle sets it to a
+fraction of the rate actually being sent, and from then on it creeps back
+up with successes and is cut again on every throttle, settling just under
+the rate the host tolerates. Throttling also pauses the host for a cooldown
+(at least its Retry-After).
+
+Failed and throttled fetches are retried with jittered exponential
+backoff. Retries come out of a budget proportional to first attempts, so
+a struggling site cannot be hit with a multiple of the normal load.
+
+Pages that come back without products are checked with looks_throttled()
+so block and rate-limit pages are retried instead of being counted as
+genuinely empty ones.
+"""
+
+import asyncio
+import logging
+import random
+import re
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+
+THROTTLE_STATUSES = {403, 429, 503}
+BLOCK_PATTERN = re.compile(
+    r"too many requests|rate limit|access denied|unusual traffic|are you a robot|verify you are (a )?human|"
+    r"request (was )?blocked|temporarily unavailable|try again later|captcha",
+    re.IGNORECASE
+)
+_HIDDEN_PATTERN = re.compile(r'<(script|style|noscript)\b.*?</\1\s*>', re.IGNORECASE | re.DOTALL)
+_TAG_PATTERN = re.compile(r'<[^>]+>')
+
+# Title and visible text of the loaded page, enough to recognise a block page
+PAGE_TEXT_JS = "return (document.title || '') + '\\n' + (document.body ? document.body.innerText.slice(0, 5000) : '')"
+
+SLOT_POLL_INTERVAL = 0.05  # Seconds between checks while a host is at its concurrency limit
+LATENCY_ALPHA = 0.1  # Weight of each new sample in a host's latency average
+LATENCY_WARMUP = 10  # Samples before latency can count as congestion
+RATE_BACKOFF = 0.7  # Share of the sending rate kept after a throttle
+MIN_RATE = 0.2  # Requests per second a throttling host is never paced below
+RATE_STEP = 1.0  # Requests per second the rate grows by per second of successes
+
+
+class PageThrottled(Exception):
+    """A page was still throttled or failing when its retries ran out"""
+
+
+def looks_throttled(status=None, text=''):
+    """True for a throttling status code, or a block or challenge page where content should be"""
+    if status in THROTTLE_STATUSES:
+        return True
+    if not text:
+        return False
+    visible = _TAG_PATTERN.sub(' ', _HIDDEN_PATTERN.sub(' ', text))
+    return BLOCK_PATTERN.search(visible) is not None
+
+
+def page_text(driver):
+    try:
+        return driver.execute_script(PAGE_TEXT_JS) or ''
+    except Exception:
+        return ''
+
+
+def retry_after_seconds(value):
+    """Seconds from a Retry-After header (delta seconds or an HTTP date); None if absent or unreadable"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def host_of(url):
+    return urlsplit(url).netloc or url
+
+
+class TokenBucket:
+    """Allows `rate` requests per second on average with bursts of up to one second's worth; no limit when rate is None"""
+    def __init__(self, rate=None):
+        self.rate = None
+        self.burst = 1.0
+        self.tokens = 1.0
+        self.updated = time.monotonic()
+        self.set_rate(rate)
+
+    def set_rate(self, rate):
+        self.rate = rate or None
+        if self.rate:
+            self.burst = max(1.0, self.rate)
+            self.tokens = min(self.tokens, self.burst)
+
+    def reserve(self, now):
+        """Take a token; returns how long to wait before using it (0 when one was available)"""
+        if not self.rate:
+            return 0.0
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        self.tokens -= 1
+        return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+
+class HostLimiter:
+    """Rate limit, AIMD concurrency limit and cooldown for one host"""
+    def __init__(self, host, max_rate, concurrency, max_concurrency, latency_tolerance=3.0):
+        self.host = host
+        self.max_rate = max_rate or None
+        self.bucket = TokenBucket(self.max_rate)
+        self.limit = float(concurrency)
+        self.max_concurrency = max_concurrency
+        self.latency_tolerance = latency_tolerance
+        self.in_flight = 0
+        self.cooldown_until = 0.0
+        self.consecutive_throttles = 0
+        self.latency = None  # Moving average of successful request times
+        self.samples = 0
+        self.since_decrease = 0
+        self.window_start = time.monotonic()
+        self.window_requests = 0
+        self.send_rate = None  # Requests per second admitted over the last full second
+        self.counts = {'requests': 0, 'ok': 0, 'throttled': 0, 'error': 0, 'slow': 0}
+        self._lock = threading.Lock()
+
+    def try_acquire(self):
+        """(admitted, seconds to sleep): after an admission the sleep paces the request, otherwise it is a pause before trying again"""
+        now = time.monotonic()
+        with self._lock:
+            if now < self.cooldown_until:
+                return False, self.cooldown_until - now
+            if self.in_flight >= max(1, int(self.limit)):
+                return False, SLOT_POLL_INTERVAL
+            self.in_flight += 1
+            self.counts['requests'] += 1
+            self.window_requests += 1
+            if now - self.window_start >= 1.0:
+                self.send_rate = self.window_requests / (now - self.window_start)
+                self.window_start, self.window_requests = now, 0
+            return True, self.bucket.reserve(now)
+
+    def release(self, outcome, seconds, retry_after=None, base_delay=1.0, max_delay=120.0):
+        with self._lock:
+            self.in_flight = max(0, self.in_flight - 1)
+        self.observe(outcome, seconds, retry_after, base_delay, max_delay)
+
+    def observe(self, outcome, seconds=None, retry_after=None, base_delay=1.0, max_delay=120.0):
+        """Adjust the limits for one outcome: 'ok', 'error' or 'throttled'"""
+        with self._lock:
+            self.since_decrease += 1
+            if outcome == 'throttled':
+                self.counts['throttled'] += 1
+                self.consecutive_throttles += 1
+                if self._decrease(0.5):
+                    sent = self.send_rate or self.bucket.rate or self.limit
+                    self.bucket.set_rate(max(MIN_RATE, RATE_BACKOFF * min(sent, self.bucket.rate or sent)))
+                pause = min(max_delay, base_delay * 2 ** (self.consecutive_throttles - 1))
+                self.cooldown_until = max(self.cooldown_until, time.monotonic() + max(pause, retry_after or 0))
+                return
+            if outcome == 'error':
+                self.counts['error'] += 1
+                self._decrease(0.5)
+                return
+
+            self.counts['ok'] += 1
+            self.consecutive_throttles = 0
+            slow = (seconds is not None and self.samples >= LATENCY_WARMUP
+                    and seconds > self.latency * self.latency_tolerance)
+            if seconds is not None:
+                self.latency = seconds if self.latency is None else (
+                    self.latency + LATENCY_ALPHA * (seconds - self.latency))
+                self.samples += 1
+            if slow:
+                self.counts['slow'] += 1
+                self._decrease(0.9)
+            else:
+                # Additive increase: about one more concurrent request per window of successes
+                self.limit = min(self.max_concurrency, self.limit + 1 / self.limit)
+                if self.bucket.rate:
+                    self.bucket.set_rate(min(self.max_rate or float('inf'),
+                                             self.bucket.rate + RATE_STEP / self.bucket.rate))
+
+    def _decrease(self, factor):
+        """Cut the concurrency limit, at most once per window of requests so one burst of failures does not collapse it"""
+        if self.since_decrease < self.limit:
+            return False
+        self.limit = max(1.0, self.limit * factor)
+        self.since_decrease = 0
+        return True
+
+    def summary(self):
+        counts = self.counts
+        rate = f"{self.bucket.rate:.1f}/s" if self.bucket.rate else "unlimited"
+        return (f"{self.host}: {counts['requests']} requests, {counts['throttled']} throttled, "
+                f"{counts['error']} errors, {counts['slow']} slow, concurrency limit {self.limit:.1f}, rate {rate}")
+
+
+class RetryBudget:
+    """Retries allowed as a share of first attempts plus a fixed allowance"""
+    def __init__(self, ratio=0.2, minimum=20):
+        self.ratio = ratio
+        self.minimum = minimum
+        self.attempts = 0
+        self.retries = 0
+        self._lock = threading.Lock()
+
+    def record_attempt(self):
+        with self._lock:
+            self.attempts += 1
+
+    def try_spend(self):
+        with self._lock:
+            if self.retries >= self.minimum + self.ratio * self.attempts:
+                return False
+            self.retries += 1
+            return True
+
+
+class RequestScheduler:
+    """Per-host limiters plus the shared retry policy for every page fetch"""
+    def __init__(self, max_rate=None, concurrency=4, max_concurrency=32, max_retries=4,
+                 base_delay=1.0, max_delay=120.0, retry_ratio=0.2, retry_minimum=20, metrics=None):
+        self.max_rate = max_rate  # Ceiling for each host's request rate, None for no ceiling
+        self.concurrency = concurrency  # Starting concurrency limit per host
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries  # Retries per page after its first attempt
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.budget = RetryBudget(retry_ratio, retry_minimum)
+        self.metrics = metrics  # Optional Metrics that gets request outcomes and retries
+        self.limiters = {}
+        self._lock = threading.Lock()
+
+    def limiter(self, url):
+        host = host_of(url)
+        with self._lock:
+            if host not in self.limiters:
+                self.limiters[host] = HostLimiter(host, self.max_rate, self.concurrency, self.max_concurrency)
+            return self.limiters[host]
+
+    def acquire(self, url, retry=False):
+        """Block until the host admits another request"""
+        limiter = self.limiter(url)
+        while True:
+            admitted, delay = limiter.try_acquire()
+            if delay > 0:
+                time.sleep(delay)
+            if admitted:
+                break
+        if not retry:
+            self.budget.record_attempt()
+
+    async def acquire_async(self, url, retry=False):
+        limiter = self.limiter(url)
+        while True:
+            admitted, delay = limiter.try_acquire()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            if admitted:
+                break
+        if not retry:
+            self.budget.record_attempt()
+
+    def release(self, url, outcome, seconds, retry_after=None):
+        """End a request admitted by acquire(); outcome is 'ok', 'error' or 'throttled'"""
+        limiter = self.limiter(url)
+        limiter.release(outcome, seconds, retry_after, self.base_delay, self.max_delay)
+        if self.metrics:
+            self.metrics.incr('requests', host=limiter.host, outcome=outcome)
+
+    def throttled(self, url, retry_after=None):
+        """Report a page recognised as throttled after its request had already ended"""
+        limiter = self.limiter(url)
+        limiter.observe('throttled', retry_after=retry_after, base_delay=self.base_delay, max_delay=self.max_delay)
+        if self.metrics:
+            self.metrics.incr('throttled_pages', host=limiter.host)
+
+    def retry_delay(self, url, attempt, retry_after=None):
+        """Backoff before retry number `attempt` + 1 of a page; None when its retries or the budget ran out"""
+        if attempt >= self.max_retries:
+            return None
+        if not self.budget.try_spend():
+            logging.warning(f"Retry budget exhausted, not retrying {url}")
+            return None
+        if self.metrics:
+            self.metrics.incr('retries', host=self.limiter(url).host)
+        ceiling = min(self.max_delay, self.base_delay * 2 ** attempt)
+        return max(retry_after or 0.0, ceiling / 2 + random.uniform(0, ceiling / 2))
+
+    def summary(self):
+        with self._lock:
+            limiters = list(self.limiters.values())
+        lines = [limiter.summary() for limiter in limiters]
+        lines.append(f"{self.budget.retries} retries of {self.budget.attempts} requests")
+        return "Request scheduler - " + "; ".join(lines)
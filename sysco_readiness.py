@@ -0,0 +1,211 @@
+"""Signal-based page readiness for the Selenium scraper.
+
+Instead of fixed sleeps, PageReadiness polls for the condition a page type
+actually needs (product links that stop changing, the description node,
+network idle from Chrome's CDP performance log) and gives up after a
+per-page-type timeout that adapts to the load times it has observed.
+"""
+
+import json
+import logging
+import threading
+import time
+from collections import deque
+
+from selenium.common.exceptions import InvalidSessionIdException
+from urllib3.exceptions import HTTPError as Urllib3Error
+
+# Initial timeout and ceiling, in seconds, for each page type
+PAGE_TIMEOUTS = {
+    'home': (15.0, 30.0),
+    'location': (5.0, 10.0),
+    'listing': (10.0, 20.0),
+    'detail': (10.0, 20.0),
+}
+MIN_TIMEOUT = 2.0
+TIMEOUT_FACTOR = 3.0  # Timeout is this multiple of the observed 95th percentile
+MIN_SAMPLES = 5
+
+POLL_INTERVAL = 0.1
+IDLE_WINDOW = 0.5  # Seconds with no requests in flight to call the network idle
+STABLE_WINDOW = 0.4  # Seconds the product-link count must hold steady
+STALE_REQUEST = 10.0  # Requests in flight longer than this are ignored (long polling)
+STREAMING_TYPES = {'WebSocket', 'EventSource'}
+# The browser or chromedriver is gone, so polling again cannot succeed; these reach the caller
+DEAD_BROWSER_ERRORS = (InvalidSessionIdException, Urllib3Error, ConnectionError)
+
+
+class NetworkMonitor:
+    """Tracks in-flight requests for one browser from its CDP performance log"""
+    def __init__(self):
+        self.inflight = {}
+        self.last_activity = time.time()
+        self.available = True
+
+    def update(self, driver):
+        try:
+            entries = driver.get_log('performance')
+        except DEAD_BROWSER_ERRORS:
+            raise
+        except Exception:
+            self.available = False
+            return
+        now = time.time()
+        for entry in entries:
+            try:
+                message = json.loads(entry['message'])['message']
+            except (KeyError, ValueError):
+                continue
+            method = message.get('method', '')
+            params = message.get('params', {})
+            if method == 'Network.requestWillBeSent':
+                if params.get('type') not in STREAMING_TYPES:
+                    self.inflight[params.get('requestId')] = now
+                    self.last_activity = now
+            elif method in ('Network.loadingFinished', 'Network.loadingFailed'):
+                if self.inflight.pop(params.get('requestId'), None) is not None:
+                    self.last_activity = now
+        for request_id, started in list(self.inflight.items()):
+            if now - started > STALE_REQUEST:
+                del self.inflight[request_id]
+
+    def idle(self, driver):
+        self.update(driver)
+        if not self.available:
+            return document_complete(driver)
+        return not self.inflight and time.time() - self.last_activity >= IDLE_WINDOW
+
+
+def document_complete(driver):
+    try:
+        return driver.execute_script("return document.readyState") == 'complete'
+    except DEAD_BROWSER_ERRORS:
+        raise
+    except Exception:
+        return False
+
+
+class PageReadiness:
+    """Waits for pages to be ready and records how long each wait took"""
+    def __init__(self, timings=None):
+        self.timings = timings  # Optional StageTimer that also gets every wait
+        self.durations = {page_type: deque(maxlen=200) for page_type in PAGE_TIMEOUTS}
+        self.waits = {page_type: 0 for page_type in PAGE_TIMEOUTS}
+        self.timeouts = {page_type: 0 for page_type in PAGE_TIMEOUTS}
+        self.total_seconds = {page_type: 0.0 for page_type in PAGE_TIMEOUTS}
+        self._monitors = {}
+        self._lock = threading.Lock()
+
+    def timeout_for(self, page_type):
+        """Current timeout: a multiple of the observed p95, within [MIN_TIMEOUT, ceiling]"""
+        initial, ceiling = PAGE_TIMEOUTS[page_type]
+        with self._lock:
+            samples = sorted(self.durations[page_type])
+        if len(samples) < MIN_SAMPLES:
+            return initial
+        p95 = samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+        return min(ceiling, max(MIN_TIMEOUT, p95 * TIMEOUT_FACTOR))
+
+    def monitor(self, driver):
+        key = getattr(driver, 'session_id', None) or id(driver)
+        with self._lock:
+            if key not in self._monitors:
+                self._monitors[key] = NetworkMonitor()
+            return self._monitors[key]
+
+    def wait(self, driver, page_type, condition):
+        """Poll condition(driver) until it returns a truthy value or the page type times out.
+
+        Errors from the condition count as not ready yet, except those of a
+        dead browser, which are raised so the caller can restart it.
+        """
+        timeout = self.timeout_for(page_type)
+        start = time.time()
+        result = None
+        while True:
+            try:
+                result = condition(driver)
+            except DEAD_BROWSER_ERRORS:
+                raise
+            except Exception:
+                result = None
+            elapsed = time.time() - start
+            if result or elapsed >= timeout:
+                break
+            time.sleep(POLL_INTERVAL)
+
+        with self._lock:
+            self.waits[page_type] += 1
+            self.total_seconds[page_type] += elapsed
+            if result:
+                self.durations[page_type].append(elapsed)
+            else:
+                self.timeouts[page_type] += 1
+        if self.timings:
+            self.timings.record(f"wait_{page_type}", elapsed)
+        if not result:
+            try:
+                url = driver.current_url
+            except Exception:
+                url = "unknown URL"
+            logging.warning(f"Timed out after {elapsed:.1f}s waiting for {page_type} page: {url}")
+        return result
+
+    def wait_for_page(self, driver, page_type='home'):
+        """Document loaded and network idle"""
+        network = self.monitor(driver)
+        return self.wait(driver, page_type, lambda d: document_complete(d) and network.idle(d))
+
+    def wait_for_listing(self, driver, selector='a[href*="/product/"]'):
+        """Product-link count has stopped changing, or the page settled with no products"""
+        network = self.monitor(driver)
+        state = {'count': -1, 'since': time.time()}
+
+        def ready(d):
+            count = d.execute_script("return document.querySelectorAll(arguments[0]).length", selector)
+            now = time.time()
+            if count != state['count']:
+                state['count'], state['since'] = count, now
+                return False
+            if count > 0:
+                return now - state['since'] >= STABLE_WINDOW
+            return document_complete(d) and network.idle(d)
+
+        return self.wait(driver, 'listing', ready)
+
+    def wait_for_element(self, driver, selector, page_type='location'):
+        """An element matching selector is present"""
+        return self.wait(driver, page_type, lambda d: d.execute_script(
+            "return document.querySelector(arguments[0]) !== null", selector))
+
+    def wait_for_element_gone(self, driver, selector, page_type='location'):
+        """No element matches selector and the network has settled"""
+        network = self.monitor(driver)
+        return self.wait(driver, page_type, lambda d: d.execute_script(
+            "return document.querySelector(arguments[0]) === null", selector) and network.idle(d))
+
+    def wait_for_detail(self, driver, selector="div[data-id='product_description_text']"):
+        """Description node has text, or the page settled without one"""
+        network = self.monitor(driver)
+
+        def ready(d):
+            text = d.execute_script(
+                "const el = document.querySelector(arguments[0]); return el ? el.innerText.trim() : null",
+                selector)
+            if text:
+                return True
+            return document_complete(d) and network.idle(d)
+
+        return self.wait(driver, 'detail', ready)
+
+    def summary(self):
+        lines = []
+        with self._lock:
+            for page_type in PAGE_TIMEOUTS:
+                waits = self.waits[page_type]
+                if not waits:
+                    continue
+                average = self.total_seconds[page_type] / waits
+                lines.append(f"{page_type}: {waits} waits, avg {average:.2f}s, "
+                             f"{self.timeouts[page_type]} timeouts")
+        return "Page readiness - " + ("; ".join(lines) if lines else "no waits")
@@ -0,0 +1,615 @@
+#!/usr/bin/env python3
+"""Local search index over scraped catalog snapshots.
+
+normalize_record() turns a scraped row into clean fields. product_name
+holds the SKU, any tagline, the brand and the name on separate lines;
+the name is the last line, and packaging comes from packaging_info or,
+when that is empty, from the name (as in sysco_packaging.parse_csv()).
+
+The index is a directory of immutable segment files plus manifest.json.
+A segment holds:
+- a sorted term dictionary: field-prefixed tokens of name, brand and
+  category, and exact values for filters
+- postings lists of document ids
+- a table of single-character deletions of the name and brand tokens,
+  for fuzzy matching
+- one JSON record and one quantity per document
+Segments are read through mmap and binary-searched in place, so opening
+an index reads almost nothing and a lookup touches a few pages.
+
+Queries match every word in the name, brand or category. The last word
+(or any word ending in *) also matches as a prefix. A word ending in ~,
+or any word of four or more letters with no exact or prefix match,
+matches name and brand words within one edit (insertion, deletion,
+substitution or adjacent transposition). Filters narrow results by exact
+category, brand, unit, normalized measure and total quantity.
+
+update_index() indexes a new snapshot incrementally: new and changed
+SKUs go into a delta segment, and superseded or removed ones are
+tombstoned in the manifest. Segments are merged once there are more
+than MAX_SEGMENTS or a third of the documents are tombstoned.
+
+Usage:
+    python3 sysco_search.py build sysco_products_oregon_full.csv [--index sysco_search_index]
+    python3 sysco_search.py update new_snapshot.csv
+    python3 sysco_search.py query "gala apple" [--category Produce] [--unit LB] [--limit 10]
+"""
+
+import argparse
+import array
+import csv
+import hashlib
+import json
+import math
+import mmap
+import os
+import re
+import struct
+import sys
+import time
+
+from sysco_packaging import find_packaging, parse_packaging
+
+MAGIC = b'SYSIDX01'
+HEADER = struct.Struct('<8s10I')  # magic, docs, terms, variants, then section offsets
+TERM = struct.Struct('<IHHII')  # string offset, string length, padding, postings offset, postings count
+DOC = struct.Struct('<II')  # record offset, record length
+
+# Searchable fields and their weight in the score
+FIELDS = {'n': 3.0, 'b': 2.0, 'c': 1.0}
+FUZZY_FIELDS = ('n', 'b')
+FUZZY_MIN_LENGTH = 4  # Shorter words are only matched exactly or by prefix
+PREFIX_WEIGHT = 0.8
+FUZZY_WEIGHT = 0.5
+MAX_EXPANSIONS = 256  # Terms a prefix may expand to
+MAX_SEGMENTS = 8
+TOKEN_PATTERN = re.compile(r'[a-z0-9]+(?:[./][0-9]+)*')
+
+RECORD_FIELDS = ['sku', 'name', 'brand', 'category', 'packaging', 'pack_count', 'unit_size', 'unit',
+                 'total_quantity', 'total_unit', 'picture_url', 'description']
+
+
+def tokenize(text):
+    return TOKEN_PATTERN.findall((text or '').lower())
+
+
+def normalize_record(row):
+    """Clean search fields from a scraped row"""
+    sku = (row.get('sku') or '').strip()
+    lines = [line.strip() for line in (row.get('product_name') or '').split('\n') if line.strip()]
+    if lines and lines[0] == sku:
+        lines = lines[1:]
+    name = lines[-1] if lines else ''
+    brand = (row.get('brand_name') or '').strip() or (lines[-2] if len(lines) >= 2 else '')
+    packaging = (row.get('packaging_info') or '').strip() or find_packaging(name)
+    parsed = parse_packaging(packaging)
+    return {
+        'sku': sku,
+        'name': name,
+        'brand': brand,
+        'category': (row.get('category') or '').strip(),
+        'packaging': packaging,
+        'pack_count': parsed.pack_count,
+        'unit_size': parsed.unit_size,
+        'unit': parsed.unit,
+        'total_quantity': parsed.total_quantity,
+        'total_unit': parsed.total_unit,
+        'picture_url': row.get('picture_url') or '',
+        'description': row.get('description') or '',
+    }
+
+
+def read_snapshot(csv_path):
+    """Normalized records of a scraped CSV, one per SKU (the last row wins)"""
+    records = {}
+    with open(csv_path, newline='', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            record = normalize_record(row)
+            if record['sku']:
+                records[record['sku']] = record
+    return list(records.values())
+
+
+def record_terms(record):
+    """Index terms of a record: field-prefixed tokens plus exact filter values"""
+    terms = {f"s={record['sku']}"}
+    for field, text in (('n', record['name']), ('b', record['brand']), ('c', record['category'])):
+        terms.update(f"{field}:{token}" for token in tokenize(text))
+    if record['category']:
+        terms.add(f"c={record['category'].lower()}")
+    if record['brand']:
+        terms.add(f"b={record['brand'].lower()}")
+    if record['unit']:
+        terms.add(f"u={record['unit'].lower()}")
+    if record['total_unit']:
+        terms.add(f"m={record['total_unit'].lower()}")
+    return terms
+
+
+def deletions(word):
+    return {word[:i] + word[i + 1:] for i in range(len(word))}
+
+
+def content_hash(record):
+    return hashlib.sha1(json.dumps(record, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def _pack_ids(ids):
+    data = array.array('I', ids)
+    if sys.byteorder != 'little':
+        data.byteswap()
+    return data.tobytes()
+
+
+def _unpack_ids(data):
+    ids = array.array('I')
+    ids.frombytes(data)
+    if sys.byteorder != 'little':
+        ids.byteswap()
+    return ids
+
+
+def write_segment(path, records):
+    """Write records as one immutable segment file (atomically)"""
+    postings = {}
+    for doc, record in enumerate(records):
+        for term in record_terms(record):
+            postings.setdefault(term, []).append(doc)
+    terms = sorted(postings)
+    term_index = {term: i for i, term in enumerate(terms)}
+
+    variants = {}
+    for term in terms:
+        field, _, word = term.partition(':')
+        if field in FUZZY_FIELDS and len(word) >= FUZZY_MIN_LENGTH - 1:
+            for variant in deletions(word) | {word}:
+                variants.setdefault(f"{field}:{variant}", []).append(term_index[term])
+    variant_keys = sorted(variants)
+
+    records_blob = bytearray()
+    doc_table = bytearray()
+    quantities = array.array('f')
+    for record in records:
+        data = json.dumps([record[name] for name in RECORD_FIELDS], separators=(',', ':')).encode('utf-8')
+        doc_table += DOC.pack(len(records_blob), len(data))
+        records_blob += data
+        quantities.append(record['total_quantity'] if record['total_quantity'] is not None else math.nan)
+    if sys.byteorder != 'little':
+        quantities.byteswap()
+
+    strings = bytearray()
+    postings_blob = bytearray()
+
+    def table(keys, lists):
+        out = bytearray()
+        for key in keys:
+            encoded = key.encode('utf-8')
+            ids = lists[key]
+            out += TERM.pack(len(strings), len(encoded), 0, len(postings_blob), len(ids))
+            strings.extend(encoded)
+            postings_blob.extend(_pack_ids(ids))
+        return out
+
+    term_table = table(terms, postings)
+    variant_table = table(variant_keys, {key: sorted(set(ids)) for key, ids in variants.items()})
+
+    sections = [bytes(doc_table), quantities.tobytes(), bytes(term_table), bytes(variant_table),
+                bytes(postings_blob), bytes(strings), bytes(records_blob)]
+    offsets = []
+    position = HEADER.size
+    for section in sections:
+        position += -position % 4  # Keep every section 4-byte aligned
+        offsets.append(position)
+        position += len(section)
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, len(records), len(terms), len(variant_keys), *offsets))
+        for offset, section in zip(offsets, sections):
+            f.write(bytes(offset - f.tell()))
+            f.write(section)
+    os.replace(tmp_path, path)
+
+
+class Segment:
+    """Read-only view of a segment file through mmap"""
+    def __init__(self, path, deleted=()):
+        self.path = path
+        self.deleted = set(deleted)  # Tombstoned document ids
+        with open(path, 'rb') as f:
+            self.mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        (magic, self.doc_count, self.term_count, self.variant_count, self.docs_at, self.quantities_at,
+         self.terms_at, self.variants_at, self.postings_at, self.strings_at, self.records_at) = HEADER.unpack_from(self.mm)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a search index segment")
+
+    def _entry(self, table_at, i):
+        string_at, length, _, postings_offset, count = TERM.unpack_from(self.mm, table_at + i * TERM.size)
+        start = self.strings_at + string_at
+        return self.mm[start:start + length].decode('utf-8'), postings_offset, count
+
+    def _lower_bound(self, table_at, count, key):
+        lo, hi = 0, count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._entry(table_at, mid)[0] < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def _ids(self, postings_offset, count):
+        start = self.postings_at + postings_offset
+        return _unpack_ids(self.mm[start:start + 4 * count])
+
+    def find(self, term):
+        """Index of a term, or None"""
+        i = self._lower_bound(self.terms_at, self.term_count, term)
+        if i < self.term_count and self._entry(self.terms_at, i)[0] == term:
+            return i
+        return None
+
+    def prefix(self, prefix, limit=MAX_EXPANSIONS):
+        """Indexes of up to `limit` terms starting with `prefix`"""
+        i = self._lower_bound(self.terms_at, self.term_count, prefix)
+        found = []
+        while i < self.term_count and len(found) < limit:
+            if not self._entry(self.terms_at, i)[0].startswith(prefix):
+                break
+            found.append(i)
+            i += 1
+        return found
+
+    def similar(self, field, word):
+        """Indexes of the field's terms within one edit of `word`, found through the deletion table"""
+        candidates = set()
+        for variant in deletions(word) | {word}:
+            key = f"{field}:{variant}"
+            i = self._lower_bound(self.variants_at, self.variant_count, key)
+            if i < self.variant_count:
+                entry, postings_offset, count = self._entry(self.variants_at, i)
+                if entry == key:
+                    candidates.update(self._ids(postings_offset, count))
+        return [i for i in candidates if within_one_edit(word, self.term(i).partition(':')[2])]
+
+    def term(self, i):
+        return self._entry(self.terms_at, i)[0]
+
+    def postings(self, i):
+        _, postings_offset, count = self._entry(self.terms_at, i)
+        return self._ids(postings_offset, count)
+
+    def docs(self, term):
+        """Live documents containing an exact term"""
+        i = self.find(term)
+        return set() if i is None else set(self.postings(i)) - self.deleted
+
+    def record(self, doc):
+        offset, length = DOC.unpack_from(self.mm, self.docs_at + doc * DOC.size)
+        start = self.records_at + offset
+        return dict(zip(RECORD_FIELDS, json.loads(self.mm[start:start + length])))
+
+    def quantity(self, doc):
+        (value,) = struct.unpack_from('<f', self.mm, self.quantities_at + doc * 4)
+        return None if math.isnan(value) else value
+
+    def live_docs(self):
+        return [doc for doc in range(self.doc_count) if doc not in self.deleted]
+
+    def close(self):
+        self.mm.close()
+
+
+def within_one_edit(a, b):
+    """True when a and b differ by at most one insertion, deletion, substitution or adjacent transposition"""
+    if a == b:
+        return True
+    if abs(len(a) - len(b)) > 1:
+        return False
+    if len(a) == len(b):
+        diff = [i for i in range(len(a)) if a[i] != b[i]]
+        return len(diff) == 1 or (len(diff) == 2 and diff[1] == diff[0] + 1
+                                  and a[diff[0]] == b[diff[1]] and a[diff[1]] == b[diff[0]])
+    if len(a) > len(b):
+        a, b = b, a
+    i = 0
+    while i < len(a) and a[i] == b[i]:
+        i += 1
+    return a[i:] == b[i + 1:]
+
+
+class SearchIndex:
+    """Query API over an index directory; use as a context manager or call close()"""
+    def __init__(self, directory="sysco_search_index"):
+        self.directory = directory
+        with open(os.path.join(directory, 'manifest.json'), encoding='utf-8') as f:
+            self.manifest = json.load(f)
+        self.segments = [Segment(os.path.join(directory, entry['file']), entry['deleted'])
+                         for entry in self.manifest['segments']]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        for segment in self.segments:
+            segment.close()
+
+    @property
+    def doc_count(self):
+        return sum(segment.doc_count - len(segment.deleted) for segment in self.segments)
+
+    def search(self, query='', limit=20, fuzzy=True, category=None, brand=None, unit=None, measure=None,
+               min_quantity=None, max_quantity=None):
+        """Records matching every word of `query` and all the filters, best first, each with its score.
+
+        Words are matched across all segments at once, over live documents
+        only, so an updated index answers like a fresh build of the same
+        snapshot. With filters only, records come in index order.
+        """
+        words = query.split()
+        allowed = [self._filter(segment, category, brand, unit, measure) for segment in self.segments]
+        scores = None
+        for position, word in enumerate(words):
+            matches = self._match(word, position == len(words) - 1, fuzzy)
+            scores = matches if scores is None else {key: scores[key] + score for key, score in matches.items()
+                                                     if key in scores}
+            if not scores:
+                break
+        if scores is None:
+            scores = {(position, doc): 0.0 for position, segment in enumerate(self.segments)
+                      for doc in (allowed[position] if allowed[position] is not None else segment.live_docs())}
+
+        results = []
+        for (position, doc), score in scores.items():
+            segment = self.segments[position]
+            if allowed[position] is not None and doc not in allowed[position]:
+                continue
+            if min_quantity is not None or max_quantity is not None:
+                quantity = segment.quantity(doc)
+                if quantity is None or (min_quantity is not None and quantity < min_quantity) \
+                        or (max_quantity is not None and quantity > max_quantity):
+                    continue
+            results.append((score, segment, doc))
+
+        results.sort(key=lambda result: -result[0])
+        records = []
+        for score, segment, doc in results[:limit]:
+            record = segment.record(doc)
+            record['score'] = round(score, 3)
+            records.append(record)
+        return records
+
+    def _filter(self, segment, category, brand, unit, measure):
+        """Documents passing the exact-value filters, or None when there are none"""
+        allowed = None
+        for prefix, value in (('c=', category), ('b=', brand), ('u=', unit), ('m=', measure)):
+            if value:
+                docs = segment.docs(prefix + value.lower())
+                allowed = docs if allowed is None else allowed & docs
+        return allowed
+
+    def _match(self, word, last, fuzzy):
+        """{(segment position, doc): score} for one query word over the searchable fields"""
+        force_prefix = word.endswith('*')
+        force_fuzzy = word.endswith('~')
+        tokens = tokenize(word.rstrip('*~'))
+        if not tokens:
+            return {}
+        # A word such as "6/5lb" tokenizes to several tokens; all must match
+        scores = None
+        for j, token in enumerate(tokens):
+            prefix = (last or force_prefix) and j == len(tokens) - 1
+            matches = self._match_token(token, prefix, fuzzy, force_fuzzy)
+            scores = matches if scores is None else {d: scores[d] + s for d, s in matches.items() if d in scores}
+        return scores
+
+    def _match_token(self, token, prefix, fuzzy, force_fuzzy):
+        hits = {}  # term -> [weight, live (segment position, doc) keys]
+
+        def add(position, segment, i, weight):
+            docs = [(position, doc) for doc in segment.postings(i) if doc not in segment.deleted]
+            if docs:
+                hit = hits.setdefault(segment.term(i), [weight, []])
+                hit[0] = max(hit[0], weight)
+                hit[1].extend(docs)
+
+        for position, segment in enumerate(self.segments):
+            for field, field_weight in FIELDS.items():
+                exact = segment.find(f"{field}:{token}")
+                if exact is not None:
+                    add(position, segment, exact, field_weight)
+                if prefix:
+                    for i in segment.prefix(f"{field}:{token}"):
+                        if i != exact:
+                            add(position, segment, i, field_weight * PREFIX_WEIGHT)
+        # The typo fallback is decided over the whole index, not per segment
+        if force_fuzzy or (fuzzy and not hits and len(token) >= FUZZY_MIN_LENGTH):
+            for position, segment in enumerate(self.segments):
+                for field in FUZZY_FIELDS:
+                    for i in segment.similar(field, token):
+                        add(position, segment, i, FIELDS[field] * FUZZY_WEIGHT)
+
+        # IDF over live documents, so tombstones do not change scores
+        total = max(1, self.doc_count)
+        scores = {}
+        for weight, docs in hits.values():
+            score = weight * math.log(1 + total / len(docs))
+            for key in docs:
+                if scores.get(key, 0.0) < score:
+                    scores[key] = score
+        return scores
+
+    def get(self, sku):
+        """The live record for a SKU, or None"""
+        for segment in reversed(self.segments):
+            for doc in segment.docs(f"s={sku}"):
+                return segment.record(doc)
+        return None
+
+    def stats(self):
+        return {
+            'documents': self.doc_count,
+            'segments': len(self.segments),
+            'tombstones': sum(len(segment.deleted) for segment in self.segments),
+            'bytes': sum(os.path.getsize(segment.path) for segment in self.segments),
+            'updated_at': self.manifest.get('updated_at'),
+        }
+
+
+def _write_manifest(directory, manifest):
+    manifest['updated_at'] = time.time()
+    path = os.path.join(directory, 'manifest.json')
+    with open(f"{path}.tmp", 'w', encoding='utf-8') as f:
+        json.dump(manifest, f)
+    os.replace(f"{path}.tmp", path)
+
+
+def _segment_file(manifest):
+    manifest['next_segment'] = manifest.get('next_segment', 0) + 1
+    return f"segment-{manifest['next_segment']:06d}.idx"
+
+
+def build_index(csv_path, directory="sysco_search_index"):
+    """Index a snapshot from scratch, replacing any existing index; returns the number of documents"""
+    os.makedirs(directory, exist_ok=True)
+    old = _read_manifest(directory)
+    return _rewrite(directory, read_snapshot(csv_path), old)
+
+
+def _read_manifest(directory):
+    path = os.path.join(directory, 'manifest.json')
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _rewrite(directory, records, old=None):
+    """Write records as a single segment and drop the old segments"""
+    manifest = {'next_segment': (old or {}).get('next_segment', 0), 'segments': []}
+    name = _segment_file(manifest)
+    write_segment(os.path.join(directory, name), records)
+    manifest['segments'].append({'file': name, 'deleted': []})
+    _write_manifest(directory, manifest)
+    for entry in (old or {}).get('segments', []):
+        try:
+            os.remove(os.path.join(directory, entry['file']))
+        except OSError:
+            pass
+    return len(records)
+
+
+def update_index(csv_path, directory="sysco_search_index"):
+    """Bring the index in line with a new snapshot; returns {'added', 'changed', 'removed', 'unchanged'}"""
+    manifest = _read_manifest(directory)
+    records = read_snapshot(csv_path)
+    if manifest is None:
+        os.makedirs(directory, exist_ok=True)
+        _rewrite(directory, records)
+        return {'added': len(records), 'changed': 0, 'removed': 0, 'unchanged': 0}
+
+    index = SearchIndex(directory)
+    try:
+        current = {}  # sku -> (segment position, doc, content hash)
+        for position, segment in enumerate(index.segments):
+            for doc in segment.live_docs():
+                record = segment.record(doc)
+                current[record['sku']] = (position, doc, content_hash(record))
+    finally:
+        index.close()
+
+    counts = {'added': 0, 'changed': 0, 'removed': 0, 'unchanged': 0}
+    delta = []
+    seen = set()
+    for record in records:
+        seen.add(record['sku'])
+        existing = current.get(record['sku'])
+        if existing and existing[2] == content_hash(record):
+            counts['unchanged'] += 1
+            continue
+        counts['changed' if existing else 'added'] += 1
+        delta.append(record)
+        if existing:
+            manifest['segments'][existing[0]]['deleted'].append(existing[1])
+    for sku, (position, doc, _) in current.items():
+        if sku not in seen:
+            counts['removed'] += 1
+            manifest['segments'][position]['deleted'].append(doc)
+
+    if delta:
+        name = _segment_file(manifest)
+        write_segment(os.path.join(directory, name), delta)
+        manifest['segments'].append({'file': name, 'deleted': []})
+
+    documents = len(current) - counts['removed'] - counts['changed'] + len(delta)
+    tombstones = sum(len(entry['deleted']) for entry in manifest['segments'])
+    if len(manifest['segments']) > MAX_SEGMENTS or tombstones * 2 > documents:
+        _rewrite(directory, records, manifest)
+    else:
+        _write_manifest(directory, manifest)
+    return counts
+
+
+def format_record(record):
+    quantity = f" ({record['total_quantity']:g} {record['total_unit']})" if record['total_quantity'] else ''
+    return (f"{record['sku']:>8}  {record['name']}  [{record['brand'] or '-'} | {record['category']}]"
+            f"  {record['packaging']}{quantity}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build and query a local search index over scraped products")
+    parser.add_argument('--index', default='sysco_search_index', metavar='DIR',
+                        help="index directory (default: sysco_search_index)")
+    commands = parser.add_subparsers(dest='command', required=True)
+    build = commands.add_parser('build', help="index a snapshot from scratch")
+    build.add_argument('csv')
+    update = commands.add_parser('update', help="apply a new snapshot incrementally")
+    update.add_argument('csv')
+    query = commands.add_parser('query', help="search the index")
+    query.add_argument('text', nargs='?', default='', help="words to match; word* for a prefix, word~ for fuzzy")
+    query.add_argument('--category', default=None)
+    query.add_argument('--brand', default=None)
+    query.add_argument('--unit', default=None, help="unit of measure as written, e.g. LB, OZ, CT")
+    query.add_argument('--measure', choices=['kg', 'l', 'ct', 'ea', 'cs'], default=None,
+                       help="normalized unit the quantity filters apply to")
+    query.add_argument('--min-quantity', type=float, default=None)
+    query.add_argument('--max-quantity', type=float, default=None)
+    query.add_argument('--limit', type=int, default=20)
+    query.add_argument('--exact', action='store_true', help="no fuzzy matching for unmatched words")
+    query.add_argument('--json', action='store_true', help="print results as JSON lines")
+    commands.add_parser('stats', help="show index size and segments")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    if args.command == 'build':
+        count = build_index(args.csv, args.index)
+        print(f"Indexed {count} products into {args.index} in {time.perf_counter() - start:.2f}s")
+        return
+    if args.command == 'update':
+        counts = update_index(args.csv, args.index)
+        print(f"Updated {args.index} in {time.perf_counter() - start:.2f}s: {counts['added']} added, "
+              f"{counts['changed']} changed, {counts['removed']} removed, {counts['unchanged']} unchanged")
+        return
+
+    with SearchIndex(args.index) as index:
+        if args.command == 'stats':
+            stats = index.stats()
+            print(f"{stats['documents']} products in {stats['segments']} segments "
+                  f"({stats['tombstones']} tombstones, {stats['bytes'] / 1024:.0f} KB)")
+            return
+        lookup = time.perf_counter()
+        results = index.search(args.text, limit=args.limit, fuzzy=not args.exact, category=args.category,
+                               brand=args.brand, unit=args.unit, measure=args.measure,
+                               min_quantity=args.min_quantity, max_quantity=args.max_quantity)
+        elapsed = time.perf_counter() - lookup
+        for record in results:
+            print(json.dumps(record) if args.json else format_record(record))
+        if not args.json:
+            print(f"{len(results)} results in {elapsed * 1000:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,311 @@
+"""Output sinks for scraped products.
+
+Products leave the scraper one listing page at a time as compact
+ProductRecords and go straight to every configured sink, so memory use
+does not grow with the size of the catalog. The output format is picked
+from the file extension by open_sink().
+"""
+
+import csv
+import json
+import logging
+import os
+import queue
+import re
+import sqlite3
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+    PARQUET_AVAILABLE = True
+except ImportError:
+    pyarrow = None
+    PARQUET_AVAILABLE = False
+
+FIELDNAMES = ['category', 'brand_name', 'product_name', 'packaging_info',
+              'sku', 'picture_url', 'description']
+
+
+class ProductRecord:
+    """One output row. Slots keep it to a fraction of the size of a product dict"""
+    __slots__ = tuple(FIELDNAMES)
+
+    def __init__(self, category='', brand_name='', product_name='', packaging_info='',
+                 sku='', picture_url='', description=''):
+        self.category = category
+        self.brand_name = brand_name
+        self.product_name = product_name
+        self.packaging_info = packaging_info
+        self.sku = sku
+        self.picture_url = picture_url
+        self.description = description
+
+    @classmethod
+    def from_product(cls, product):
+        return cls(*(product.get(field) or '' for field in FIELDNAMES))
+
+    def row(self):
+        return tuple(getattr(self, field) for field in FIELDNAMES)
+
+    def as_dict(self):
+        return dict(zip(FIELDNAMES, self.row()))
+
+
+class _FileSink:
+    """Append-only text file flushed to disk after every batch.
+
+    When resuming with an `offset`, an existing file is cut back to that
+    byte offset (the end of the last checkpointed batch) and appended to,
+    so rows from a batch that was written but never checkpointed are dropped.
+    """
+    def __init__(self, path, resume=False, offset=None):
+        self.path = path
+        if resume and offset is not None and os.path.exists(path):
+            os.truncate(path, offset)
+            self.file = open(path, 'a', newline='', encoding='utf-8')
+            self.fresh = False
+        else:
+            self.file = open(path, 'w', newline='', encoding='utf-8')
+            self.fresh = True
+
+    def flush(self):
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+    def position(self):
+        """Byte offset just past the last written row"""
+        return self.file.tell()
+
+    def close(self):
+        if not self.file.closed:
+            self.file.close()
+
+
+class CsvSink(_FileSink):
+    format = 'csv'
+
+    def __init__(self, path, resume=False, offset=None):
+        super().__init__(path, resume, offset)
+        self.writer = csv.writer(self.file)
+        if self.fresh:
+            self.writer.writerow(FIELDNAMES)
+            self.flush()
+
+    def write(self, records):
+        self.writer.writerows(record.row() for record in records)
+        self.flush()
+
+
+class JsonlSink(_FileSink):
+    format = 'jsonl'
+
+    def write(self, records):
+        self.file.writelines(json.dumps(record.as_dict(), ensure_ascii=False) + '\n' for record in records)
+        self.flush()
+
+
+class SqliteSink:
+    """Products table keyed by SKU; rewriting a SKU replaces its row, so resumes need no offset"""
+    format = 'sqlite'
+
+    def __init__(self, path, resume=False, offset=None):
+        self.path = path
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        columns = ', '.join(f"{field} TEXT PRIMARY KEY" if field == 'sku' else f"{field} TEXT"
+                            for field in FIELDNAMES)
+        self.conn.execute(f"CREATE TABLE IF NOT EXISTS products ({columns})")
+        if not resume:
+            self.conn.execute("DELETE FROM products")
+        self.conn.commit()
+        self.insert = (f"INSERT OR REPLACE INTO products ({', '.join(FIELDNAMES)}) "
+                       f"VALUES ({', '.join('?' for _ in FIELDNAMES)})")
+
+    def write(self, records):
+        self.conn.executemany(self.insert, (record.row() for record in records))
+        self.conn.commit()
+
+    def position(self):
+        return None
+
+    def close(self):
+        self.conn.close()
+
+
+class ParquetSink:
+    """Parquet file written in row groups of about `row_group_size` rows.
+
+    A Parquet file is only readable once close() writes its footer, so
+    every batch is also appended to a spool next to it (<file>.spool, JSON
+    lines, fsynced) as it arrives, and position() reports the spool offset
+    for the checkpoint. Rows are buffered until a row group is full; the
+    spool is removed on a clean close.
+
+    A fresh run removes part files and spools left by earlier runs. When
+    resuming, a file that still has a spool was being written when the run
+    stopped: it is rebuilt from the spool, up to the checkpointed offset,
+    and written to again. Otherwise every file was closed cleanly, and the
+    run writes a new part file after the highest one (products.part2.parquet,
+    ...), as Parquet files cannot be appended to.
+    """
+    format = 'parquet'
+
+    def __init__(self, path, resume=False, offset=None, row_group_size=50000):
+        if not PARQUET_AVAILABLE:
+            raise RuntimeError("pyarrow is required for Parquet output")
+        self.path = path  # The configured output path, which keys the checkpoint offsets
+        self.schema = pyarrow.schema([(field, pyarrow.string()) for field in FIELDNAMES])
+        self.row_group_size = row_group_size
+        self.buffer = []
+        parts = self._parts(path)
+        if resume:
+            file_path, recovered = self._resume_target(path, parts, offset)
+        else:
+            for number, part_path in parts.items():
+                if number > 1:
+                    os.remove(part_path)
+                if os.path.exists(f"{part_path}.spool"):
+                    os.remove(f"{part_path}.spool")
+            file_path, recovered = path, []
+        self.file_path = file_path
+        self.spool_path = f"{file_path}.spool"
+        self.writer = pyarrow.parquet.ParquetWriter(file_path, self.schema)
+        self.spool = open(self.spool_path, 'a' if recovered else 'w', encoding='utf-8')
+        if recovered:
+            self._buffer_rows(recovered)
+
+    @staticmethod
+    def _part(path, number):
+        if number == 1:
+            return path
+        stem, ext = os.path.splitext(path)
+        return f"{stem}.part{number}{ext}"
+
+    @staticmethod
+    def _parts(path):
+        """{part number: path} of every part of `path` on disk, counting spools of missing files"""
+        stem, ext = os.path.splitext(path)
+        pattern = re.compile(re.escape(os.path.basename(stem)) + r'\.part(\d+)' + re.escape(ext) + r'(\.spool)?$')
+        parts = {}
+        if os.path.exists(path) or os.path.exists(f"{path}.spool"):
+            parts[1] = path
+        for name in os.listdir(os.path.dirname(path) or '.'):
+            match = pattern.match(name)
+            if match and int(match.group(1)) > 1:
+                parts[int(match.group(1))] = ParquetSink._part(path, int(match.group(1)))
+        return parts
+
+    def _resume_target(self, path, parts, offset):
+        """File to write to when resuming and the rows it is rebuilt from"""
+        unfinished = [number for number, part_path in parts.items() if os.path.exists(f"{part_path}.spool")]
+        if unfinished:
+            file_path = parts[max(unfinished)]
+            return file_path, self._recover(file_path, offset)
+        if not parts:
+            return path, []
+        latest = parts[max(parts)]
+        if not self._readable(latest):
+            logging.warning(f"{latest} has no footer and no spool; moving it to {latest}.corrupt")
+            os.replace(latest, f"{latest}.corrupt")
+            return latest, []
+        return self._part(path, max(parts) + 1), []
+
+    @staticmethod
+    def _readable(file_path):
+        try:
+            pyarrow.parquet.ParquetFile(file_path).close()
+            return True
+        except Exception:
+            return False
+
+    def _recover(self, file_path, offset):
+        """Rows of an unfinished file from its spool, cut back to the checkpointed offset"""
+        spool_path = f"{file_path}.spool"
+        if offset is not None:
+            os.truncate(spool_path, offset)
+        rows = []
+        with open(spool_path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    rows.append(tuple(json.loads(line)))
+                except ValueError:
+                    break  # A line torn by the crash
+        logging.info(f"Rebuilding {file_path} from {len(rows)} spooled rows")
+        return rows
+
+    def write(self, records):
+        rows = [record.row() for record in records]
+        if not rows:
+            return
+        self.spool.writelines(json.dumps(row, ensure_ascii=False) + '\n' for row in rows)
+        self.spool.flush()
+        os.fsync(self.spool.fileno())
+        self._buffer_rows(rows)
+
+    def _buffer_rows(self, rows):
+        self.buffer.extend(rows)
+        while len(self.buffer) >= self.row_group_size:
+            self._write_row_group(self.buffer[:self.row_group_size])
+            del self.buffer[:self.row_group_size]
+
+    def _write_row_group(self, rows):
+        columns = [pyarrow.array(column, pyarrow.string()) for column in zip(*rows)]
+        self.writer.write_table(pyarrow.Table.from_arrays(columns, schema=self.schema))
+
+    def position(self):
+        """Byte offset just past the last spooled row"""
+        return self.spool.tell()
+
+    def close(self):
+        if self.writer:
+            if self.buffer:
+                self._write_row_group(self.buffer)
+                self.buffer = []
+            self.writer.close()
+            self.writer = None
+            self.spool.close()
+            os.remove(self.spool_path)
+
+
+class QueueSink:
+    """Hands batches of records to a consumer thread, blocking when it falls behind"""
+    format = 'queue'
+    path = None
+
+    def __init__(self, max_batches=8):
+        self.queue = queue.Queue(max_batches)
+        self.closed = False
+
+    def write(self, records):
+        self.queue.put(records)
+
+    def position(self):
+        return None
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            self.queue.put(None)
+
+    def __iter__(self):
+        while True:
+            batch = self.queue.get()
+            if batch is None:
+                return
+            yield from batch
+
+
+SINK_TYPES = {
+    '.csv': CsvSink,
+    '.jsonl': JsonlSink,
+    '.db': SqliteSink,
+    '.sqlite': SqliteSink,
+    '.parquet': ParquetSink,
+}
+
+
+def open_sink(path, resume=False, offset=None):
+    """Sink for an output path, chosen by its extension"""
+    ext = os.path.splitext(path)[1].lower()
+    if ext not in SINK_TYPES:
+        raise ValueError(f"Unsupported output format for {path} (use {', '.join(sorted(SINK_TYPES))})")
+    return SINK_TYPES[ext](path, resume=resume, offset=offset)
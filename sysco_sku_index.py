@@ -0,0 +1,147 @@
+"""Persistent SKU index for incremental re-scrapes.
+
+Keeps every product seen on the listing pages in SQLite, keyed by SKU,
+with a hash of its listing fields and first/last-seen timestamps. A run
+compares each listing record against the index to tell added, changed and
+unchanged products apart, so detail pages only need to be visited for
+new or changed SKUs.
+"""
+
+import hashlib
+import sqlite3
+import threading
+import time
+
+LISTING_FIELDS = ['category', 'brand_name', 'product_name', 'packaging_info', 'picture_url']
+DETAIL_FIELDS = ['brand_name', 'packaging_info', 'picture_url', 'description']
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS products (
+    sku TEXT PRIMARY KEY,
+    category TEXT,
+    brand_name TEXT,
+    product_name TEXT,
+    packaging_info TEXT,
+    picture_url TEXT,
+    description TEXT,
+    content_hash TEXT NOT NULL,
+    first_seen REAL NOT NULL,
+    last_seen REAL NOT NULL,
+    details_fetched REAL,
+    removed_at REAL
+);
+CREATE INDEX IF NOT EXISTS products_category ON products (category, last_seen);
+"""
+
+
+def content_hash(product):
+    """Hash of the fields shown on the listing page"""
+    joined = '\x1f'.join(product.get(field) or '' for field in LISTING_FIELDS)
+    return hashlib.sha1(joined.encode('utf-8')).hexdigest()
+
+
+class SkuIndex:
+    def __init__(self, path="sysco_sku_index.db"):
+        self.path = path
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.executescript(SCHEMA)
+        self.run_started = time.time()
+        self.report = {}  # category -> {'added': n, 'changed': n, 'unchanged': n, 'removed': n}
+        self._lock = threading.Lock()
+
+    def _count(self, category, status, n=1):
+        counts = self.report.setdefault(category, {'added': 0, 'changed': 0, 'unchanged': 0, 'removed': 0})
+        counts[status] += n
+
+    def observe(self, products):
+        """Record a page of listing products; returns 'added', 'changed' or 'unchanged' per product"""
+        now = time.time()
+        statuses = []
+        with self._lock:
+            for product in products:
+                new_hash = content_hash(product)
+                row = self.conn.execute(
+                    "SELECT content_hash, removed_at FROM products WHERE sku = ?", (product['sku'],)
+                ).fetchone()
+                if row is None:
+                    status = 'added'
+                    self.conn.execute(
+                        "INSERT INTO products (sku, category, brand_name, product_name, packaging_info, "
+                        "picture_url, description, content_hash, first_seen, last_seen) "
+                        "VALUES (?, ?, ?, ?, ?, ?, '', ?, ?, ?)",
+                        (product['sku'], *(product.get(f) or '' for f in LISTING_FIELDS), new_hash, now, now)
+                    )
+                elif row[0] != new_hash:
+                    status = 'changed' if row[1] is None else 'added'
+                    self.conn.execute(
+                        "UPDATE products SET category = ?, brand_name = ?, product_name = ?, packaging_info = ?, "
+                        "picture_url = ?, description = '', content_hash = ?, last_seen = ?, "
+                        "details_fetched = NULL, removed_at = NULL WHERE sku = ?",
+                        (*(product.get(f) or '' for f in LISTING_FIELDS), new_hash, now, product['sku'])
+                    )
+                else:
+                    status = 'unchanged' if row[1] is None else 'added'
+                    self.conn.execute("UPDATE products SET last_seen = ?, removed_at = NULL WHERE sku = ?",
+                                      (now, product['sku']))
+                self._count(product['category'], status)
+                statuses.append(status)
+            self.conn.commit()
+        return statuses
+
+    def touch(self, skus):
+        """Mark SKUs as seen without re-checking them (e.g. pages finished before a resume)"""
+        now = time.time()
+        with self._lock:
+            self.conn.executemany("UPDATE products SET last_seen = ? WHERE sku = ?",
+                                  [(now, sku) for sku in skus])
+            self.conn.commit()
+
+    def restore_details(self, product):
+        """Fill a product from its stored detail-page fields; False if they were never fetched"""
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT brand_name, packaging_info, picture_url, description FROM products "
+                "WHERE sku = ? AND details_fetched IS NOT NULL", (product['sku'],)
+            ).fetchone()
+        if row is None:
+            return False
+        for field, value in zip(DETAIL_FIELDS, row):
+            if value:
+                product[field] = value
+        return True
+
+    def record_details(self, products):
+        """Store fields filled in from detail pages"""
+        now = time.time()
+        with self._lock:
+            self.conn.executemany(
+                "UPDATE products SET brand_name = ?, packaging_info = ?, picture_url = ?, description = ?, "
+                "details_fetched = ? WHERE sku = ?",
+                [(*(p.get(f) or '' for f in DETAIL_FIELDS), now, p['sku']) for p in products]
+            )
+            self.conn.commit()
+
+    def finish_run(self, categories):
+        """Mark SKUs in fully scraped categories that were not seen during this run as removed"""
+        now = time.time()
+        with self._lock:
+            for category in categories:
+                removed = self.conn.execute(
+                    "UPDATE products SET removed_at = ? "
+                    "WHERE category = ? AND last_seen < ? AND removed_at IS NULL",
+                    (now, category, self.run_started)
+                ).rowcount
+                if removed:
+                    self._count(category, 'removed', removed)
+            self.conn.commit()
+        return self.report
+
+    def format_report(self):
+        lines = [f"{'Category':<24}{'added':>8}{'changed':>9}{'removed':>9}{'unchanged':>11}"]
+        for category, counts in sorted(self.report.items()):
+            lines.append(f"{category:<24}{counts['added']:>8}{counts['changed']:>9}"
+                         f"{counts['removed']:>9}{counts['unchanged']:>11}")
+        return '\n'.join(lines)
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,56 @@
+import csv
+import os
+
+import pytest
+
+from conftest import ROOT
+from sysco_archive import HEADER, PageArchive, parse_pages, scan
+
+pytest.importorskip('selenium')
+from fixture_site import load_scraper_module  # noqa: E402
+
+SCRIPT = os.path.join(ROOT, 'sysco-scraper-simple.py')
+LISTING_URL = "https://shop.sysco.com/app/catalog?BUSINESS_CENTER_ID=syy_cust_tax_produce&page={}"
+DETAIL_HTML = ("<html><body><div data-id='product_description_text'>Roma tomatoes, vine ripened</div>"
+               "</body></html>")
+
+
+def write_archive(path):
+    """Listing page 1, a detail page of one of its products, then listing page 2"""
+    with open(os.path.join(ROOT, 'tests', 'fixtures', 'listing_opco.html'), encoding='utf-8') as f:
+        listing = f.read()
+    archive = PageArchive(str(path))
+    archive.append(listing, url=LISTING_URL.format(1), page_type='listing', category='Produce', page=1)
+    archive.append(DETAIL_HTML, url="https://shop.sysco.com/app/product/1000001", page_type='detail', sku='1000001')
+    archive.append(listing, url=LISTING_URL.format(2), page_type='listing', category='Produce', page=2)
+    archive.close()
+
+
+def corrupt(path, record):
+    offset, length = scan(str(path))[record]
+    with open(path, 'r+b') as f:
+        f.seek(offset + HEADER.size + length // 2)
+        byte = f.read(1)
+        f.seek(-1, os.SEEK_CUR)
+        f.write(bytes([byte[0] ^ 0xFF]))
+
+
+def test_indexes_are_archive_positions_after_a_corrupt_record(tmp_path):
+    path = tmp_path / 'pages.arc'
+    write_archive(path)
+    corrupt(path, 1)
+    assert [(index, meta['page']) for index, meta, _ in parse_pages(str(path), SCRIPT, workers=1)] == [(0, 1), (2, 2)]
+    assert [index for index, _, _ in parse_pages(str(path), SCRIPT, workers=1, listing=True)] == [0, 2]
+
+
+def test_parse_archive_merges_details_into_listing_products(tmp_path):
+    path = tmp_path / 'pages.arc'
+    write_archive(path)
+    output = tmp_path / 'products.csv'
+    scraper = load_scraper_module().FinalSyscoScraper(outputs=(str(output),))
+    assert scraper.parse_archive(str(path), workers=1) == {'Produce': 6}
+    with open(output, newline='', encoding='utf-8') as f:
+        rows = {row['sku']: row for row in csv.DictReader(f)}
+    assert len(rows) == 6
+    assert rows['1000001']['description'] == "Roma tomatoes, vine ripened"
+    assert rows['1000002']['description'] == ""
@@ -0,0 +1,122 @@
+import asyncio
+
+import pytest
+
+from conftest import CATALOG_CSV
+
+pytest.importorskip('aiohttp')
+pytest.importorskip('selenium')
+from fixture_site import RECORDED_BASE_URL, FixtureSite, load_scraper_module  # noqa: E402
+from sysco_cache import PageCache  # noqa: E402
+from sysco_http import AsyncPageFetcher  # noqa: E402
+from sysco_ratelimit import RequestScheduler  # noqa: E402
+
+CATEGORY = ('Produce', 'syy_cust_tax_produce')
+PER_CATEGORY = 100  # Five listing pages of 24
+
+
+class BrowserSession:
+    """The parts of a WebDriver extract_from_listing_http() reads the location session from"""
+    def get_cookies(self):
+        return [{'name': 'zipcode', 'value': '97205'}, {'name': 'guest_session', 'value': 'abc123'}]
+
+    def execute_script(self, script, *args):
+        return "Mozilla/5.0 (fixture browser)"
+
+
+def start_site(**kwargs):
+    scraper_module = load_scraper_module()
+    site = FixtureSite(CATALOG_CSV, scraper_module.FinalSyscoScraper.CATEGORIES, per_category=PER_CATEGORY, **kwargs)
+    site.start()
+    return site
+
+
+@pytest.fixture
+def site():
+    site = start_site(latency=0.05)
+    yield site
+    site.stop()
+
+
+def listing_urls(site, pages):
+    return [f"{site.url}/app/catalog?BUSINESS_CENTER_ID={CATEGORY[1]}&page={page}" for page in pages]
+
+
+def fetch_all(urls, **kwargs):
+    async def run():
+        async with AsyncPageFetcher(**kwargs) as fetcher:
+            return await fetcher.fetch_all(urls)
+    return asyncio.run(run())
+
+
+def scraper(site, **kwargs):
+    return load_scraper_module().FinalSyscoScraper(base_url=site.url, outputs=(), fetch_backend='http', **kwargs)
+
+
+def test_fetcher_bounds_concurrency(site):
+    results = fetch_all(listing_urls(site, range(1, 13)), concurrency=3)
+    assert [status for status, _ in results] == [200] * 12
+    assert 2 <= site.peak_in_flight <= 3
+
+
+def test_fetcher_sends_session_cookies_and_headers(site):
+    fetch_all(listing_urls(site, [1]), cookies={'zipcode': '97205'}, headers={'User-Agent': 'fixture-agent'})
+    sent = site.last_headers['listing']
+    assert sent['Cookie'] == 'zipcode=97205'
+    assert sent['User-Agent'] == 'fixture-agent'
+
+
+def test_fetcher_retries_throttled_pages():
+    site = start_site(rate_limit=4)
+    try:
+        scheduler = RequestScheduler(concurrency=8, max_retries=6, base_delay=0.1)
+        results = fetch_all(listing_urls(site, range(1, 11)), concurrency=8, scheduler=scheduler)
+        assert [status for status, _ in results] == [200] * 10
+        assert site.stats()['requests']['throttled'] > 0
+        assert site.stats()['requests']['listing'] == 10
+    finally:
+        site.stop()
+
+
+def test_listing_over_http_reuses_the_browser_session(site):
+    instance = scraper(site, http_concurrency=2)
+    count = instance.extract_from_listing_http(BrowserSession(), *CATEGORY)
+    assert count == PER_CATEGORY
+    assert instance.category_counts == {CATEGORY[0]: PER_CATEGORY}
+    assert site.stats()['requests']['listing'] == 5  # The plan from page 1 skips empty trailing pages
+    assert site.peak_in_flight <= 2
+    sent = site.last_headers['listing']
+    assert sorted(sent['Cookie'].split('; ')) == ['guest_session=abc123', 'zipcode=97205']
+    assert sent['User-Agent'] == "Mozilla/5.0 (fixture browser)"
+
+
+def test_client_rendered_page_one_falls_back_to_the_browser(tmp_path):
+    # A recorded page 1 whose products are rendered by scripts: no product links over plain HTTP
+    recorded = PageCache(str(tmp_path / 'recorded'))
+    recorded.put(f"{RECORDED_BASE_URL}/app/catalog?BUSINESS_CENTER_ID={CATEGORY[1]}&page=1", '97205', 'listing',
+                 '<html><body><div id="app"></div><script src="/static/catalog.js"></script></body></html>')
+    recorded.close()
+    site = start_site(recorded=str(tmp_path / 'recorded'))
+    try:
+        instance = scraper(site)
+        assert instance.extract_from_listing_http(BrowserSession(), *CATEGORY) is None
+        assert instance.category_counts == {}
+        assert site.stats()['requests']['listing'] == 1
+
+        browser_walks = []
+        instance.extract_from_listing = lambda driver, name, category_id, pending=None: browser_walks.append(name) or 7
+        assert instance.scrape_category(BrowserSession(), *CATEGORY) == 7
+        assert browser_walks == [CATEGORY[0]]
+    finally:
+        site.stop()
+
+
+def test_slot_is_released_when_the_page_check_raises(site):
+    def check(status, html):
+        raise UnicodeDecodeError('utf-8', b'\xff', 0, 1, "invalid start byte")
+    scheduler = RequestScheduler(concurrency=1, max_concurrency=1)
+    url = listing_urls(site, [1])[0]
+    assert isinstance(fetch_all([url], scheduler=scheduler, check=check)[0], UnicodeDecodeError)
+    limiter = scheduler.limiter(url)
+    assert limiter.in_flight == 0
+    assert limiter.try_acquire()[0]
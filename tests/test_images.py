@@ -0,0 +1,95 @@
+import csv
+
+import pytest
+
+from conftest import CATALOG_CSV
+
+pytest.importorskip('aiohttp')
+from image_site import RENDITION_PATH, ImageSite, rendition_id, rewrite_csv  # noqa: E402
+from sysco_images import ImageStore, ImageVerifier, check_csv  # noqa: E402
+from sysco_ratelimit import RequestScheduler  # noqa: E402
+
+MAX_BYTES = 4096  # Regular 225x225 site images are ~1 KB, the large ones ~9 KB
+PRODUCTS = 400
+
+
+@pytest.fixture(params=[False, True], ids=['content-length', 'chunked'])
+def site(request):
+    site = ImageSite(broken_rate=0.05, placeholder_rate=0.05, error_page_rate=0.05, shared_rate=0.2,
+                     large_rate=0.05, chunked=request.param)
+    site.start()
+    yield site
+    site.stop()
+
+
+def run(site, tmp_path, store_dir):
+    csv_path = tmp_path / 'products.csv'
+    output_path = tmp_path / 'checked.csv'
+    rewrite_csv(CATALOG_CSV, str(csv_path), site.url, PRODUCTS)
+    store = ImageStore(str(store_dir))
+    try:
+        counts = check_csv(str(csv_path), str(output_path), store,
+                           ImageVerifier(store, concurrency=8, max_bytes=MAX_BYTES))
+        blobs = len(store.blobs())
+    finally:
+        store.close()
+    with open(csv_path, newline='', encoding='utf-8') as f:
+        inputs = list(csv.DictReader(f))
+    with open(output_path, newline='', encoding='utf-8') as f:
+        outputs = list(csv.DictReader(f))
+    return counts, blobs, inputs, outputs
+
+
+def test_statuses_dedup_and_rerun(site, tmp_path):
+    store_dir = tmp_path / 'store'
+    counts, blobs, inputs, outputs = run(site, tmp_path, store_dir)
+
+    seen = set()
+    for before, after in zip(inputs, outputs):
+        if not before['picture_url']:
+            continue
+        expected = site.expected_status(rendition_id(before['picture_url']), MAX_BYTES)
+        seen.add(expected)
+        assert after['image_status'] == expected, before['picture_url']
+        # Only broken links and placeholders lose their picture_url
+        kept = expected in ('ok', 'too_large')
+        assert after['picture_url'] == (before['picture_url'] if kept else '')
+        assert bool(after['image_sha256']) == (expected in ('ok', 'placeholder'))
+    assert seen == {'ok', 'placeholder', 'broken', 'too_large'}
+
+    # Renditions shared between ids are stored once
+    ok_digests = {row['image_sha256'] for row in outputs if row['image_status'] in ('ok', 'placeholder')}
+    ok_urls = {row['picture_url'] for row in outputs if row['image_status'] == 'ok'}
+    assert blobs == len(ok_digests) == counts['stored']
+    assert len(ok_digests) < len(ok_urls)
+
+    # A rerun over the same store is answered with 304s for every ok image
+    site.reset_counts()
+    rerun, rerun_blobs, _, rerun_outputs = run(site, tmp_path, store_dir)
+    assert rerun['not_modified'] == len(ok_urls)
+    assert rerun['stored'] == 0
+    assert site.stats()['requests'].get('image', 0) == 0  # Only placeholders and error pages are sent again
+    assert rerun_blobs == blobs
+    assert [row['image_status'] for row in rerun_outputs] == [row['image_status'] for row in outputs]
+
+
+def test_slot_is_released_when_reading_the_body_fails(tmp_path):
+    site = ImageSite()
+    site.start()
+    store = ImageStore(str(tmp_path / 'store'))
+    try:
+        scheduler = RequestScheduler(concurrency=1, max_concurrency=1)
+        verifier = ImageVerifier(store, scheduler=scheduler)
+
+        async def read_body(response):
+            raise RuntimeError("decoder bug")
+        verifier._read_body = read_body
+        url = f"{site.url}{RENDITION_PATH}?id=abc123&ht=225&wd=225"
+        with pytest.raises(RuntimeError):
+            verifier.verify([url])
+        limiter = scheduler.limiter(url)
+        assert limiter.in_flight == 0
+        assert limiter.try_acquire()[0]
+    finally:
+        store.close()
+        site.stop()
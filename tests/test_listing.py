@@ -0,0 +1,142 @@
+import os
+import pathlib
+import shutil
+
+import pytest
+
+from conftest import ROOT
+
+pytest.importorskip('selenium')
+from fixture_site import load_scraper_module  # noqa: E402
+from selenium.common.exceptions import NoSuchElementException, WebDriverException  # noqa: E402
+from selenium.webdriver.common.by import By  # noqa: E402
+from sysco_html import element_text, parse_html  # noqa: E402
+
+FIXTURES = os.path.join(ROOT, 'tests', 'fixtures')
+PAGE_URL = "https://shop.sysco.com/app/catalog?BUSINESS_CENTER_ID=syy_cust_tax_produce&page=1"
+
+
+class DomElement:
+    """WebDriver-like view of a parsed element, including the '..' XPath find_product_container() walks up with"""
+    def __init__(self, element):
+        self.element = element
+
+    @property
+    def text(self):
+        return element_text(self.element)
+
+    def get_attribute(self, name):
+        return self.element.get(name)
+
+    def find_element(self, by, value):
+        if by == By.XPATH and value == '..':
+            parent = self.element.parent
+            if parent is None or parent.tag == '#document':
+                raise NoSuchElementException(value)
+            return DomElement(parent)
+        element = self.element.select_one(value)
+        if element is None:
+            raise NoSuchElementException(value)
+        return DomElement(element)
+
+    def find_elements(self, by, value):
+        return [DomElement(element) for element in self.element.select(value)]
+
+
+def read_fixture(name):
+    with open(os.path.join(FIXTURES, name), encoding='utf-8') as f:
+        return f.read()
+
+
+def scraper():
+    return load_scraper_module().FinalSyscoScraper(outputs=())
+
+
+def batched(html):
+    """extract_listing_records() + build_listing_products(), as for cached and HTTP pages"""
+    return scraper().extract_listing_html(parse_html(html, PAGE_URL), PAGE_URL, 'Produce')
+
+
+def per_element(html):
+    return scraper().extract_listing_per_element(DomElement(parse_html(html, PAGE_URL)), 'Produce')
+
+
+@pytest.mark.parametrize('name', ['listing_opco.html', 'listing_generic.html'])
+def test_batched_and_per_element_paths_agree(name):
+    html = read_fixture(name)
+    products = batched(html)
+    assert products
+    assert products == per_element(html)
+
+
+def test_field_fallbacks():
+    products = {p['sku']: p for p in batched(read_fixture('listing_opco.html'))}
+    # The carousel link and the second link of a tile do not add products
+    assert list(products) == ['1000001', '1000002', '1000003', '1000004', '1000005', '1000006']
+    assert products['1000001']['product_url'] == "https://shop.sysco.com/app/opco/0058/product/1000001"
+
+    # Name: link text, or the first long enough name selector when the link text is too short
+    assert products['1000001']['product_name'] == "Tomato, Roma, Fresh"
+    assert products['1000002']['product_name'] == "Lettuce, Romaine Hearts"
+    assert products['1000005']['product_name'] == "Kale, Green, Curly, Iceless"
+
+    # Brand: first match per selector in order; hidden (empty) and long texts are rejected
+    assert products['1000001']['brand_name'] == "Packer"
+    assert products['1000002']['brand_name'] == "Imperial Fresh"
+    assert products['1000003']['brand_name'] == ""
+    assert products['1000004']['brand_name'] == ""
+
+    # Packaging: a selector text with a pack pattern, else a pattern in the tile text
+    assert products['1000001']['packaging_info'] == "1/25 LB"
+    assert products['1000002']['packaging_info'] == "3/6 CT"
+    assert products['1000003']['packaging_info'] == "50 LB"
+    assert products['1000004']['packaging_info'] == ""
+
+    # Image: data-src before src, placeholders skipped, the link before the rest of the tile
+    assert products['1000001']['picture_url'] == "https://mediacdn.sysco.com/rendition?id=aaa111&ht=225"
+    assert products['1000002']['picture_url'] == "https://mediacdn.sysco.com/rendition?id=bbb222"
+    assert products['1000003']['picture_url'] == "https://mediacdn.sysco.com/rendition?id=ccc333"
+    assert products['1000004']['picture_url'] == ""
+    assert products['1000005']['picture_url'] == "https://cdn.example.com/images/kale-1000005.webp"
+    assert products['1000006']['picture_url'] == ""
+
+
+def test_generic_tiles():
+    products = {p['sku']: p for p in batched(read_fixture('listing_generic.html'))}
+    # The container is the nearest ancestor with a product/item/card/tile class, up to five levels up
+    assert products['2000001']['packaging_info'] == "4/1 GAL"
+    assert products['2000001']['picture_url'] == "https://mediacdn.sysco.com/rendition?id=ddd444"
+    # A relative src comes back absolute, as the browser reports it
+    assert products['2000002']['picture_url'] == "https://shop.sysco.com/app/product/2000002/image.jpg"
+    assert products['2000002']['packaging_info'] == ""
+    assert products['2000003']['product_name'] == "Butter, Salted, Solid\n36/1 LB"
+    assert products['2000003']['picture_url'] == "https://mediacdn.sysco.com/rendition?id=eee555"
+
+
+def test_skus_seen_on_earlier_pages_are_skipped():
+    html = read_fixture('listing_opco.html')
+    instance = scraper()
+    instance.processed_skus.update({'1000001', '1000004'})
+    products = instance.extract_listing_html(parse_html(html, PAGE_URL), PAGE_URL, 'Produce')
+    assert [p['sku'] for p in products] == ['1000002', '1000003', '1000005', '1000006']
+    assert instance.processed_skus == {f'100000{i}' for i in range(1, 7)}
+
+
+@pytest.fixture(scope='module')
+def chrome():
+    if not any(shutil.which(name) for name in ('google-chrome', 'chromium', 'chromium-browser', 'chrome')):
+        pytest.skip("Chrome is not installed")
+    try:
+        driver = scraper().setup_driver()
+    except WebDriverException as e:
+        pytest.skip(f"Chrome could not start: {e.__class__.__name__}")
+    yield driver
+    driver.quit()
+
+
+@pytest.mark.parametrize('name', ['listing_opco.html', 'listing_generic.html'])
+def test_extraction_script_matches_per_element_in_chrome(chrome, name):
+    chrome.get(pathlib.Path(FIXTURES, name).as_uri())
+    products = scraper().extract_listing_batch(chrome, 'Produce')
+    assert products
+    assert products == scraper().extract_listing_per_element(chrome, 'Produce')
@@ -0,0 +1,64 @@
+import logging
+
+import pytest
+
+pytest.importorskip('selenium')
+from fixture_site import load_scraper_module  # noqa: E402
+from selenium.common.exceptions import NoSuchElementException, TimeoutException  # noqa: E402
+from selenium.webdriver.common.by import By  # noqa: E402
+
+
+class ZipInput:
+    def __init__(self):
+        self.keys = []
+
+    def clear(self):
+        pass
+
+    def send_keys(self, keys):
+        self.keys.append(keys)
+
+
+class Driver:
+    """No guest button; the zip code input is there when `zip_input` is given"""
+    def __init__(self, zip_input=None):
+        self.zip_input = zip_input
+
+    def find_element(self, by, value):
+        if by == By.XPATH:
+            raise TimeoutException("no guest button")
+        if self.zip_input is None:
+            raise NoSuchElementException(value)
+        return self.zip_input
+
+
+def set_location(driver, prompt_gone, caplog):
+    scraper = load_scraper_module().FinalSyscoScraper(outputs=())
+    scraper.readiness.wait_for_element_gone = prompt_gone
+    with caplog.at_level(logging.INFO):
+        scraper.set_location(driver)
+    return [(record.levelname, record.getMessage()) for record in caplog.records]
+
+
+def test_location_set(caplog):
+    zip_input = ZipInput()
+    assert set_location(Driver(zip_input), lambda driver, selector: True, caplog) == [
+        ('INFO', "Set location to 97205")]
+    assert zip_input.keys == ['97205', '\n']
+
+
+def test_missing_zip_input_is_logged_with_its_exception(caplog):
+    assert set_location(Driver(), lambda driver, selector: True, caplog) == [
+        ('WARNING', "Could not set location: NoSuchElementException")]
+
+
+def test_prompt_still_shown(caplog):
+    assert set_location(Driver(ZipInput()), lambda driver, selector: None, caplog) == [
+        ('WARNING', "Could not confirm location 97205: the zip code prompt is still shown")]
+
+
+def test_timeout_waiting_for_the_prompt_to_close(caplog):
+    def timeout(driver, selector):
+        raise TimeoutException()
+    assert set_location(Driver(ZipInput()), timeout, caplog) == [
+        ('WARNING', "Could not set location: TimeoutException")]
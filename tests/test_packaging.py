@@ -0,0 +1,26 @@
+import pytest
+
+from bench_packaging import legacy_packaging_from_text
+from sysco_packaging import find_packaging, parse_csv, parse_packaging
+
+
+@pytest.mark.parametrize('text', [
+    "Tomato, Roma, Fresh\n1/25 LB",
+    "2x5 LB",  # Only the second pattern matches
+    "2 x 5 LB",  # The first pattern matches inside the second's match
+    "Sugar 2x5 LB then 10 LB",
+    "Flour 1.5 LB",
+    "Eggs\n15 DZ\n30 CT\nextra",
+    "Lettuce\n3/6\nCT",  # Only the whole text matches, across the newline
+    "no pack size here",
+    "",
+])
+def test_find_packaging_matches_the_per_pattern_scan(text):
+    assert find_packaging(text) == legacy_packaging_from_text(text)
+
+
+def test_parse_csv_falls_back_to_the_name(tmp_path):
+    source = tmp_path / 'products.csv'
+    source.write_text("product_name,packaging_info\nRice 2x5 LB,\nOil,6/1 GAL\nSalt,\n", encoding='utf-8')
+    assert parse_csv(str(source), str(tmp_path / 'parsed.csv')) == 2
+    assert parse_packaging("6/1 GAL").total_quantity == round(6 * 3.785411784, 4)
@@ -0,0 +1,93 @@
+import os
+
+import pytest
+
+from conftest import ROOT
+from sysco_cache import PageCache
+from sysco_checkpoint import RunCheckpoint
+from sysco_pagination import PaginationPlan
+
+
+def walk(plan, page_products):
+    """Pages a sequential walk visits when page N lists page_products[N - 1] products"""
+    visited = []
+    for page in plan:
+        count = page_products[page - 1] if page <= len(page_products) else 0
+        if page == 1:
+            plan.set_count(sum(page_products), count + 6)  # Six carousel links inflate page 1's page size
+        plan.record(page, count)
+        visited.append(page)
+    return visited
+
+
+def test_exact_plan_stops_at_last_page():
+    plan = PaginationPlan()
+    assert plan.set_count(100, 24)
+    for page in range(1, 5):
+        plan.record(page, 24)
+        assert not plan.exhausted(page)
+    plan.record(5, 4)
+    assert plan.exhausted(5)
+    assert plan.pages_after(1) == [2, 3, 4, 5]
+
+
+def test_inflated_page_size_pages_past_the_plan():
+    # 100 results at 24 a page need 5 pages; a page size of 30 plans only 4
+    assert walk(PaginationPlan(), [24, 24, 24, 24, 4]) == [1, 2, 3, 4, 5]
+
+
+def test_walk_past_the_plan_ends_at_an_empty_page():
+    plan = PaginationPlan()
+    plan.set_count(100, 30)
+    for page in range(1, 5):
+        plan.record(page, 24)
+    assert plan.beyond_plan(4)
+    plan.record(5, 0)
+    assert not plan.beyond_plan(5) and plan.exhausted(5)
+
+
+def test_full_last_page_pages_past_the_plan():
+    plan = PaginationPlan(total_pages=2, result_count=None, page_size=24)
+    plan.record(1, 24)
+    plan.record(2, 24)
+    assert plan.pages_after(2) == [3]
+    assert not plan.exhausted(2)
+
+
+def test_max_pages_caps_the_walk_past_the_plan():
+    plan = PaginationPlan(max_pages=4, total_pages=4, result_count=1000, page_size=24)
+    plan.record(4, 24)
+    assert plan.exhausted(4)
+
+
+def test_mid_category_pages():
+    plan = PaginationPlan(total_pages=3)
+    assert [plan.mid_category(page) for page in (1, 2, 3, 4)] == [False, True, False, False]
+    assert not PaginationPlan().mid_category(2)
+
+
+def test_checkpoint_keeps_plan_counts(tmp_path):
+    path = str(tmp_path / 'run.checkpoint')
+    checkpoint = RunCheckpoint(path).open(fresh=True)
+    checkpoint.record_plan('Produce', 4, 100, 30)
+    checkpoint.close()
+    loaded = RunCheckpoint(path).load()
+    assert loaded.plans == {'Produce': 4}
+    assert loaded.plan_counts == {'Produce': (100, 30)}
+
+
+def test_page_of_skus_from_another_category_is_not_empty(tmp_path):
+    pytest.importorskip('selenium')
+    from fixture_site import load_scraper_module
+    with open(os.path.join(ROOT, 'tests', 'fixtures', 'listing_opco.html'), encoding='utf-8') as f:
+        html = f.read()
+    cache = PageCache(str(tmp_path / 'cache'))
+    scraper = load_scraper_module().FinalSyscoScraper(outputs=(), cache=cache, replay=True)
+    cache.put(scraper.listing_url('produce', 1), scraper.zip_code, 'listing', html)
+    cache.put(scraper.listing_url('fruit_vegetables', 2), scraper.zip_code, 'listing', html)
+
+    assert scraper.scrape_listing_page(None, 'Produce', 'produce', 1) == 6
+    # Page 2 of 3 lists the same six tiles, all written by Produce already
+    plan = PaginationPlan(total_pages=3, result_count=18, page_size=6)
+    assert scraper.scrape_listing_page(None, 'Fruit & Vegetables', 'fruit_vegetables', 2, plan) == 0
+    assert plan.page_counts == {2: 6} and plan.collected == 6
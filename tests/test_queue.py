@@ -0,0 +1,187 @@
+import os
+import time
+
+import pytest
+
+import sysco_queue
+from conftest import ROOT
+from sysco_queue import LeaseHeartbeat, SkuStore, WorkQueue
+
+pytest.importorskip('selenium')
+from fixture_site import load_scraper_module  # noqa: E402
+from sysco_html import parse_html  # noqa: E402
+
+PAGE_URL = "https://shop.sysco.com/app/catalog?BUSINESS_CENTER_ID=syy_cust_tax_produce&page=3"
+
+
+class FlakySink:
+    """Fails its first `failures` writes, like a full disk"""
+    format = 'flaky'
+    path = None
+
+    def __init__(self, failures=1):
+        self.failures = failures
+        self.written = []
+
+    def write(self, records):
+        if self.failures:
+            self.failures -= 1
+            raise OSError("No space left on device")
+        self.written.extend(record.sku for record in records)
+
+    def position(self):
+        return None
+
+
+class Clock:
+    """Stands in for the time module in sysco_queue, so leases and backoff expire when a test says so"""
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(sysco_queue, 'time', clock)
+    return clock
+
+
+def work_queue(tmp_path, **kwargs):
+    queue = WorkQueue(str(tmp_path / 'queue.db'), lease_seconds=60, retry_delay=10, **kwargs)
+    queue.enqueue([('97205', 'Produce', 'produce', 1)])
+    return queue
+
+
+def lease_expires(queue):
+    """Read on its own connection, as the heartbeat thread is using the queue's"""
+    conn = sysco_queue.connect(queue.path)
+    try:
+        return conn.execute("SELECT lease_expires FROM tasks").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def listing_html():
+    with open(os.path.join(ROOT, 'tests', 'fixtures', 'listing_opco.html'), encoding='utf-8') as f:
+        return f.read()
+
+
+def scrape_page(scraper):
+    """Extract and finish page 3 of Produce, as a queued page task does"""
+    products = scraper.extract_listing_html(parse_html(listing_html(), PAGE_URL), PAGE_URL, 'Produce')
+    scraper.finish_listing_page(None, 'Produce', 3, products)
+
+
+def test_release_lets_other_pages_claim():
+    store = SkuStore(':memory:')
+    products = [{'sku': '1'}, {'sku': '2'}]
+    assert store.claim('97205', 'Produce', 3, products) == products
+    assert store.claim('98101', 'Produce', 3, products) == []
+    store.release('97205', 'Produce', 3)
+    assert store.claim('98101', 'Produce', 3, products) == products
+
+
+def test_failed_page_is_written_by_a_retry_on_the_same_worker(tmp_path):
+    sku_store = SkuStore(str(tmp_path / 'queue.db'))
+    scraper = load_scraper_module().FinalSyscoScraper(outputs=(), sku_store=sku_store)
+    sink = FlakySink()
+    scraper.sinks = [sink]
+
+    with pytest.raises(OSError):
+        scrape_page(scraper)
+    assert scraper.processed_skus == set()
+    assert sink.written == []
+
+    scrape_page(scraper)
+    assert sink.written == ['1000001', '1000002', '1000003', '1000004', '1000005', '1000006']
+    assert scraper.processed_skus == set(sink.written)
+    # The retry claimed them again, so another region gets none of them
+    assert sku_store.claim('98101', 'Produce', 3, [{'sku': sku} for sku in sink.written]) == []
+
+
+def test_expired_lease_is_leased_again(tmp_path, clock):
+    queue = work_queue(tmp_path)
+    first = queue.lease('a')
+    assert queue.lease('b') is None
+    clock.advance(61)
+    second = queue.lease('b')
+    assert (second.id, second.attempts) == (first.id, 2)
+    # The worker that lost the lease can neither renew nor finish the task
+    assert not queue.heartbeat(first)
+    assert not queue.complete(first, 5, next_pages=[2])
+    assert not queue.fail(first, "too late")
+    assert queue.complete(second, 5)
+    assert queue.stats() == {'97205': {'done': 1}}
+
+
+def test_heartbeat_keeps_the_lease(tmp_path, clock):
+    queue = work_queue(tmp_path)
+    task = queue.lease('a')
+    clock.advance(50)
+    with LeaseHeartbeat(queue, task, interval=0.01) as heartbeat:
+        deadline = time.monotonic() + 5
+        while lease_expires(queue) != clock.now + 60:
+            assert time.monotonic() < deadline
+            time.sleep(0.01)
+    assert not heartbeat.lost
+    clock.advance(50)  # 100s after the lease, past its first expiry
+    assert queue.lease('b') is None
+    clock.advance(11)
+    assert queue.lease('b').attempts == 2
+
+
+def test_heartbeat_notices_a_lost_lease(tmp_path, clock):
+    queue = work_queue(tmp_path)
+    task = queue.lease('a')
+    clock.advance(61)
+    queue.lease('b')
+    with LeaseHeartbeat(queue, task, interval=0.01) as heartbeat:
+        deadline = time.monotonic() + 5
+        while not heartbeat.lost:
+            assert time.monotonic() < deadline
+            time.sleep(0.01)
+
+
+def test_failed_task_waits_out_its_backoff(tmp_path, clock):
+    queue = work_queue(tmp_path, max_attempts=3)
+    assert queue.fail(queue.lease('a'), "timeout")
+    clock.advance(9)
+    assert queue.lease('a') is None
+    clock.advance(1)
+    task = queue.lease('a')
+    assert task.attempts == 2
+    assert queue.fail(task, "timeout")
+    clock.advance(19)  # The second retry waits twice as long
+    assert queue.lease('a') is None
+    clock.advance(1)
+    assert queue.lease('a').attempts == 3
+
+
+def test_task_fails_after_max_attempts_until_retried(tmp_path, clock):
+    queue = work_queue(tmp_path, max_attempts=2)
+    assert queue.fail(queue.lease('a'), "timeout")
+    clock.advance(10)
+    assert queue.fail(queue.lease('a'), "timeout")
+    clock.advance(3600)
+    assert queue.lease('a') is None
+    assert queue.stats() == {'97205': {'failed': 1}}
+    assert queue.idle()
+
+    assert queue.retry_failed() == 1
+    task = queue.lease('a')
+    assert task.attempts == 1
+    assert queue.complete(task, 3)
+
+
+def test_lease_expiring_on_the_last_attempt_fails_the_task(tmp_path, clock):
+    queue = work_queue(tmp_path, max_attempts=1)
+    queue.lease('a')
+    clock.advance(61)
+    assert queue.lease('b') is None
+    assert queue.stats() == {'97205': {'failed': 1}}
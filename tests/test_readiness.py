@@ -0,0 +1,47 @@
+import pytest
+
+pytest.importorskip('selenium')
+from selenium.common.exceptions import InvalidSessionIdException, JavascriptException  # noqa: E402
+from sysco_readiness import PageReadiness  # noqa: E402
+from urllib3.exceptions import MaxRetryError, ProtocolError  # noqa: E402
+
+
+class Driver:
+    """Raises `error` from every script it runs"""
+    current_url = "https://shop.sysco.com/app/catalog"
+    session_id = 'session'
+
+    def __init__(self, error):
+        self.error = error
+        self.calls = 0
+
+    def execute_script(self, script, *args):
+        self.calls += 1
+        raise self.error
+
+    def get_log(self, name):
+        return []
+
+
+@pytest.mark.parametrize('error', [
+    InvalidSessionIdException("invalid session id"),
+    MaxRetryError(None, '/session/abc/execute/sync', ProtocolError("Connection aborted")),
+    ConnectionRefusedError(111, "Connection refused"),
+])
+def test_dead_browser_errors_are_raised(error):
+    driver = Driver(error)
+    readiness = PageReadiness()
+    with pytest.raises(type(error)):
+        readiness.wait_for_listing(driver)
+    with pytest.raises(type(error)):
+        readiness.wait_for_page(driver)
+    assert driver.calls == 2
+
+
+def test_script_errors_count_as_not_ready(monkeypatch):
+    monkeypatch.setattr('sysco_readiness.PAGE_TIMEOUTS', {'listing': (0.3, 0.3)})
+    driver = Driver(JavascriptException("document is not ready"))
+    readiness = PageReadiness()
+    assert not readiness.wait_for_listing(driver)
+    assert driver.calls > 1
+    assert readiness.timeouts['listing'] == 1
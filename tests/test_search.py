@@ -0,0 +1,78 @@
+import csv
+import random
+
+import pytest
+
+from conftest import CATALOG_CSV
+from sysco_search import SearchIndex, build_index, update_index
+
+QUERIES = [
+    ('gala apple', {}),
+    ('gala', {}),
+    ('tomatoe', {}),
+    ('chiken breast', {}),
+    ('chedd*', {}),
+    ('nutela', {}),
+    ('fresh', {'category': 'Produce'}),
+    ('', {'unit': 'LB', 'min_quantity': 5, 'max_quantity': 10}),
+]
+
+
+def write_csv(path, rows):
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def answers(index, query, filters):
+    return sorted((r['sku'], r['score']) for r in index.search(query, limit=100000, **filters))
+
+
+@pytest.fixture(scope='module')
+def snapshots(tmp_path_factory):
+    with open(CATALOG_CSV, newline='', encoding='utf-8') as f:
+        rows = list(csv.DictReader(f))
+    rng = random.Random(7)
+    base = rows[:6000]
+    kept = [dict(row) for row in base]
+    for row in rng.sample(kept, 300):
+        kept.remove(row)
+    for row in rng.sample(kept, 100):
+        row['product_name'] = row['product_name'].replace('Fresh', 'Frozen') + ' Special'
+    new = kept + rows[6000:6050]
+    directory = tmp_path_factory.mktemp('snapshots')
+    write_csv(directory / 'old.csv', base)
+    write_csv(directory / 'new.csv', new)
+    return directory
+
+
+def test_update_answers_like_a_fresh_build(snapshots, tmp_path):
+    updated, fresh = tmp_path / 'updated', tmp_path / 'fresh'
+    build_index(str(snapshots / 'old.csv'), str(updated))
+    counts = update_index(str(snapshots / 'new.csv'), str(updated))
+    assert counts['removed'] == 300 and counts['added'] == 50 and counts['changed'] == 100
+    build_index(str(snapshots / 'new.csv'), str(fresh))
+
+    with SearchIndex(str(updated)) as a, SearchIndex(str(fresh)) as b:
+        assert len(a.segments) == 2 and sum(len(s.deleted) for s in a.segments) == 400
+        assert a.doc_count == b.doc_count
+        for query, filters in QUERIES:
+            assert answers(a, query, filters) == answers(b, query, filters), query
+        assert answers(a, 'gala apple', {})
+
+
+def test_repeated_update_is_a_no_op(snapshots, tmp_path):
+    build_index(str(snapshots / 'new.csv'), str(tmp_path))
+    assert update_index(str(snapshots / 'new.csv'), str(tmp_path)) == {
+        'added': 0, 'changed': 0, 'removed': 0, 'unchanged': 5750}
+
+
+def test_typos_prefixes_and_get(tmp_path):
+    build_index(CATALOG_CSV, str(tmp_path))
+    with SearchIndex(str(tmp_path)) as index:
+        assert all('chicken' in r['name'].lower() for r in index.search('chiken breast', limit=5))
+        assert index.search('chiken breast', limit=5, fuzzy=False) == []
+        assert all('apple' in r['name'].lower() for r in index.search('gala appl', limit=5))
+        assert index.get('6303788')['name'] == 'Apple Gala Extra Fancy Fresh 1/163 CT'
+        assert index.get('6303788')['brand'] == 'Imperial'
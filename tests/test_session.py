@@ -0,0 +1,55 @@
+import pytest
+
+pytest.importorskip('selenium')
+from fixture_site import load_scraper_module  # noqa: E402
+from sysco_ratelimit import RequestScheduler  # noqa: E402
+from urllib3.exceptions import MaxRetryError, ProtocolError  # noqa: E402
+
+URL = "https://shop.sysco.com/app/catalog?BUSINESS_CENTER_ID=syy_cust_tax_produce&page=1"
+
+
+class DeadDriver:
+    """Chromedriver that is gone: every page load fails the way Selenium's HTTP client reports it"""
+    started = 0
+
+    def __init__(self, failures):
+        DeadDriver.started += 1
+        self.failures = failures
+        self.loaded = []
+
+    def get(self, url):
+        if url.endswith('/app/catalog?BUSINESS_CENTER_ID=syy_cust_tax_produce&page=1') and self.failures:
+            self.failures.pop(0)
+            raise MaxRetryError(None, url, ProtocolError("Connection aborted"))
+        self.loaded.append(url)
+
+    def quit(self):
+        pass
+
+
+def session(failures, max_retries):
+    scraper = load_scraper_module().FinalSyscoScraper(outputs=())
+    scraper.scheduler = RequestScheduler(concurrency=1, max_concurrency=1, max_retries=max_retries, base_delay=0.01)
+    shared = list(failures)
+    scraper.setup_driver = lambda: DeadDriver(shared)
+    scraper.set_location = lambda driver: None
+    scraper.readiness.wait_for_page = lambda driver, page_type='home': True
+    DeadDriver.started = 0
+    return load_scraper_module().DriverSession(scraper), scraper.scheduler
+
+
+def test_connection_errors_recycle_the_browser_and_retry():
+    driver_session, scheduler = session(['dead'] * 2, max_retries=4)
+    driver_session.get(URL)
+    assert driver_session.driver.loaded[-1] == URL
+    assert DeadDriver.started == 3  # The first browser and one restart per failure
+    assert scheduler.limiter(URL).in_flight == 0
+
+
+def test_slot_is_released_when_retries_run_out():
+    driver_session, scheduler = session(['dead'] * 4, max_retries=3)
+    with pytest.raises(MaxRetryError):
+        driver_session.get(URL)
+    limiter = scheduler.limiter(URL)
+    assert limiter.in_flight == 0
+    assert limiter.try_acquire()[0]
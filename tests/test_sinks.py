@@ -0,0 +1,108 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+from conftest import ROOT
+from sysco_sinks import ProductRecord
+
+pyarrow_parquet = pytest.importorskip('pyarrow.parquet')
+from sysco_sinks import ParquetSink  # noqa: E402
+
+CRASH_SCRIPT = """
+import os, sys
+sys.path.insert(0, {root!r})
+from sysco_sinks import ParquetSink, ProductRecord
+sink = ParquetSink({path!r})
+sink.write([ProductRecord(category='A', sku=str(i)) for i in range(3)])
+print(sink.position(), flush=True)
+sink.write([ProductRecord(category='A', sku=str(i)) for i in range(3, 5)])
+os._exit(0)  # Crash before close(): no footer
+"""
+
+
+def skus(path):
+    return pyarrow_parquet.read_table(path).column('sku').to_pylist()
+
+
+def crash_after_two_pages(path):
+    output = subprocess.run([sys.executable, '-c', CRASH_SCRIPT.format(root=ROOT, path=str(path))],
+                            capture_output=True, text=True, check=True).stdout
+    return int(output.strip())
+
+
+def test_pages_are_buffered_into_row_groups(tmp_path):
+    path = tmp_path / 'products.parquet'
+    sink = ParquetSink(str(path), row_group_size=3)
+    for sku in range(7):
+        sink.write([ProductRecord(sku=str(sku))])
+    sink.close()
+    metadata = pyarrow_parquet.ParquetFile(str(path)).metadata
+    assert [metadata.row_group(i).num_rows for i in range(metadata.num_row_groups)] == [3, 3, 1]
+    assert skus(path) == [str(sku) for sku in range(7)]
+    assert not os.path.exists(f"{path}.spool")
+
+
+def test_resume_rebuilds_a_file_without_footer(tmp_path):
+    path = tmp_path / 'products.parquet'
+    first_page_offset = crash_after_two_pages(path)
+    with pytest.raises(Exception):
+        pyarrow_parquet.ParquetFile(str(path))
+
+    # The checkpoint only covered the first page, so the second is scraped again
+    sink = ParquetSink(str(path), resume=True, offset=first_page_offset)
+    assert sink.file_path == str(path)
+    sink.write([ProductRecord(sku='3'), ProductRecord(sku='4')])
+    sink.close()
+    assert skus(path) == ['0', '1', '2', '3', '4']
+
+
+def test_resume_after_clean_close_starts_a_part_file(tmp_path):
+    path = tmp_path / 'products.parquet'
+    sink = ParquetSink(str(path))
+    sink.write([ProductRecord(sku='1')])
+    sink.close()
+
+    sink = ParquetSink(str(path), resume=True)
+    assert sink.file_path == str(tmp_path / 'products.part2.parquet')
+    sink.write([ProductRecord(sku='2')])
+    sink.close()
+    assert skus(path) == ['1']
+    assert skus(tmp_path / 'products.part2.parquet') == ['2']
+
+
+def test_fresh_run_removes_parts_and_spools_of_earlier_runs(tmp_path):
+    path = tmp_path / 'products.parquet'
+    for stale in ('products.part2.parquet', 'products.part3.parquet', 'products.parquet.spool',
+                  'products.part3.parquet.spool'):
+        (tmp_path / stale).write_text('stale')
+    sink = ParquetSink(str(path))
+    sink.write([ProductRecord(sku='1')])
+    sink.close()
+    assert sorted(os.listdir(tmp_path)) == ['products.parquet']
+
+
+def test_resume_rebuilds_a_crashed_file_before_older_parts(tmp_path):
+    path = tmp_path / 'products.parquet'
+    first_page_offset = crash_after_two_pages(path)
+    # A readable part left over next to the crashed file
+    stale = ParquetSink(str(tmp_path / 'products.part2.parquet'))
+    stale.write([ProductRecord(sku='old')])
+    stale.close()
+
+    sink = ParquetSink(str(path), resume=True, offset=first_page_offset)
+    assert sink.file_path == str(path)
+    sink.close()
+    assert skus(path) == ['0', '1', '2']
+
+
+def test_resume_numbers_after_the_highest_part(tmp_path):
+    path = tmp_path / 'products.parquet'
+    for part in ('products.parquet', 'products.part3.parquet'):
+        sink = ParquetSink(str(tmp_path / part))
+        sink.write([ProductRecord(sku=part)])
+        sink.close()
+    sink = ParquetSink(str(path), resume=True)
+    assert sink.file_path == str(tmp_path / 'products.part4.parquet')
+    sink.close()